@@ -0,0 +1,385 @@
+import hashlib
+import mmap
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def content_hash(text: str) -> int:
+    """64-bit BLAKE2b digest of a chunk's text, as a signed int64."""
+    digest = hashlib.blake2b(text.encode("utf-8", errors="surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def resident_nbytes(array: Optional[np.ndarray]) -> int:
+    """``array.nbytes``, or 0 when it is memory-mapped: the OS pages those in and out on demand."""
+    if array is None:
+        return 0
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return 0
+        base = getattr(base, "base", None)
+    return array.nbytes
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _grow(array: np.ndarray, size: int, needed: int, fill) -> np.ndarray:
+    """Returns a copy of ``array[:size]`` with room for ``needed`` rows, doubling the capacity."""
+    capacity = max(needed, 2 * len(array), 16)
+    grown = np.full(capacity, fill, dtype=array.dtype)
+    grown[:size] = array[:size]
+    return grown
+
+
+class DocumentStore:
+    """
+    Chunk texts and their source metadata, addressed by integer id.
+
+    Each column is one array indexed by id: the text, a dictionary-encoded
+    source filename, the 1-based page number and the chunk's [start, end)
+    character offsets in its source document (-1 when unknown). Texts loaded
+    from disk stay UTF-8 encoded in a single (memory-mapped) buffer and are
+    decoded only when a result asks for them.
+
+    Rows of each source are also tracked as [start, end) row ranges, so a
+    search restricted to some files can score just those slices of the matrix.
+
+    A chunk whose text also occurs in other files is stored once: the source
+    column names the file it was first indexed from and ``add_reference``
+    records the others, which filters and ``metadata`` then include. Each row
+    keeps a 64-bit hash of its text so ``find`` can locate a copy of a text.
+    """
+
+    def __init__(self):
+        self.sources: List[str] = []
+        self._source_ids: Dict[str, int] = {}
+        self._blob = np.zeros(0, dtype=np.uint8)  # UTF-8 texts of ids [0, _stored)
+        self._blob_offsets = np.zeros(1, dtype=np.int64)
+        self._stored = 0
+        self._texts: List[str] = []  # texts of ids [_stored, _size)
+        self._texts_nbytes = 0  # memory held by the ``_texts`` strings
+        self._source = np.zeros(0, dtype=np.int32)
+        self._page = np.zeros(0, dtype=np.int32)
+        self._start = np.zeros(0, dtype=np.int64)
+        self._end = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._ranges: Dict[int, List[List[int]]] = {}  # source id -> [start, end) row ranges
+        self._hash = np.zeros(0, dtype=np.int64)
+        self._hash_ids: Optional[Dict[int, int]] = None  # hash -> latest id, built on first ``find``
+        self._refs: Dict[int, List[int]] = {}  # id -> source ids beyond its own
+        self._ref_rows: Dict[int, List[int]] = {}  # source id -> ids it references
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _source_id(self, source: str) -> int:
+        source_id = self._source_ids.get(source)
+        if source_id is None:
+            source_id = len(self.sources)
+            self.sources.append(source)
+            self._source_ids[source] = source_id
+        return source_id
+
+    def add(
+        self,
+        texts: Sequence[str],
+        source: Optional[str] = None,
+        pages: Optional[Sequence[int]] = None,
+        starts: Optional[Sequence[int]] = None,
+        ends: Optional[Sequence[int]] = None,
+    ) -> np.ndarray:
+        """Appends one row per text, all from ``source``. Returns the new ids."""
+        count = len(texts)
+        ids = np.arange(self._size, self._size + count, dtype=np.int64)
+        needed = self._size + count
+        if needed > len(self._source):
+            self._source = _grow(self._source, self._size, needed, -1)
+            self._page = _grow(self._page, self._size, needed, -1)
+            self._start = _grow(self._start, self._size, needed, -1)
+            self._end = _grow(self._end, self._size, needed, -1)
+            self._hash = _grow(self._hash, self._size, needed, 0)
+        source_id = -1 if source is None else self._source_id(source)
+        self._source[ids] = source_id
+        if count:
+            self._add_range(source_id, self._size, needed)
+        self._page[ids] = -1 if pages is None else pages
+        self._start[ids] = -1 if starts is None else starts
+        self._end[ids] = -1 if ends is None else ends
+        hashes = [content_hash(text) for text in texts]
+        self._hash[ids] = hashes
+        if self._hash_ids is not None:
+            self._hash_ids.update(zip(hashes, ids.tolist()))
+        self._texts.extend(texts)
+        self._texts_nbytes += sum(map(sys.getsizeof, texts))
+        self._size = needed
+        return ids
+
+    def find(self, text: str) -> Optional[int]:
+        """Id of the latest row holding exactly ``text``, or None."""
+        if self._hash_ids is None:
+            hashes = np.asarray(self._hash[: self._size]).tolist()
+            self._hash_ids = dict(zip(hashes, range(self._size)))
+        doc_id = self._hash_ids.get(content_hash(text))
+        if doc_id is None or self.text(doc_id) != text:  # a hash collision is not a duplicate
+            return None
+        return doc_id
+
+    def add_reference(self, doc_id: int, source: str) -> bool:
+        """Records that chunk ``doc_id`` also occurs in ``source``. Returns False if it already did."""
+        source_id = self._source_id(source)
+        refs = self._refs.setdefault(doc_id, [])
+        if source_id == self._source[doc_id] or source_id in refs:
+            return False
+        refs.append(source_id)
+        self._ref_rows.setdefault(source_id, []).append(doc_id)
+        return True
+
+    def remove_source(self, source: str) -> np.ndarray:
+        """
+        Drops ``source`` from every row. Returns the ids left without any source, which
+        the caller deletes; rows also referenced by other files move to the first of those.
+        """
+        source_id = self._source_ids.get(source)
+        if source_id is None:
+            return np.zeros(0, dtype=np.int64)
+        for doc_id in self._ref_rows.pop(source_id, []):
+            self._refs[doc_id].remove(source_id)
+        if not self._source.flags.writeable:  # memory-mapped from disk
+            self._source = np.array(self._source)
+        orphaned, moved = [], False
+        for start, end in self._ranges.get(source_id, []):
+            for doc_id in range(start, end):
+                refs = self._refs.get(doc_id)
+                if not refs:
+                    orphaned.append(doc_id)
+                    continue
+                new_source = refs.pop(0)
+                self._source[doc_id] = new_source
+                self._ref_rows[new_source].remove(doc_id)
+                moved = True
+        if moved:
+            self._rebuild_ranges()
+        return np.array(orphaned, dtype=np.int64)
+
+    def _add_range(self, source_id: int, start: int, end: int) -> None:
+        ranges = self._ranges.setdefault(source_id, [])
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end  # uploads add a file's chunks back to back
+        else:
+            ranges.append([start, end])
+
+    def _rebuild_ranges(self) -> None:
+        """Recomputes the per-source row ranges from the source column in one vectorized pass."""
+        self._ranges = {}
+        source = np.asarray(self._source[: self._size])
+        if not len(source):
+            return
+        boundaries = np.flatnonzero(np.diff(source)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(source)]))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            self._ranges.setdefault(int(source[start]), []).append([start, end])
+
+    def source_ranges(self, sources: Sequence[str]) -> List[Tuple[int, int]]:
+        """Sorted, disjoint [start, end) row ranges holding the chunks of the given source names."""
+        ranges = []
+        for source in set(sources):
+            source_id = self._source_ids.get(source)
+            if source_id is not None:
+                ranges.extend((start, end) for start, end in self._ranges.get(source_id, []))
+                ranges.extend((doc_id, doc_id + 1) for doc_id in self._ref_rows.get(source_id, []))
+        return _merge_ranges(ranges)
+
+    def _set_refs(self, refs: Dict[int, List[int]]) -> None:
+        self._refs = {doc_id: list(source_ids) for doc_id, source_ids in refs.items() if source_ids}
+        self._ref_rows = {}
+        for doc_id, source_ids in sorted(self._refs.items()):
+            for source_id in source_ids:
+                self._ref_rows.setdefault(source_id, []).append(doc_id)
+
+    def take(self, ids: np.ndarray) -> "DocumentStore":
+        """New store with the rows ``ids`` in that order; their new ids are 0..len(ids)-1."""
+        store = self.take_content(ids)
+        store.copy_sources(self, ids)
+        return store
+
+    def take_content(self, ids: np.ndarray) -> "DocumentStore":
+        """
+        ``take`` without the sources: texts, pages, offsets and hashes never change
+        once added, so this is safe in a worker thread while the store is written to.
+        """
+        store = DocumentStore()
+        store._texts = self.texts(ids)
+        store._texts_nbytes = sum(map(sys.getsizeof, store._texts))
+        store._source = np.full(len(ids), -1, dtype=np.int32)
+        store._page = np.asarray(self._page[ids], dtype=np.int32)
+        store._start = np.asarray(self._start[ids], dtype=np.int64)
+        store._end = np.asarray(self._end[ids], dtype=np.int64)
+        store._hash = np.asarray(self._hash[ids], dtype=np.int64)
+        store._size = len(ids)
+        return store
+
+    def copy_sources(self, other: "DocumentStore", ids: np.ndarray) -> None:
+        """Gives this store's rows the sources and references of rows ``ids`` of ``other``."""
+        self.sources = list(other.sources)
+        self._source_ids = dict(other._source_ids)
+        self._source = np.asarray(other._source[ids], dtype=np.int32)
+        self._rebuild_ranges()
+        new_ids = {int(old): new for new, old in enumerate(np.asarray(ids).tolist())}
+        self._set_refs({new_ids[doc_id]: refs for doc_id, refs in other._refs.items() if doc_id in new_ids})
+
+    def extend(self, other: "DocumentStore") -> None:
+        """Appends every row of ``other``, re-encoding its source names."""
+        remap = np.array([self._source_id(source) for source in other.sources] + [-1], dtype=np.int32)
+        start, needed = self._size, self._size + len(other)
+        if needed > len(self._source):
+            self._source = _grow(self._source, self._size, needed, -1)
+            self._page = _grow(self._page, self._size, needed, -1)
+            self._start = _grow(self._start, self._size, needed, -1)
+            self._end = _grow(self._end, self._size, needed, -1)
+            self._hash = _grow(self._hash, self._size, needed, 0)
+        self._source[start:needed] = remap[other._source[: len(other)]]  # -1 indexes the trailing -1
+        self._page[start:needed] = other._page[: len(other)]
+        self._start[start:needed] = other._start[: len(other)]
+        self._end[start:needed] = other._end[: len(other)]
+        self._hash[start:needed] = other._hash[: len(other)]
+        self._hash_ids = None
+        texts = other.texts()
+        self._texts.extend(texts)
+        self._texts_nbytes += sum(map(sys.getsizeof, texts))
+        self._size = needed
+        self._rebuild_ranges()
+        refs = dict(self._refs)
+        for doc_id, source_ids in other._refs.items():
+            refs[start + doc_id] = [int(remap[source_id]) for source_id in source_ids]
+        self._set_refs(refs)
+
+    @property
+    def resident_nbytes(self) -> int:
+        """RAM held by the texts, the columns and the ``find`` lookup table; memory-mapped columns count as 0."""
+        columns = (self._blob, self._blob_offsets, self._source, self._page, self._start, self._end, self._hash)
+        total = sum(resident_nbytes(column) for column in columns) + self._texts_nbytes
+        if self._hash_ids is not None:
+            total += sys.getsizeof(self._hash_ids) + 60 * len(self._hash_ids)  # plus an int key and value per entry
+        return total
+
+    def text(self, doc_id: int) -> str:
+        if doc_id < self._stored:
+            start, end = self._blob_offsets[doc_id], self._blob_offsets[doc_id + 1]
+            return bytes(self._blob[start:end]).decode("utf-8")
+        return self._texts[doc_id - self._stored]
+
+    def texts(self, ids: Optional[Sequence[int]] = None) -> List[str]:
+        ids = range(self._size) if ids is None else ids
+        return [self.text(int(doc_id)) for doc_id in ids]
+
+    def metadata(self, doc_id: int) -> dict:
+        source, page = int(self._source[doc_id]), int(self._page[doc_id])
+        start, end = int(self._start[doc_id]), int(self._end[doc_id])
+        also = [self.sources[source_id] for source_id in self._refs.get(doc_id, [])]
+        return {
+            "source": self.sources[source] if source >= 0 else None,
+            "sources": ([self.sources[source]] if source >= 0 else []) + also,
+            "page": page if page >= 0 else None,
+            "start": start if start >= 0 else None,
+            "end": end if end >= 0 else None,
+        }
+
+    def config(self) -> dict:
+        return {"sources": self.sources}
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Columns trimmed to the stored rows, with all texts encoded into one UTF-8 buffer."""
+        return {**self.content_state(self._size), **self.source_state()}
+
+    def content_state(self, size: int) -> Dict[str, np.ndarray]:
+        """
+        The columns of rows [0, size) that never change once added. Rows are only
+        appended, so this can run in a worker thread while the store is written to.
+        """
+        encoded = [text.encode("utf-8") for text in self._texts[: size - self._stored]]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        stored_bytes = self._blob_offsets[self._stored]
+        blob = np.concatenate([self._blob[:stored_bytes], np.frombuffer(b"".join(encoded), dtype=np.uint8)])
+        offsets = np.concatenate([self._blob_offsets[: self._stored + 1], stored_bytes + np.cumsum(lengths)])
+        return {
+            "hash": self._hash[:size],
+            "texts": blob,
+            "text_offsets": offsets,
+            "page": self._page[:size],
+            "start": self._start[:size],
+            "end": self._end[:size],
+        }
+
+    def source_state(self) -> Dict[str, np.ndarray]:
+        """The source column and references, copied: deletes and dedupe rewrite them in place."""
+        ref_pairs = [
+            (doc_id, source_id) for doc_id, source_ids in sorted(self._refs.items()) for source_id in source_ids
+        ]
+        return {
+            "ref_ids": np.array([doc_id for doc_id, _ in ref_pairs], dtype=np.int64),
+            "ref_sources": np.array([source_id for _, source_id in ref_pairs], dtype=np.int32),
+            "source": np.array(self._source[: self._size]),
+        }
+
+    @classmethod
+    def from_state(cls, config: dict, state: Dict[str, np.ndarray]) -> "DocumentStore":
+        store = cls()
+        for source in config.get("sources", []):
+            store._source_id(source)
+        store._blob = state["texts"]
+        store._blob_offsets = state["text_offsets"]
+        store._stored = store._size = len(state["text_offsets"]) - 1
+        store._source, store._page = state["source"], state["page"]
+        store._start, store._end = state["start"], state["end"]
+        if "hash" in state:
+            store._hash = state["hash"]
+        else:  # saved before chunks were hashed
+            store._hash = np.array([content_hash(text) for text in store.texts()], dtype=np.int64)
+        store._rebuild_ranges()
+        refs: Dict[int, List[int]] = {}
+        for doc_id, source_id in zip(state.get("ref_ids", []), state.get("ref_sources", [])):
+            refs.setdefault(int(doc_id), []).append(int(source_id))
+        store._set_refs(refs)
+        return store
+
+
+class SearchResult:
+    """One search hit: id and score up front, text and metadata read from the store on access."""
+
+    __slots__ = ("id", "score", "_store")
+
+    def __init__(self, doc_id: int, score: float, store: DocumentStore):
+        self.id = doc_id
+        self.score = score
+        self._store = store
+
+    @property
+    def text(self) -> str:
+        return self._store.text(self.id)
+
+    @property
+    def metadata(self) -> dict:
+        return self._store.metadata(self.id)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SearchResult):
+            return NotImplemented
+        return (self.id, self.score) == (other.id, other.score)
+
+    def __hash__(self) -> int:
+        return hash((self.id, self.score))
+
+    def __repr__(self) -> str:
+        return f"SearchResult(id={self.id}, score={self.score:.4f})"
@@ -0,0 +1,149 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+
+class IndexJob:
+    """Progress of one background indexing job, updated by the ingestion pipeline."""
+
+    def __init__(self, files: List[str], owner: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.files = list(files)
+        self.owner = owner  # e.g. the session whose index the job writes to
+        self.status = "queued"  # queued -> running -> completed | failed
+        self.stage = "queued"  # queued, parsing, embedding, saving, done
+        self.files_parsed = 0
+        self.files_indexed = 0
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: Optional[dict] = None
+
+    def on_progress(self, event: str, filename: str, chunks: List[str]) -> None:
+        """Matches the IngestionPipeline ``on_progress`` callback."""
+        if event == "parsed":
+            self.files_parsed += 1
+            self.chunks_total += len(chunks)
+            if self.stage == "parsing" and self.chunks_total:
+                self.stage = "embedding"
+        elif event == "embedded":
+            self.chunks_done += len(chunks)
+        elif event == "indexed":
+            self.files_indexed += 1
+
+    def chunks_per_second(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.chunks_done / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time at the current rate; only an estimate while files are still being parsed."""
+        if self.status != "running":
+            return 0.0 if self.status == "completed" else None
+        rate = self.chunks_per_second()
+        if rate <= 0:
+            return None
+        remaining = self.chunks_total - self.chunks_done
+        if self.files_parsed < len(self.files) and self.files_parsed:
+            # Assume unparsed files are as large as the parsed ones
+            remaining += self.chunks_total / self.files_parsed * (len(self.files) - self.files_parsed)
+        return remaining / rate
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "files": self.files,
+            "files_parsed": self.files_parsed,
+            "files_indexed": self.files_indexed,
+            "chunks_total": self.chunks_total,
+            "chunks_done": self.chunks_done,
+            "chunks_per_second": round(self.chunks_per_second(), 2),
+            "eta_seconds": None if self.eta_seconds() is None else round(self.eta_seconds(), 1),
+            "error": self.error,
+            "result": self.result,
+        }
+
+
+JobRunner = Callable[[IndexJob], Awaitable[Optional[dict]]]
+
+
+class IndexJobManager:
+    """
+    Runs indexing jobs on a fixed pool of asyncio workers.
+
+    ``submit`` returns immediately; callers poll ``get(job_id)``. Only the most
+    recent ``max_finished`` finished jobs are kept for polling.
+    """
+
+    def __init__(self, workers: int = 2, max_finished: int = 100):
+        self.workers = max(1, workers)
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, IndexJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, files: List[str], runner: JobRunner, owner: Optional[str] = None) -> IndexJob:
+        if self._queue is None:
+            raise RuntimeError("IndexJobManager.start() has not been called")
+        job = IndexJob(files, owner)
+        self._jobs[job.id] = job
+        self._queue.put_nowait((job, runner))
+        return job
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        return self._jobs.get(job_id)
+
+    def active(self, owner: Optional[str] = None) -> List[IndexJob]:
+        return [
+            job
+            for job in self._jobs.values()
+            if job.status in ("queued", "running") and (owner is None or job.owner == owner)
+        ]
+
+    async def wait(self, job: IndexJob, poll_interval: float = 0.05) -> IndexJob:
+        while job.status in ("queued", "running"):
+            await asyncio.sleep(poll_interval)
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job, runner = await self._queue.get()
+            job.status, job.stage = "running", "parsing"
+            job.started_at = time.time()
+            try:
+                job.result = await runner(job)
+                job.status, job.stage = "completed", "done"
+            except asyncio.CancelledError:
+                job.status, job.error = "failed", "cancelled"
+                raise
+            except Exception as e:
+                print(f"Index job {job.id} failed: {e}")
+                job.status, job.error = "failed", str(e)
+            finally:
+                job.finished_at = time.time()
+                self._prune()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("completed", "failed")]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
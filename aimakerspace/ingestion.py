@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from aimakerspace.text_utils import MultiFileLoader, CharacterTextSplitter, TextSpans, TokenTextSplitter
+from aimakerspace.vectordatabase import VectorDatabase
+
+# Uploads are copied to disk in pieces of this size
+READ_CHUNK_SIZE = 1024 * 1024
+
+_DONE = object()
+
+# Anything with ``split_spans(documents) -> TextSpans``
+Splitter = Union[CharacterTextSplitter, TokenTextSplitter]
+
+# on_progress(event, filename, chunks) with event one of
+# "parsed" (all chunks of the file), "embedded" (a batch now searchable), "indexed" (file finished)
+ProgressCallback = Callable[[str, str, Sequence[str]], None]
+
+
+def load_and_split(
+    path: str,
+    filename: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    pdf_workers: Optional[int] = 1,
+    splitter: Optional[Splitter] = None,
+) -> Tuple[List[str], TextSpans, Dict[str, np.ndarray]]:
+    """
+    Extracts one file and splits it; runs inside an executor.
+
+    Returns (documents, chunks, locations). ``chunks`` are offsets into the
+    documents, so no chunk text is copied until a batch is embedded;
+    ``locations`` holds per-chunk "pages" (1-based, -1 if the format has no
+    pages), "starts" and "ends" (character offsets in the chunk's document).
+    ``splitter`` defaults to a CharacterTextSplitter(chunk_size, chunk_overlap).
+    """
+    loader = MultiFileLoader(pdf_workers=pdf_workers)
+    loader.load_file(path, filename)
+    documents = loader.load_documents()
+    if splitter is None:
+        splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = splitter.split_spans(documents)
+    pages = np.full(len(chunks), -1, dtype=np.int32)
+    for doc_id, page_offsets in enumerate(loader.page_offsets):
+        if page_offsets:
+            rows = chunks.doc_ids == doc_id
+            pages[rows] = np.searchsorted(page_offsets, chunks.starts[rows], side="right")
+    locations = {"pages": pages, "starts": chunks.starts, "ends": chunks.ends}
+    return documents, chunks, locations
+
+
+def timed_load_and_split(*args) -> Tuple[tuple, float]:
+    """``load_and_split`` plus the seconds it took, measured where it ran."""
+    started = time.perf_counter()
+    return load_and_split(*args), time.perf_counter() - started
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's bytes, read in pieces."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def indexed_file_hashes(vector_db: VectorDatabase) -> Dict[str, str]:
+    """Filename -> content hash of every file indexed into ``vector_db``; persisted with its metadata."""
+    return vector_db.metadata.setdefault("file_hashes", {})
+
+
+async def spool_upload(upload, temp_files: List[str]) -> str:
+    """Copies one upload to a temp file in pieces, registering the path before writing."""
+    loop = asyncio.get_running_loop()
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=Path(upload.filename).suffix)
+    temp_files.append(temp_file.name)
+    try:
+        while data := await upload.read(READ_CHUNK_SIZE):
+            await loop.run_in_executor(None, temp_file.write, data)
+    finally:
+        temp_file.close()
+    return temp_file.name
+
+
+async def save_uploads(uploads) -> List[Tuple[str, str]]:
+    """Spools uploads to temp files so they outlive the request. Returns (filename, path) pairs."""
+    saved = []
+    temp_files: List[str] = []
+    try:
+        for upload in uploads:
+            saved.append((upload.filename, await spool_upload(upload, temp_files)))
+    except BaseException:
+        remove_files(temp_files)
+        raise
+    return saved
+
+
+def remove_files(paths) -> None:
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+class IngestionPipeline:
+    """
+    Upload -> extract -> chunk -> embed as three concurrent stages joined by bounded queues.
+
+    While file N's chunks are being embedded, file N+1 is already being parsed
+    and file N+2 written to disk, so a multi-file upload takes roughly as long
+    as its slowest stage rather than the sum of all of them. ``uploads`` are
+    objects with a ``filename`` and an async ``read(size)`` (e.g. FastAPI's
+    ``UploadFile``).
+    """
+
+    def __init__(
+        self,
+        vector_db: VectorDatabase,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        pdf_workers: Optional[int] = 1,
+        queue_size: int = 2,
+        executor: Optional[Executor] = None,
+        embed_batch_size: int = 1024,
+        on_progress: Optional[ProgressCallback] = None,
+        splitter: Optional[Splitter] = None,
+        parse_workers: Optional[int] = 1,
+    ):
+        self.vector_db = vector_db
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.pdf_workers = pdf_workers
+        self.queue_size = queue_size
+        self.executor = executor  # None = the event loop's default thread pool
+        # Chunks are added to the index in slices of this size so search sees partial files
+        self.embed_batch_size = embed_batch_size
+        self.on_progress = on_progress
+        self.splitter = splitter  # None = CharacterTextSplitter(chunk_size, chunk_overlap)
+        # Files parsed at once; above 1 (None = one per core) they run in a process pool
+        self.parse_workers = parse_workers if parse_workers is not None else (os.cpu_count() or 1)
+
+    def _notify(self, event: str, filename: str, chunks: Sequence[str]) -> None:
+        if self.on_progress is not None:
+            self.on_progress(event, filename, chunks)
+
+    async def _save_stage(self, uploads, parse_queue: asyncio.Queue, temp_files: List[str], timings: dict):
+        for upload in uploads:
+            started = time.perf_counter()
+            path = await spool_upload(upload, temp_files)
+            timings["save"] += time.perf_counter() - started
+            await parse_queue.put((upload.filename, path))
+        await parse_queue.put(_DONE)
+
+    async def _feed_saved(self, saved_files, parse_queue: asyncio.Queue):
+        for item in saved_files:
+            await parse_queue.put(item)
+        await parse_queue.put(_DONE)
+
+    async def _parse_stage(self, parse_queue: asyncio.Queue, embed_queue: asyncio.Queue, result: dict, timings: dict):
+        """
+        Parses up to ``parse_workers`` files at once and forwards them in upload order.
+
+        A file that fails to parse is reported in ``result["errors"]`` and
+        skipped; the other files are still indexed.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        pdf_workers = self.pdf_workers
+        owned_executor = None
+        if executor is None and self.parse_workers > 1:
+            executor = owned_executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+            if pdf_workers is None:  # don't run a page pool per file on top of the file pool
+                pdf_workers = max(1, (os.cpu_count() or 1) // self.parse_workers)
+        in_flight = asyncio.Queue(maxsize=max(1, self.parse_workers - 1))
+
+        async def submit():
+            while (item := await parse_queue.get()) is not _DONE:
+                filename, path = item
+                digest = await loop.run_in_executor(None, file_hash, path)
+                hashes = indexed_file_hashes(self.vector_db)
+                original = next((name for name, known in hashes.items() if known == digest), None)
+                if original is not None:
+                    # Already indexed under this or another name: nothing to extract or embed
+                    await in_flight.put((filename, digest, original, None))
+                    continue
+                future = loop.run_in_executor(
+                    executor,
+                    timed_load_and_split,
+                    path,
+                    filename,
+                    self.chunk_size,
+                    self.chunk_overlap,
+                    pdf_workers,
+                    self.splitter,
+                )
+                await in_flight.put((filename, digest, None, future))
+            await in_flight.put(_DONE)
+
+        submitter = asyncio.create_task(submit())
+        try:
+            while (item := await in_flight.get()) is not _DONE:
+                filename, digest, original, future = item
+                if original is not None:
+                    print(f"Skipped {filename}: same content as already indexed {original}")
+                    self._notify("parsed", filename, [])
+                    await embed_queue.put((filename, digest, original, None))
+                    continue
+                try:
+                    (documents, chunks, locations), seconds = await future
+                except Exception as e:
+                    print(f"Failed to parse {filename}: {e}")
+                    result["errors"][filename] = str(e)
+                    continue
+                timings["parse"] += seconds
+                result["file_timings"][filename] = round(seconds, 4)
+                print(f"Parsed {filename} in {seconds:.2f}s: {len(documents)} documents, {len(chunks)} chunks")
+                self._notify("parsed", filename, chunks)
+                await embed_queue.put((filename, digest, None, (documents, chunks, locations)))
+            await submitter
+        finally:
+            submitter.cancel()
+            if owned_executor is not None:
+                owned_executor.shutdown(wait=False, cancel_futures=True)
+        await embed_queue.put(_DONE)
+
+    async def _embed_stage(self, embed_queue: asyncio.Queue, result: dict, timings: dict):
+        skipped = result["skipped"]
+        while (item := await embed_queue.get()) is not _DONE:
+            filename, digest, original, parsed = item
+            if parsed is None:
+                if original != filename:
+                    self.vector_db.add_source_alias(original, filename)
+                indexed_file_hashes(self.vector_db)[filename] = digest
+                skipped["files"][filename] = original
+                self._notify("indexed", filename, [])
+                continue
+            documents, chunks, locations = parsed
+            for start in range(0, len(chunks), self.embed_batch_size):
+                end = start + self.embed_batch_size
+                batch = chunks[start:end]  # the only place chunk text is materialized
+                started = time.perf_counter()
+                embedded = await self.vector_db.aadd_texts(
+                    batch,
+                    source=filename,
+                    pages=locations["pages"][start:end],
+                    starts=locations["starts"][start:end],
+                    ends=locations["ends"][start:end],
+                )
+                timings["embed"] += time.perf_counter() - started
+                skipped["chunks"] += len(batch) - embedded
+                self._notify("embedded", filename, batch)
+                result["chunks"].extend(batch)
+            indexed_file_hashes(self.vector_db)[filename] = digest
+            self._notify("indexed", filename, [])
+            result["documents"] += len(documents)
+            result["file_info"].extend([filename] * len(documents))
+
+    async def run(self, uploads) -> dict:
+        """Runs all stages; returns new chunks, per-document file info and per-stage timings."""
+        temp_files: List[str] = []
+        return await self._run(
+            lambda queue, timings: self._save_stage(uploads, queue, temp_files, timings),
+            temp_files,
+        )
+
+    async def run_saved(self, saved_files: List[Tuple[str, str]]) -> dict:
+        """Like ``run`` for files already spooled by ``save_uploads``; the files are removed afterwards."""
+        return await self._run(
+            lambda queue, timings: self._feed_saved(saved_files, queue),
+            [path for _, path in saved_files],
+        )
+
+    async def _run(self, feed, temp_files: List[str]) -> dict:
+        parse_queue = asyncio.Queue(maxsize=self.queue_size)
+        embed_queue = asyncio.Queue(maxsize=self.queue_size)
+        timings = {"save": 0.0, "parse": 0.0, "embed": 0.0}
+        result = {
+            "documents": 0,
+            "file_info": [],
+            "chunks": [],
+            "timings": timings,  # "parse" is summed over files, so it can exceed "total"
+            "file_timings": {},  # filename -> seconds to extract and split
+            "errors": {},  # filename -> why it could not be parsed
+            # Work avoided by content hashes: files identical to an indexed one (filename -> that
+            # file) and chunks whose text was already stored, which were not embedded again
+            "skipped": {"files": {}, "chunks": 0},
+        }
+
+        started = time.perf_counter()
+        tasks = [
+            asyncio.create_task(feed(parse_queue, timings)),
+            asyncio.create_task(self._parse_stage(parse_queue, embed_queue, result, timings)),
+            asyncio.create_task(self._embed_stage(embed_queue, result, timings)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            remove_files(temp_files)
+
+        timings["total"] = time.perf_counter() - started
+        print(
+            "Ingestion pipeline: "
+            + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+        )
+        return result
@@ -0,0 +1,153 @@
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Words, numbers and identifiers such as ``search_by_text`` or ``hw3``
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Merges ranked id lists: each id scores ``sum(1 / (k + rank))`` over the lists it appears in.
+
+    Returns (id, fused score) pairs, best first. Ties keep the order ids were first seen.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def _int_array(values: np.ndarray) -> array:
+    postings = array("i")
+    postings.frombytes(np.ascontiguousarray(values, dtype=np.int32).tobytes())
+    return postings
+
+
+class LexicalIndex:
+    """
+    In-memory inverted index with Okapi BM25 scoring.
+
+    Chunks are tokenized once, when they are added; each term keeps growable
+    arrays of the ids containing it and the term frequencies. A query touches
+    only the postings of its own terms and needs no embedding call.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._term_ids: Dict[str, int] = {}
+        self._postings_ids: List[array] = []
+        self._postings_tfs: List[array] = []
+        self._lengths = np.zeros(0, dtype=np.int32)  # tokens per id
+        self._size = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        postings = sum(len(ids) for ids in self._postings_ids) * 8
+        return postings + self._lengths[: self._size].nbytes
+
+    def add(self, ids: Sequence[int], texts: Sequence[str]) -> None:
+        """Indexes ``texts`` under ``ids``; ids must be appended in increasing order."""
+        if len(ids) == 0:
+            return
+        needed = int(max(ids)) + 1
+        if needed > len(self._lengths):
+            lengths = np.zeros(max(needed, 2 * len(self._lengths)), dtype=np.int32)
+            lengths[: self._size] = self._lengths[: self._size]
+            self._lengths = lengths
+        for doc_id, text in zip(ids, texts):
+            doc_id = int(doc_id)
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    term_id = len(self._postings_ids)
+                    self._term_ids[term] = term_id
+                    self._postings_ids.append(array("i"))
+                    self._postings_tfs.append(array("i"))
+                self._postings_ids[term_id].append(doc_id)
+                self._postings_tfs[term_id].append(tf)
+            length = sum(counts.values())
+            self._lengths[doc_id] = length
+            self._total_length += length
+        self._size = max(self._size, needed)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every id for ``query`` (0 where no query term occurs)."""
+        scores = np.zeros(self._size, dtype=np.float32)
+        if not self._size:
+            return scores
+        average_length = max(self._total_length / self._size, 1e-9)
+        for term in set(tokenize(query)):
+            term_id = self._term_ids.get(term)
+            if term_id is None or not len(self._postings_ids[term_id]):
+                continue
+            ids = np.frombuffer(self._postings_ids[term_id], dtype=np.int32)
+            tfs = np.frombuffer(self._postings_tfs[term_id], dtype=np.int32).astype(np.float32)
+            idf = math.log(1.0 + (self._size - len(ids) + 0.5) / (len(ids) + 0.5))
+            length_norm = self.k1 * (1.0 - self.b + self.b * self._lengths[ids] / average_length)
+            scores[ids] += idf * tfs * (self.k1 + 1.0) / (tfs + length_norm)
+        return scores
+
+    def compact(self, keep: np.ndarray) -> None:
+        """Keeps ids ``keep`` (old numbering) and renumbers them 0..len(keep)-1."""
+        new_ids = np.full(self._size, -1, dtype=np.int64)
+        new_ids[keep] = np.arange(len(keep))
+        for term_id, postings in enumerate(self._postings_ids):
+            if not len(postings):
+                continue
+            mapped = new_ids[np.frombuffer(postings, dtype=np.int32)]
+            alive = mapped >= 0
+            tfs = np.frombuffer(self._postings_tfs[term_id], dtype=np.int32)
+            self._postings_ids[term_id] = _int_array(mapped[alive])
+            self._postings_tfs[term_id] = _int_array(tfs[alive])
+        self._lengths = np.array(self._lengths[keep], dtype=np.int32)
+        self._size = len(keep)
+        self._total_length = int(self._lengths.sum())
+
+    def config(self) -> dict:
+        return {"k1": self.k1, "b": self.b}
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Postings in CSR form plus the vocabulary as one UTF-8 buffer."""
+        encoded = [term.encode("utf-8") for term in self._term_ids]
+        vocab_offsets = np.concatenate(([0], np.cumsum([len(term) for term in encoded]))).astype(np.int64)
+        counts = [len(postings) for postings in self._postings_ids]
+        return {
+            "vocab": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "vocab_offsets": vocab_offsets,
+            "offsets": np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+            "ids": np.concatenate([np.frombuffer(p, dtype=np.int32) for p in self._postings_ids] or [np.zeros(0, np.int32)]),
+            "tfs": np.concatenate([np.frombuffer(p, dtype=np.int32) for p in self._postings_tfs] or [np.zeros(0, np.int32)]),
+            "lengths": self._lengths[: self._size],
+        }
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        vocab = bytes(state["vocab"])
+        vocab_offsets, offsets = state["vocab_offsets"].tolist(), state["offsets"].tolist()
+        ids, tfs = state["ids"], state["tfs"]
+        self._term_ids = {}
+        self._postings_ids, self._postings_tfs = [], []
+        for term_id in range(len(vocab_offsets) - 1):
+            term = vocab[vocab_offsets[term_id] : vocab_offsets[term_id + 1]].decode("utf-8")
+            self._term_ids[term] = term_id
+            start, end = offsets[term_id], offsets[term_id + 1]
+            self._postings_ids.append(_int_array(ids[start:end]))
+            self._postings_tfs.append(_int_array(tfs[start:end]))
+        self._lengths = np.array(state["lengths"], dtype=np.int32)
+        self._size = len(self._lengths)
+        self._total_length = int(self._lengths.sum())
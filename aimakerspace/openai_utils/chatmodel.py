@@ -1,23 +1,54 @@
 from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+import httpx
 import os
 
 load_dotenv()
 
 
 class ChatOpenAI:
-    def __init__(self, model_name: str = "gpt-4o-mini"):
+    """
+    Chat completion wrapper that owns long-lived sync and async clients, so
+    every call reuses pooled keep-alive connections instead of opening new ones.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "gpt-4o-mini",
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        client: OpenAI = None,
+        async_client: AsyncOpenAI = None,
+    ):
         self.model_name = model_name
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         if self.openai_api_key is None:
             raise ValueError("OPENAI_API_KEY is not set")
 
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        http_timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.client = client or OpenAI(
+            api_key=self.openai_api_key,
+            http_client=httpx.Client(limits=limits, timeout=http_timeout),
+        )
+        # The async pool is bound to the event loop that first uses it
+        self.async_client = async_client or AsyncOpenAI(
+            api_key=self.openai_api_key,
+            http_client=httpx.AsyncClient(limits=limits, timeout=http_timeout),
+        )
+
     def run(self, messages, text_only: bool = True, **kwargs):
         if not isinstance(messages, list):
             raise ValueError("messages must be a list")
 
-        client = OpenAI()
-        response = client.chat.completions.create(
+        response = self.client.chat.completions.create(
             model=self.model_name, messages=messages, **kwargs
         )
 
@@ -25,14 +56,12 @@ class ChatOpenAI:
             return response.choices[0].message.content
 
         return response
-    
+
     async def astream(self, messages, **kwargs):
         if not isinstance(messages, list):
             raise ValueError("messages must be a list")
-        
-        client = AsyncOpenAI()
 
-        stream = await client.chat.completions.create(
+        stream = await self.async_client.chat.completions.create(
             model=self.model_name,
             messages=messages,
             stream=True,
@@ -43,3 +72,9 @@ class ChatOpenAI:
             content = chunk.choices[0].delta.content
             if content is not None:
                 yield content
+
+    def close(self):
+        self.client.close()
+
+    async def aclose(self):
+        await self.async_client.close()
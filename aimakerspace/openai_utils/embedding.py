@@ -1,17 +1,71 @@
 from dotenv import load_dotenv
 from openai import AsyncOpenAI, OpenAI
 import openai
-from typing import List
+from typing import List, Optional, Tuple
 import os
 import asyncio
+import random
+import time
+
+from aimakerspace.openai_utils.embedding_cache import EmbeddingCache
+
+# Per-request limits of the embeddings endpoint (2048 inputs, ~300k tokens),
+# kept with some headroom because token counts below are estimated.
+MAX_BATCH_SIZE = 2048
+MAX_BATCH_TOKENS = 250_000
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-bound token estimate used for batching (no tokenizer needed)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def make_batches(
+    list_of_text: List[str], max_batch_size: int, max_batch_tokens: int
+) -> List[Tuple[int, int]]:
+    """Splits the input into contiguous [start, end) ranges bounded by item count and token budget."""
+    batches = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(list_of_text):
+        text_tokens = estimate_tokens(text)
+        if i > start and (i - start >= max_batch_size or tokens + text_tokens > max_batch_tokens):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += text_tokens
+    if start < len(list_of_text):
+        batches.append((start, len(list_of_text)))
+    return batches
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying."""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
 
 
 class EmbeddingModel:
-    def __init__(self, embeddings_model_name: str = "text-embedding-3-small"):
+    def __init__(
+        self,
+        embeddings_model_name: str = "text-embedding-3-small",
+        max_batch_size: int = 512,
+        max_batch_tokens: int = MAX_BATCH_TOKENS,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        retry_base_delay: float = 0.5,
+        cache: Optional[EmbeddingCache] = None,
+        async_client: Optional[AsyncOpenAI] = None,
+        client: Optional[OpenAI] = None,
+    ):
         load_dotenv()
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.async_client = AsyncOpenAI()
-        self.client = OpenAI()
+        # Callers may pass long-lived clients so connection pools are shared
+        self.async_client = async_client or AsyncOpenAI()
+        self.client = client or OpenAI()
 
         if self.openai_api_key is None:
             raise ValueError(
@@ -19,14 +73,111 @@ class EmbeddingModel:
             )
         openai.api_key = self.openai_api_key
         self.embeddings_model_name = embeddings_model_name
+        self.max_batch_size = min(max_batch_size, MAX_BATCH_SIZE)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.last_throughput = None  # texts per second of the most recent batched call
+        self.cache = cache
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.retry_base_delay * (2 ** attempt) * (1 + random.random() * 0.25)
+
+    def _report_throughput(self, count: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.last_throughput = count / elapsed if elapsed > 0 else float("inf")
+        print(f"Embedded {count} texts in {elapsed:.2f}s ({self.last_throughput:.1f} texts/s)")
+
+    async def _aembed_batch(self, batch: List[str]) -> List[List[float]]:
+        # Retries are handled here, so the client's own retry loop is disabled
+        client = self.async_client.with_options(max_retries=0)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.embeddings.create(
+                    input=batch, model=self.embeddings_model_name
+                )
+                return [embeddings.embedding for embeddings in response.data]
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                await asyncio.sleep(self._backoff_delay(attempt, e))
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        client = self.client.with_options(max_retries=0)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = client.embeddings.create(
+                    input=batch, model=self.embeddings_model_name
+                )
+                return [embeddings.embedding for embeddings in response.data]
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                time.sleep(self._backoff_delay(attempt, e))
+
+    def _lookup_cache(self, list_of_text: List[str]) -> Tuple[List[Optional[List[float]]], List[str]]:
+        """Returns cached vectors (None where missing) and the unique texts that still need the API."""
+        if self.cache is None:
+            return [None] * len(list_of_text), list(list_of_text)
+        results = self.cache.get_many(self.embeddings_model_name, list_of_text)
+        missing = list(dict.fromkeys(
+            text for text, result in zip(list_of_text, results) if result is None
+        ))
+        return results, missing
+
+    def _fill_from_api(
+        self,
+        results: List[Optional[List[float]]],
+        list_of_text: List[str],
+        missing: List[str],
+        fetched: List[List[float]],
+    ) -> List[List[float]]:
+        if self.cache is None:
+            return fetched
+        self.cache.put_many(self.embeddings_model_name, missing, fetched)
+        by_text = dict(zip(missing, fetched))
+        return [
+            result if result is not None else by_text[text]
+            for text, result in zip(list_of_text, results)
+        ]
+
+    async def _aembed_all(self, list_of_text: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        batches = make_batches(list_of_text, self.max_batch_size, self.max_batch_tokens)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: List[List[float]] = [None] * len(list_of_text)
+
+        async def run(start: int, end: int) -> None:
+            async with semaphore:
+                results[start:end] = await self._aembed_batch(list_of_text[start:end])
+
+        await asyncio.gather(*(run(start, end) for start, end in batches))
+        self._report_throughput(len(list_of_text), started)
+        return results
 
     async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        embedding_response = await self.async_client.embeddings.create(
-            input=list_of_text, model=self.embeddings_model_name
+        if not list_of_text:
+            return []
+        # The SQLite cache does blocking disk I/O, so it is read and written from a worker thread
+        loop = asyncio.get_running_loop()
+        results, missing = await loop.run_in_executor(None, self._lookup_cache, list_of_text)
+        if not missing:
+            return results
+        fetched = await self._aembed_all(missing)
+        return await loop.run_in_executor(
+            None, self._fill_from_api, results, list_of_text, missing, fetched
         )
 
-        return [embeddings.embedding for embeddings in embedding_response.data]
-
     async def async_get_embedding(self, text: str) -> List[float]:
         embedding = await self.async_client.embeddings.create(
             input=text, model=self.embeddings_model_name
@@ -34,12 +185,22 @@ class EmbeddingModel:
 
         return embedding.data[0].embedding
 
-    def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        embedding_response = self.client.embeddings.create(
-            input=list_of_text, model=self.embeddings_model_name
-        )
+    def _embed_all(self, list_of_text: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        results: List[List[float]] = []
+        for start, end in make_batches(list_of_text, self.max_batch_size, self.max_batch_tokens):
+            results.extend(self._embed_batch(list_of_text[start:end]))
+        self._report_throughput(len(list_of_text), started)
+        return results
 
-        return [embeddings.embedding for embeddings in embedding_response.data]
+    def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        if not list_of_text:
+            return []
+        results, missing = self._lookup_cache(list_of_text)
+        if not missing:
+            return results
+        fetched = self._embed_all(missing)
+        return self._fill_from_api(results, list_of_text, missing, fetched)
 
     def get_embedding(self, text: str) -> List[float]:
         embedding = self.client.embeddings.create(
@@ -0,0 +1,70 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Storage precisions for the unit-normalized embedding matrix
+PRECISIONS = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def check_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}. Available: {', '.join(PRECISIONS)}")
+    return precision
+
+
+def quantize(unit_rows: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Converts float32 unit rows to the storage precision.
+
+    Returns (codes, scales). ``int8`` uses one scale per row so that the
+    largest component maps to +-127; the other precisions have no scales.
+    """
+    if precision != "int8":
+        return unit_rows.astype(PRECISIONS[check_precision(precision)]), None
+    peaks = np.abs(unit_rows).max(axis=1) if unit_rows.shape[1] else np.zeros(len(unit_rows))
+    scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+    codes = np.rint(unit_rows / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    rows = np.asarray(codes, dtype=np.float32)
+    if scales is not None:
+        rows = rows * scales[:, None]
+    return rows
+
+
+def dot_scores(codes: np.ndarray, query: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """Dot products of a float32 query with stored rows of any precision."""
+    if codes.dtype != np.float32:
+        codes = codes.astype(np.float32)
+    scores = codes @ query
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+def bytes_per_vector(dim: int, precision: str) -> int:
+    """Stored bytes per row: the codes, the original norm and (int8) the scale."""
+    itemsize = np.dtype(PRECISIONS[check_precision(precision)]).itemsize
+    return dim * itemsize + 4 + (4 if precision == "int8" else 0)
+
+
+def pack_signs(vectors: np.ndarray) -> np.ndarray:
+    """One bit per dimension (set when the component is positive), packed into bytes."""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray, block: int = 65536) -> np.ndarray:
+    """Number of differing sign bits between each packed row and the packed query."""
+    distances = np.empty(len(codes), dtype=np.int32)
+    for start in range(0, len(codes), block):
+        diff = codes[start : start + block] ^ query_code
+        if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+            bits = np.bitwise_count(diff)
+        else:
+            bits = _POPCOUNT[diff]
+        distances[start : start + block] = bits.sum(axis=1, dtype=np.int32)
+    return distances
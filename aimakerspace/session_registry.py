@@ -0,0 +1,250 @@
+import asyncio
+import os
+import re
+import shutil
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from aimakerspace.vectordatabase import VectorDatabase
+
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class Session:
+    """One session's index and uploaded file list; ``vector_db`` is None while empty or evicted."""
+
+    def __init__(self, session_id: str, path: str):
+        self.id = session_id
+        self.path = path
+        self.vector_db: Optional[VectorDatabase] = None
+        self.files: List[str] = []
+        self.resident = False
+        self.dirty = False  # changed since it was last saved to ``path``
+        self.pins = 0  # requests and jobs using the index; pinned sessions are never evicted
+        self.bytes = 0  # ``nbytes`` when the registry last measured it
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()  # serializes compaction, saves and clearing
+
+    @property
+    def nbytes(self) -> int:
+        """RAM held by the index and its texts; memory-mapped files paged in from disk are not counted."""
+        return self.vector_db.resident_nbytes if self.vector_db is not None else 0
+
+    def chunk_count(self) -> int:
+        return len(self.vector_db) if self.vector_db is not None else 0
+
+    async def save(self) -> None:
+        """Writes the index to ``path`` in a worker thread; only new rows are appended to its files."""
+        async with self.lock:
+            await self._save()
+
+    async def _save(self) -> None:
+        if self.vector_db is None:
+            return
+        self.vector_db.metadata["files"] = list(self.files)
+        self.dirty = False  # changes made while the files are written mark it dirty again
+        try:
+            await self.vector_db.asave(self.path)
+        except Exception:
+            self.dirty = True
+            raise
+
+    async def compact_and_save(self, target_db: VectorDatabase) -> None:
+        """Compacts ``target_db`` if enough of it is deleted, then saves it, unless the session moved on."""
+        async with self.lock:  # a locked session is not evicted
+            if self.vector_db is not target_db:
+                return  # the session was cleared or evicted (and saved) in the meantime
+            if target_db.needs_compaction:
+                await target_db.acompact()
+            if self.vector_db is target_db:
+                await self._save()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "resident": self.resident,
+            "files": len(self.files),
+            "chunks": self.chunk_count(),
+            "bytes": self.nbytes,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+        }
+
+
+class SessionRegistry:
+    """
+    Per-session vector indexes under one memory budget.
+
+    Sessions stay resident in least-recently-used order. When the resident
+    indexes exceed ``memory_budget_bytes``, or a session has been idle for
+    ``idle_seconds``, it is dropped from memory and, if changed, written to
+    ``root/<session id>`` in the background; the next ``get`` memory-maps it
+    back in. Sessions pinned by a running request or indexing job are never
+    evicted.
+
+    The budget covers the RAM each index holds (``Session.nbytes``: vectors,
+    index structures, BM25 postings and chunk texts). An index paged back in
+    stays memory-mapped and counts for little until it is written to. A
+    session is re-measured whenever it is fetched or unpinned.
+
+    The registry is not thread-safe; use it from the event loop.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        load_db: Callable[[str], VectorDatabase],
+        memory_budget_bytes: int = 1 << 30,
+        idle_seconds: Optional[float] = 1800,
+        paths: Optional[Dict[str, str]] = None,
+    ):
+        self.root = root
+        self.load_db = load_db
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_seconds = idle_seconds
+        self.paths = dict(paths or {})  # fixed locations for particular sessions, e.g. the legacy index
+        self.evictions = 0
+        self.loads = 0
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()  # resident sessions, least recently used first
+        self._loading: Dict[str, asyncio.Future] = {}  # session id -> page-in in progress
+        self._saving: Dict[str, asyncio.Task] = {}  # session id -> write of an evicted session
+
+    def path_for(self, session_id: str) -> str:
+        return self.paths.get(session_id) or os.path.join(self.root, session_id)
+
+    async def get(self, session_id: str) -> Session:
+        """Returns the session, paging its index back in from disk if it was evicted."""
+        if not SESSION_ID_PATTERN.match(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        session = self._sessions.get(session_id)
+        if session is None:
+            loading = self._loading.get(session_id)
+            if loading is None:
+                loading = self._loading[session_id] = asyncio.ensure_future(self._page_in(session_id))
+                loading.add_done_callback(lambda _: self._loading.pop(session_id, None))
+            session = await asyncio.shield(loading)
+        self._sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        session.bytes = session.nbytes
+        self.enforce_budget(keep=session)
+        return session
+
+    async def _page_in(self, session_id: str) -> Session:
+        saving = self._saving.get(session_id)
+        if saving is not None:
+            await asyncio.shield(saving)  # still writing out its last eviction
+        session = Session(session_id, self.path_for(session_id))
+        if VectorDatabase.exists(session.path):
+            try:
+                loop = asyncio.get_running_loop()
+                session.vector_db = await loop.run_in_executor(None, self.load_db, session.path)
+                session.files = list(session.vector_db.metadata.get("files", []))
+                self.loads += 1
+                print(f"Paged in session {session.id}: {session.chunk_count()} chunks, {len(session.files)} files")
+            except Exception as e:
+                print(f"Could not load session {session.id} from {session.path}: {e}")
+        session.resident = True
+        self._sessions[session_id] = session
+        return session
+
+    def pin(self, session: Session) -> None:
+        session.pins += 1
+
+    def unpin(self, session: Session) -> None:
+        session.pins -= 1
+        session.last_used = time.monotonic()
+        session.bytes = session.nbytes
+        self.enforce_budget(keep=session)
+
+    @contextmanager
+    def pinned(self, session: Session):
+        self.pin(session)
+        try:
+            yield session
+        finally:
+            self.unpin(session)
+
+    def evict(self, session: Session) -> bool:
+        """
+        Drops a session from memory; stale references see ``resident`` False. A changed
+        index is written out by a background task that a later ``get`` waits for.
+        """
+        if session.pins or not session.resident or session.lock.locked():
+            return False
+        if session.dirty and session.vector_db is not None:
+            session.vector_db.metadata["files"] = list(session.files)
+            self._saving[session.id] = asyncio.ensure_future(
+                self._write_evicted(session.id, session.vector_db, session.path)
+            )
+        session.vector_db = None
+        session.files = []
+        session.resident = False
+        del self._sessions[session.id]
+        self.evictions += 1
+        print(f"Evicted session {session.id} to {session.path}")
+        return True
+
+    async def _write_evicted(self, session_id: str, vector_db: VectorDatabase, path: str) -> None:
+        try:
+            await vector_db.asave(path)
+        except Exception as e:
+            print(f"Could not save evicted session {session_id} to {path}: {e}")
+        finally:
+            self._saving.pop(session_id, None)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(session.bytes for session in self._sessions.values())
+
+    def enforce_budget(self, keep: Optional[Session] = None) -> int:
+        """Evicts least recently used sessions (other than ``keep``) until the resident indexes fit the budget."""
+        evicted = 0
+        total = self.resident_bytes
+        for session in list(self._sessions.values()):
+            if total <= self.memory_budget_bytes:
+                break
+            if session is keep:
+                continue
+            size = session.bytes
+            if self.evict(session):
+                total -= size
+                evicted += 1
+        return evicted
+
+    def evict_idle(self) -> int:
+        if self.idle_seconds is None:
+            return 0
+        cutoff = time.monotonic() - self.idle_seconds
+        return sum(
+            self.evict(session) for session in list(self._sessions.values()) if session.last_used < cutoff
+        )
+
+    async def clear(self, session: Session) -> None:
+        """Forgets a session's index in memory and on disk; running jobs see ``vector_db`` change."""
+        async with session.lock:  # not while a save is writing into the directory
+            session.vector_db = None
+            session.files = []
+            session.dirty = False
+            session.bytes = 0
+            shutil.rmtree(session.path, ignore_errors=True)
+
+    async def close(self) -> None:
+        """Saves every changed resident session and waits for eviction writes, e.g. on shutdown."""
+        for session in list(self._sessions.values()):
+            if session.dirty:
+                await session.save()
+        if self._saving:
+            await asyncio.gather(*self._saving.values(), return_exceptions=True)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def stats(self) -> dict:
+        return {
+            "resident": len(self._sessions),
+            "resident_bytes": self.resident_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
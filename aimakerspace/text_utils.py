@@ -1,14 +1,111 @@
+import codecs
+import math
+import mmap
 import os
-from typing import List
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.etree import ElementTree
+
+import numpy as np
 import PyPDF2
 from docx import Document
 
 
+# Bytes read to pick an encoding; the rest of the file is decoded once with it
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),  # before UTF-16 LE, whose BOM is its prefix
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Guesses the encoding of a file from its first bytes.
+
+    A byte order mark wins; otherwise NUL bytes in alternating positions mean
+    BOM-less UTF-16, valid UTF-8 (ignoring a sequence cut off by the end of the
+    sample) means UTF-8, and anything else is cp1252, or latin-1 if the sample
+    has bytes cp1252 leaves undefined.
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if sample.count(0) > len(sample) // 4:
+        even_nuls = sample[0::2].count(0)
+        return "utf-16-be" if even_nuls > sample[1::2].count(0) else "utf-16-le"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def read_text(path: str, encoding: Optional[str] = None) -> str:
+    """
+    Decodes a whole file in a single pass over a memory map, without a bytes copy.
+
+    The encoding is detected from the first ``ENCODING_SAMPLE_SIZE`` bytes
+    unless given; undecodable bytes are dropped.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            encoding = encoding or detect_encoding(data[:ENCODING_SAMPLE_SIZE])
+            with memoryview(data) as view:
+                return codecs.decode(view, encoding, "ignore")
+
+
+def iter_text(path: str, encoding: Optional[str] = None, block_size: int = 1024 * 1024) -> Iterator[str]:
+    """Yields a file's text in decoded pieces of about ``block_size`` bytes, for streaming consumers."""
+    with open(path, "rb") as f:
+        sample = f.read(ENCODING_SAMPLE_SIZE)
+        decoder = codecs.getincrementaldecoder(encoding or detect_encoding(sample))("ignore")
+        while sample:
+            text = decoder.decode(sample)
+            if text:
+                yield text
+            sample = f.read(block_size)
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+def _read_text_or_none(file_path: str, encoding: Optional[str]) -> Optional[str]:
+    """Reads one file for ``TextFileLoader.load_directory``; unreadable files are reported and skipped."""
+    try:
+        return read_text(file_path, encoding)
+    except (OSError, LookupError) as e:
+        print(f"Could not read {file_path}: {e}")
+        return None
+
+
 class TextFileLoader:
-    def __init__(self, path: str, encoding: str = "utf-8"):
+    """
+    Loads .txt files, detecting each file's encoding from a small sample.
+
+    ``encoding`` forces one encoding for every file. With ``workers > 1`` (None:
+    one per core) a directory's files are decoded on a process pool; documents
+    are kept in ``os.walk`` order either way.
+    """
+
+    def __init__(self, path: str, encoding: Optional[str] = None, workers: Optional[int] = 1):
         self.documents = []
         self.path = path
         self.encoding = encoding
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
 
     def load(self):
         print(f"TextFileLoader.load() called for path: {self.path}")
@@ -26,71 +123,61 @@ class TextFileLoader:
             )
 
     def load_file(self):
-        # Try multiple encodings to handle problematic files
-        encodings_to_try = ['utf-8', 'utf-16', 'utf-16-le', 'utf-16-be', 'latin-1', 'cp1252']
-        
-        for encoding in encodings_to_try:
-            try:
-                with open(self.path, "r", encoding=encoding) as f:
-                    content = f.read()
-                    # Clean up any problematic characters
-                    content = content.encode('utf-8', errors='ignore').decode('utf-8')
-                    self.documents.append(content)
-                    return
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                print(f"Error reading file with {encoding} encoding: {e}")
-                continue
-        
-        # If all encodings fail, try binary mode and decode with errors='ignore'
         try:
-            with open(self.path, "rb") as f:
-                content = f.read().decode('utf-8', errors='ignore')
-                self.documents.append(content)
-        except Exception as e:
-            raise ValueError(f"Could not read file {self.path} with any encoding: {e}")
+            self.documents.append(read_text(self.path, self.encoding))
+        except (OSError, LookupError) as e:
+            raise ValueError(f"Could not read file {self.path}: {e}")
 
     def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.endswith(".txt"):
-                    try:
-                        file_path = os.path.join(root, file)
-                        # Try multiple encodings for each file
-                        encodings_to_try = ['utf-8', 'utf-16', 'utf-16-le', 'utf-16-be', 'latin-1', 'cp1252']
-                        
-                        for encoding in encodings_to_try:
-                            try:
-                                with open(file_path, "r", encoding=encoding) as f:
-                                    content = f.read()
-                                    # Clean up any problematic characters
-                                    content = content.encode('utf-8', errors='ignore').decode('utf-8')
-                                    self.documents.append(content)
-                                    break
-                            except UnicodeDecodeError:
-                                continue
-                            except Exception as e:
-                                print(f"Error reading {file_path} with {encoding} encoding: {e}")
-                                continue
-                        else:
-                            # If all encodings fail, try binary mode
-                            try:
-                                with open(file_path, "rb") as f:
-                                    content = f.read().decode('utf-8', errors='ignore')
-                                    self.documents.append(content)
-                            except Exception as e:
-                                print(f"Could not read {file_path}: {e}")
-                                continue
-                    except Exception as e:
-                        print(f"Error processing {file}: {e}")
-                        continue
+        file_paths = [
+            os.path.join(root, file)
+            for root, _, files in os.walk(self.path)
+            for file in files
+            if file.endswith(".txt")
+        ]
+        encodings = [self.encoding] * len(file_paths)
+        workers = max(1, min(self.workers, len(file_paths)))
+        if workers == 1:
+            contents = list(map(_read_text_or_none, file_paths, encodings))
+        else:
+            # Decoding holds the GIL, so only separate processes read files in parallel
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                contents = list(executor.map(_read_text_or_none, file_paths, encodings, chunksize=16))
+        self.documents.extend(content for content in contents if content is not None)
 
     def load_documents(self):
         self.load()
         return self.documents
 
 
+class TextSpans(Sequence):
+    """
+    Chunks stored as [start, end) character offsets into their documents.
+
+    ``doc_ids``, ``starts`` and ``ends`` are parallel NumPy arrays; no chunk
+    text exists until it is read, and indexing or slicing returns freshly
+    sliced strings (``spans[i:j]`` is a list), so consumers can materialize
+    one batch at a time.
+    """
+
+    def __init__(self, documents: Sequence[str], doc_ids: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+        self.documents = documents
+        self.doc_ids = doc_ids
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.documents[self.doc_ids[index]][self.starts[index] : self.ends[index]]
+
+    def spans(self) -> Iterator[Tuple[int, int, int]]:
+        return zip(self.doc_ids.tolist(), self.starts.tolist(), self.ends.tolist())
+
+
 class CharacterTextSplitter:
     def __init__(
         self,
@@ -110,17 +197,242 @@ class CharacterTextSplitter:
             chunks.append(text[i : i + self.chunk_size])
         return chunks
 
+    def split_with_offsets(self, text: str) -> List[Tuple[str, int, int]]:
+        """Like ``split`` but also returns each chunk's [start, end) character offsets."""
+        step = self.chunk_size - self.chunk_overlap
+        return [
+            (text[i : i + self.chunk_size], i, min(i + self.chunk_size, len(text)))
+            for i in range(0, len(text), step)
+        ]
+
+    def iter_spans(self, texts: Iterable[str]) -> Iterator[Tuple[int, int, int]]:
+        """Lazily yields (doc_id, start, end) for every chunk; nothing is copied, texts may be a stream."""
+        step = self.chunk_size - self.chunk_overlap
+        for doc_id, text in enumerate(texts):
+            length = len(text)
+            for start in range(0, length, step):
+                yield doc_id, start, min(start + self.chunk_size, length)
+
+    def span_arrays(self, lengths: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(doc_ids, starts, ends) of every chunk of documents with these character lengths, without a Python loop."""
+        step = self.chunk_size - self.chunk_overlap
+        lengths = np.asarray(lengths, dtype=np.int64)
+        counts = -(-lengths // step)  # ceil; empty documents have no chunks
+        doc_ids = np.repeat(np.arange(len(lengths), dtype=np.int64), counts)
+        first = np.cumsum(counts) - counts  # index of each document's first chunk
+        starts = (np.arange(len(doc_ids), dtype=np.int64) - first[doc_ids]) * step
+        ends = np.minimum(starts + self.chunk_size, lengths[doc_ids])
+        return doc_ids, starts, ends
+
+    def split_spans(self, texts: Sequence[str]) -> TextSpans:
+        """Chunks of ``texts`` as offsets; the text of a chunk is sliced only when it is read."""
+        return TextSpans(texts, *self.span_arrays([len(text) for text in texts]))
+
     def split_texts(self, texts: List[str]) -> List[str]:
-        chunks = []
-        for text in texts:
-            chunks.extend(self.split(text))
-        return chunks
+        return list(self.split_spans(texts))
+
+
+# Code points treated as whitespace by the boundary pass
+_WHITESPACE = np.array([ord(c) for c in " \t\n\r\x0b\x0c\xa0\u2028\u2029"], dtype=np.uint32)
+_SENTENCE_END = np.array([ord(c) for c in ".!?;:\u3002"], dtype=np.uint32)
+
+# Boundary strengths, strongest first when choosing where to cut
+WORD, LINE, SENTENCE, PARAGRAPH = 0, 1, 2, 3
+
+
+def find_boundaries(text: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Candidate cut points of ``text`` in one vectorized pass over its code points.
+
+    Returns (cuts, trims, levels): ``cuts`` are the offsets where a word starts
+    after whitespace, ``trims`` where that whitespace run starts (a chunk ending
+    at the cut ends there instead) and ``levels`` the boundary strength: a blank
+    line is a PARAGRAPH, whitespace after sentence punctuation a SENTENCE, a
+    single newline a LINE and anything else a WORD.
+    """
+    codes = np.frombuffer(text.encode("utf-32-le", errors="surrogatepass"), dtype=np.uint32)
+    if len(codes) < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty.astype(np.int8)
+    space = np.isin(codes, _WHITESPACE)
+    cuts = np.flatnonzero(space[:-1] & ~space[1:]) + 1
+    run_starts = np.flatnonzero(~space[:-1] & space[1:]) + 1
+    if space[0]:
+        run_starts = np.concatenate(([0], run_starts))
+    trims = run_starts[np.searchsorted(run_starts, cuts, side="right") - 1]
+
+    newlines = np.concatenate(([0], np.cumsum(codes == 10)))
+    newlines_in_run = newlines[cuts] - newlines[trims]
+    after_punctuation = np.isin(codes[np.maximum(trims - 1, 0)], _SENTENCE_END) & (trims > 0)
+    levels = np.full(len(cuts), WORD, dtype=np.int8)
+    levels[newlines_in_run == 1] = LINE
+    levels[after_punctuation] = SENTENCE
+    levels[newlines_in_run >= 2] = PARAGRAPH
+    return cuts.astype(np.int64), trims.astype(np.int64), levels
+
+
+def estimate_chars_per_token(texts: Sequence[str], count_tokens: Callable[[str], int]) -> float:
+    """Calibrates the splitter's estimator against a real tokenizer, e.g. ``lambda t: len(enc.encode(t))``."""
+    tokens = sum(count_tokens(text) for text in texts)
+    return sum(len(text) for text in texts) / tokens if tokens else TokenTextSplitter.CHARS_PER_TOKEN
+
+
+class TokenTextSplitter:
+    """
+    Packs whole paragraphs and sentences into chunks of at most ``chunk_tokens`` tokens.
+
+    Token counts are estimated as characters / ``chars_per_token`` (about 4 for
+    English with OpenAI tokenizers; see ``estimate_chars_per_token``), so no
+    tokenizer runs per chunk. Each chunk is cut at the strongest boundary
+    between ``min_fill`` and 100% of the budget, preferring the later one on
+    ties, and a word is only split when it alone exceeds the budget. Chunks
+    carry no leading or trailing whitespace; ``chunk_overlap_tokens`` repeats
+    the tail of a chunk, starting on a word, at the head of the next.
+    """
+
+    CHARS_PER_TOKEN = 4.0
+
+    def __init__(
+        self,
+        chunk_tokens: int = 256,
+        chunk_overlap_tokens: int = 0,
+        chars_per_token: float = CHARS_PER_TOKEN,
+        min_fill: float = 0.5,
+    ):
+        assert (
+            chunk_tokens > chunk_overlap_tokens
+        ), "Chunk size must be greater than chunk overlap"
+
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap_tokens = chunk_overlap_tokens
+        self.chars_per_token = chars_per_token
+        self.min_fill = min_fill
+        self.max_chars = max(1, int(chunk_tokens * chars_per_token))
+        self.overlap_chars = int(chunk_overlap_tokens * chars_per_token)
+
+    def estimate_tokens(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def spans(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """[start, end) offsets of the chunks of one document."""
+        cuts, trims, levels = find_boundaries(text)
+        length = len(text)
+        stripped = len(text.rstrip())
+        start = length - len(text.lstrip())
+        min_chars = int(self.max_chars * self.min_fill)
+        starts, ends = [], []
+        while start < stripped:
+            limit = start + self.max_chars
+            if limit >= stripped:
+                starts.append(start)
+                ends.append(stripped)
+                break
+            low = np.searchsorted(cuts, start + max(min_chars, 1), side="left")
+            # A cut at ``c`` ends the chunk at trims <= c; the chunk must fit, so bound by trims
+            high = np.searchsorted(trims, limit, side="right")
+            if high <= low:  # no boundary in the upper part of the budget: take the last one at all
+                low = np.searchsorted(cuts, start, side="right")
+            if high > low:
+                window = levels[low:high]
+                best = low + len(window) - 1 - int(np.argmax(window[::-1]))
+                end, next_start = int(trims[best]), int(cuts[best])
+            else:  # a single word longer than the budget
+                end = next_start = limit
+            starts.append(start)
+            ends.append(end)
+            if self.overlap_chars:
+                back = np.searchsorted(cuts, end - self.overlap_chars, side="left")
+                if back < len(cuts) and start < cuts[back] < next_start:
+                    next_start = int(cuts[back])
+            start = next_start
+        return np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+
+    def split(self, text: str) -> List[str]:
+        starts, ends = self.spans(text)
+        return [text[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+    def split_with_offsets(self, text: str) -> List[Tuple[str, int, int]]:
+        starts, ends = self.spans(text)
+        return [(text[start:end], start, end) for start, end in zip(starts.tolist(), ends.tolist())]
+
+    def iter_spans(self, texts: Iterable[str]) -> Iterator[Tuple[int, int, int]]:
+        for doc_id, text in enumerate(texts):
+            starts, ends = self.spans(text)
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                yield doc_id, start, end
+
+    def split_spans(self, texts: Sequence[str]) -> TextSpans:
+        per_document = [self.spans(text) for text in texts]
+        counts = [len(starts) for starts, _ in per_document]
+        doc_ids = np.repeat(np.arange(len(texts), dtype=np.int64), counts)
+        empty = np.zeros(0, dtype=np.int64)
+        starts = np.concatenate([starts for starts, _ in per_document] or [empty])
+        ends = np.concatenate([ends for _, ends in per_document] or [empty])
+        return TextSpans(texts, doc_ids, starts, ends)
+
+    def split_texts(self, texts: List[str]) -> List[str]:
+        return list(self.split_spans(texts))
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """Extracts pages [start, end) of a PDF. Module-level so process pools can pickle it."""
+    page_texts = []
+    with open(path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_number in range(start, end):
+            try:
+                page_text = pdf_reader.pages[page_number].extract_text() or ""
+                # Clean up any problematic characters
+                page_texts.append(page_text.encode('utf-8', errors='ignore').decode('utf-8'))
+            except Exception as e:
+                print(f"Error extracting text from PDF page {page_number}: {e}")
+                page_texts.append("")
+    return page_texts
+
+
+def _split_range(count: int, parts: int) -> List[Tuple[int, int]]:
+    """Splits range(count) into at most `parts` contiguous, nearly equal [start, end) ranges."""
+    parts = max(1, min(parts, count))
+    step, extra = divmod(count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + step + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def join_pages(page_texts: List[str]) -> Tuple[str, List[int]]:
+    """Joins page texts in order with a single join and returns each page's start offset."""
+    offsets = []
+    parts = []
+    position = 0
+    for page_text in page_texts:
+        offsets.append(position)
+        if page_text:
+            parts.append(page_text)
+            position += len(page_text) + 1
+    text = "\n".join(parts) + "\n" if parts else ""
+    return text, offsets
 
 
 class PDFLoader:
-    def __init__(self, path: str):
+    """
+    Extracts the text of PDF files page by page.
+
+    With ``workers > 1`` PDFs of at least ``parallel_min_pages`` pages are
+    split into contiguous page ranges that are extracted in a process pool.
+    ``page_offsets`` holds, per document, the character offset where each
+    page starts.
+    """
+
+    def __init__(self, path: str, workers: Optional[int] = 1, parallel_min_pages: int = 64):
         self.documents = []
+        self.page_offsets = []
         self.path = path
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.parallel_min_pages = parallel_min_pages
         print(f"PDFLoader initialized with path: {self.path}")
 
     def load(self):
@@ -143,59 +455,154 @@ class PDFLoader:
         except Exception as e:
             raise ValueError(f"Error processing file at '{self.path}': {str(e)}")
 
+    def extract_pages(self, path: str) -> List[str]:
+        """Returns the text of every page in order, using a process pool for large PDFs."""
+        with open(path, 'rb') as file:
+            page_count = len(PyPDF2.PdfReader(file).pages)
+
+        if self.workers <= 1 or page_count < self.parallel_min_pages:
+            return _extract_page_range(path, 0, page_count)
+
+        ranges = _split_range(page_count, self.workers)
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(_extract_page_range, path, start, end) for start, end in ranges]
+            page_texts = []
+            for future in futures:
+                page_texts.extend(future.result())
+        return page_texts
+
     def load_file(self):
         try:
-            with open(self.path, 'rb') as file:
-                # Create PDF reader object
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                # Extract text from each page
-                text = ""
-                for page in pdf_reader.pages:
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            # Clean up any problematic characters
-                            page_text = page_text.encode('utf-8', errors='ignore').decode('utf-8')
-                            text += page_text + "\n"
-                    except Exception as e:
-                        print(f"Error extracting text from PDF page: {e}")
-                        continue
-                
-                if text.strip():
-                    self.documents.append(text)
-                else:
-                    print(f"Warning: No text extracted from PDF {self.path}")
-                    self.documents.append("")  # Add empty string to maintain structure
+            text, offsets = join_pages(self.extract_pages(self.path))
+            
+            if text.strip():
+                self.documents.append(text)
+            else:
+                print(f"Warning: No text extracted from PDF {self.path}")
+                self.documents.append("")  # Add empty string to maintain structure
+            self.page_offsets.append(offsets)
         except Exception as e:
             print(f"Error processing PDF {self.path}: {e}")
             # Add empty string to maintain structure even if PDF fails
             self.documents.append("")
+            self.page_offsets.append([])
 
     def load_directory(self):
         for root, _, files in os.walk(self.path):
             for file in files:
                 if file.lower().endswith('.pdf'):
                     file_path = os.path.join(root, file)
-                    with open(file_path, 'rb') as f:
-                        pdf_reader = PyPDF2.PdfReader(f)
-                        
-                        # Extract text from each page
-                        text = ""
-                        for page in pdf_reader.pages:
-                            text += page.extract_text() + "\n"
-                        
-                        self.documents.append(text)
+                    text, offsets = join_pages(self.extract_pages(file_path))
+                    self.documents.append(text)
+                    self.page_offsets.append(offsets)
 
     def load_documents(self):
         self.load()
         return self.documents
 
 
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCX_RUN_TEXT = {_W + "tab": "\t", _W + "ptab": "\t", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+_P, _T, _BR, _TC, _TBL, _SECT_PR = (_W + tag for tag in ("p", "t", "br", "tc", "tbl", "sectPr"))
+_TEXT_BOX, _V_MERGE, _RENDERED_BREAK = _W + "txbxContent", _W + "vMerge", _W + "lastRenderedPageBreak"
+_BREAK_TYPE, _VAL = _W + "type", _W + "val"
+
+
+def extract_docx_text(path: str) -> Tuple[str, List[int], List[int]]:
+    """
+    Streams ``word/document.xml`` out of a .docx and returns (text, page_offsets, section_offsets).
+
+    Paragraphs and table cells come out in document order, one paragraph per
+    line, matching python-docx's paragraph text. Merged table cells are read
+    once, from the cell that holds their content; text boxes are skipped, as
+    python-docx does. ``page_offsets`` are the character offsets where pages
+    start according to explicit and last-rendered page breaks (empty when the
+    file records none); ``section_offsets`` where each section starts.
+    """
+    parts: List[str] = []
+    position = 0
+    page_offsets, section_offsets = [0], [0]
+    paragraph: Optional[List[str]] = None
+    paragraph_length = 0
+    skipping = 0  # depth inside text boxes
+    merged_continuation = False  # inside a cell that continues a vertical merge
+    section_ends = False  # the current paragraph carries a section break
+
+    def page_break():
+        offset = position + paragraph_length
+        if offset != page_offsets[-1]:
+            page_offsets.append(offset)
+
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        for event, element in ElementTree.iterparse(xml, events=("start", "end")):
+            tag = element.tag
+            if tag == _TEXT_BOX:
+                skipping += 1 if event == "start" else -1
+                continue
+            if skipping:
+                continue
+            if event == "start":
+                if tag == _P:
+                    paragraph, paragraph_length = [], 0
+                continue
+
+            if tag == _T:
+                if paragraph is not None and element.text:
+                    paragraph.append(element.text)
+                    paragraph_length += len(element.text)
+            elif tag in _DOCX_RUN_TEXT:
+                if paragraph is not None:
+                    paragraph.append(_DOCX_RUN_TEXT[tag])
+                    paragraph_length += 1
+            elif tag == _BR:
+                break_type = element.get(_BREAK_TYPE, "textWrapping")
+                if break_type == "textWrapping" and paragraph is not None:
+                    paragraph.append("\n")
+                    paragraph_length += 1
+                elif break_type == "page":
+                    page_break()
+            elif tag == _RENDERED_BREAK:
+                page_break()
+            elif tag == _V_MERGE:
+                merged_continuation = element.get(_VAL, "continue") == "continue"
+            elif tag == _P:
+                if not merged_continuation and paragraph is not None:
+                    paragraph.append("\n")
+                    parts.append("".join(paragraph))
+                    position += paragraph_length + 1
+                if section_ends and position != section_offsets[-1]:
+                    section_offsets.append(position)
+                paragraph, section_ends = None, False
+                element.clear()
+            elif tag == _TC:
+                merged_continuation = False
+                element.clear()
+            elif tag == _SECT_PR:
+                section_ends = paragraph is not None  # the body's own sectPr closes the last section
+            elif tag == _TBL:
+                element.clear()
+
+    text = "".join(parts)
+    if len(section_offsets) > 1 and section_offsets[-1] == len(text):
+        section_offsets.pop()  # a break on the last paragraph starts no new section
+    return text, page_offsets if len(page_offsets) > 1 else [], section_offsets
+
+
 class DOCXLoader:
-    def __init__(self, path: str):
+    """
+    Extracts the text of .docx files.
+
+    By default ``word/document.xml`` is streamed with ``extract_docx_text``,
+    which also fills ``page_offsets`` and ``section_offsets`` per document;
+    ``fast=False`` (or a file the fast path cannot read) uses python-docx.
+    """
+
+    def __init__(self, path: str, fast: bool = True):
         self.documents = []
+        self.page_offsets = []
+        self.section_offsets = []
         self.path = path
+        self.fast = fast
         print(f"DOCXLoader initialized with path: {self.path}")
 
     def load(self):
@@ -217,32 +624,58 @@ class DOCXLoader:
             raise ValueError(f"Error processing file at '{self.path}': {str(e)}")
 
     def load_file(self):
+        if self.fast:
+            try:
+                text, page_offsets, section_offsets = extract_docx_text(self.path)
+                self.documents.append(text)
+                self.page_offsets.append(page_offsets)
+                self.section_offsets.append(section_offsets)
+                return
+            except (KeyError, ElementTree.ParseError) as e:
+                print(f"Fast DOCX extraction failed for {self.path} ({e}), using python-docx")
+        self.documents.append(self.load_with_python_docx())
+        self.page_offsets.append([])
+        self.section_offsets.append([0])
+
+    def load_with_python_docx(self) -> str:
         doc = Document(self.path)
         
         # Extract text from paragraphs
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        parts = [paragraph.text + "\n" for paragraph in doc.paragraphs]
         
         # Extract text from tables
         for table in doc.tables:
             for row in table.rows:
                 for cell in row.cells:
-                    text += cell.text + "\n"
+                    parts.append(cell.text + "\n")
         
-        self.documents.append(text)
+        return "".join(parts)
 
     def load_documents(self):
         self.load()
         return self.documents
 
 
+def _load_file_worker(file_path: str, filename: str, pdf_workers: Optional[int]):
+    """Loads one file for ``MultiFileLoader.load_files``; errors are returned, not raised."""
+    started = time.perf_counter()
+    loader = MultiFileLoader(pdf_workers=pdf_workers)
+    error = None
+    try:
+        loader.load_file(file_path, filename)
+    except Exception as e:
+        error = str(e)
+    return loader.documents, loader.page_offsets, time.perf_counter() - started, error
+
+
 class MultiFileLoader:
     """Loader that can handle multiple file types (PDF, DOCX, TXT)"""
     
-    def __init__(self):
+    def __init__(self, pdf_workers: Optional[int] = 1):
         self.documents = []
         self.file_info = []  # Track which file each document came from
+        self.page_offsets = []  # Per document: character offset of each page (empty if not paged)
+        self.pdf_workers = pdf_workers  # None = one process per core for large PDFs
     
     def load_file(self, file_path: str, filename: str):
         """Load a single file based on its extension"""
@@ -250,7 +683,7 @@ class MultiFileLoader:
         print(f"Processing file: {filename} (extension: {file_extension}) at path: {file_path}")
         
         if file_extension == 'pdf':
-            loader = PDFLoader(file_path)
+            loader = PDFLoader(file_path, workers=self.pdf_workers)
         elif file_extension == 'docx':
             loader = DOCXLoader(file_path)
         elif file_extension == 'txt':
@@ -262,11 +695,56 @@ class MultiFileLoader:
         docs = loader.load_documents()
         print(f"Loaded {len(docs)} documents from {filename}")
         
+        page_offsets = getattr(loader, "page_offsets", [])
+        
         # Add to our collection with file info
-        for doc in docs:
+        for i, doc in enumerate(docs):
             self.documents.append(doc)
             self.file_info.append(filename)
+            self.page_offsets.append(page_offsets[i] if i < len(page_offsets) else [])
     
+    def load_files(self, files: Sequence, workers: Optional[int] = None) -> List[dict]:
+        """
+        Loads many files on a process pool of ``workers`` processes (default: one per core).
+
+        ``files`` are paths or (path, filename) pairs. Documents are appended in
+        the order given whichever file finishes first, and a file that fails is
+        skipped and reported instead of aborting the others. Returns one report
+        per file: filename, documents, seconds and error (None on success).
+        """
+        pairs = [(item, os.path.basename(item)) if isinstance(item, str) else tuple(item) for item in files]
+        if not pairs:
+            return []
+        cores = os.cpu_count() or 1
+        workers = max(1, min(workers or cores, len(pairs)))
+        # With fewer files than cores the spare cores extract pages of large PDFs
+        pdf_workers = self.pdf_workers if self.pdf_workers is not None else max(1, cores // workers)
+
+        if workers == 1:
+            outcomes = [_load_file_worker(path, filename, pdf_workers) for path, filename in pairs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_load_file_worker, path, filename, pdf_workers) for path, filename in pairs
+                ]
+                outcomes = []
+                for future in futures:
+                    try:
+                        outcomes.append(future.result())
+                    except Exception as e:  # the worker process itself died
+                        outcomes.append(([], [], 0.0, str(e)))
+
+        reports = []
+        for (_, filename), (documents, page_offsets, seconds, error) in zip(pairs, outcomes):
+            for i, doc in enumerate(documents):
+                self.documents.append(doc)
+                self.file_info.append(filename)
+                self.page_offsets.append(page_offsets[i] if i < len(page_offsets) else [])
+            status = f"failed: {error}" if error else f"{len(documents)} documents"
+            print(f"Loaded {filename} in {seconds:.2f}s ({status})")
+            reports.append({"filename": filename, "documents": len(documents), "seconds": seconds, "error": error})
+        return reports
+
     def load_documents(self):
         return self.documents
     
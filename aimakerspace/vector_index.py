@@ -0,0 +1,304 @@
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from aimakerspace.quantization import hamming_distances, pack_signs
+
+
+class FlatIndex:
+    """
+    Exact search backend: every stored row is a candidate.
+
+    Index backends only decide *which* rows of the database matrix get
+    scored; the scoring itself stays in ``VectorDatabase``.
+    """
+
+    name = "flat"
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        pass
+
+    def needs_training(self, size: int) -> bool:
+        return False
+
+    def train(self, vectors: np.ndarray) -> None:
+        self.install(self.fit(vectors), vectors)
+
+    def fit(self, vectors: np.ndarray):
+        """The expensive half of ``train``; leaves the index untouched, so it can run in a worker thread."""
+        return None
+
+    def install(self, fitted, vectors: np.ndarray) -> None:
+        """Adopts a ``fit`` result made from the first rows of ``vectors`` (every current row)."""
+        pass
+
+    def candidates(self, query: np.ndarray, k: int) -> Optional[np.ndarray]:
+        """Rows worth scoring for this (unit-length) query's top ``k``; None means all rows."""
+        return None
+
+    def reset(self) -> None:
+        pass
+
+    def compact(self, keep: np.ndarray) -> None:
+        """The database kept rows ``keep`` (old row numbers) and renumbered them 0..len(keep)-1."""
+        pass
+
+    def config(self) -> dict:
+        return {"name": self.name}
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        pass
+
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted-file ANN index over unit vectors.
+
+    Rows are assigned to the nearest of ``n_lists`` centroids found by
+    spherical k-means; a query only scores the rows in its ``nprobe`` closest
+    lists. Raising ``nprobe`` trades speed for recall. Until ``min_train_size``
+    rows exist (and whenever the index is untrained) search stays exact. New
+    rows are assigned to existing centroids, and the centroids are retrained
+    once the database has grown ``retrain_growth`` times since the last training.
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        nprobe: int = 8,
+        min_train_size: int = 4096,
+        retrain_growth: float = 4.0,
+        kmeans_iterations: int = 12,
+        max_training_sample: int = 65536,
+        seed: int = 0,
+    ):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.kmeans_iterations = kmeans_iterations
+        self.max_training_sample = max_training_sample
+        self.seed = seed
+        self.reset()
+
+    def reset(self) -> None:
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._order = None  # rows sorted by list (CSR layout), rebuilt lazily
+        self._offsets = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _nearest_centroid(self, vectors: np.ndarray, centroids: Optional[np.ndarray] = None, batch: int = 8192) -> np.ndarray:
+        centroids = self.centroids if centroids is None else centroids
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), batch):
+            block = vectors[start : start + batch] @ centroids.T
+            assignments[start : start + batch] = np.argmax(block, axis=1)
+        return assignments
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        if not self.is_trained or len(rows) == 0:
+            return
+        needed = int(rows.max()) + 1
+        if needed > len(self._assignments):
+            grown = np.full(max(needed, 2 * len(self._assignments)), -1, dtype=np.int32)
+            grown[: len(self._assignments)] = self._assignments
+            self._assignments = grown
+        self._assignments[rows] = self._nearest_centroid(vectors)
+        self._order = None
+
+    def needs_training(self, size: int) -> bool:
+        if size < self.min_train_size:
+            return False
+        return not self.is_trained or size >= self.trained_size * self.retrain_growth
+
+    def fit(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Runs spherical k-means on (a sample of) all rows. Returns the centroids and every row's list."""
+        size = len(vectors)
+        n_lists = self.n_lists or max(1, int(round(math.sqrt(size))))
+        n_lists = min(n_lists, size)
+        rng = np.random.default_rng(self.seed)
+        if size > self.max_training_sample:
+            sample = vectors[np.sort(rng.choice(size, self.max_training_sample, replace=False))]
+        else:
+            sample = vectors
+        sample = np.asarray(sample, dtype=np.float32)
+        # Quantized rows come in at their own scale; k-means wants them back on the unit sphere
+        sample_norms = np.linalg.norm(sample, axis=1, keepdims=True)
+        sample = sample / np.where(sample_norms > 0, sample_norms, 1.0)
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = self._nearest_centroid(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty lists with random points
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms > 0, norms, 1.0)
+        centroids = centroids.astype(np.float32)
+        return centroids, self._nearest_centroid(np.asarray(vectors, dtype=np.float32), centroids)
+
+    def install(self, fitted: Tuple[np.ndarray, np.ndarray], vectors: np.ndarray) -> None:
+        """Switches to the new centroids; rows added since ``fit`` are assigned to them here."""
+        centroids, fitted_assignments = fitted
+        trained_size = len(fitted_assignments)
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        assignments[:trained_size] = fitted_assignments
+        if len(vectors) > trained_size:
+            assignments[trained_size:] = self._nearest_centroid(
+                np.asarray(vectors[trained_size:], dtype=np.float32), centroids
+            )
+        self.centroids = centroids
+        self._assignments = assignments
+        self._order = None
+        self.trained_size = trained_size
+        print(f"IVFIndex trained: {len(centroids)} lists over {trained_size} vectors")
+
+    def compact(self, keep: np.ndarray) -> None:
+        if not self.is_trained:
+            return
+        assignments = np.full(len(keep), -1, dtype=np.int32)
+        known = keep < len(self._assignments)
+        assignments[known] = self._assignments[keep[known]]
+        self._assignments = assignments
+        self._order = None
+
+    def _build_lists(self) -> None:
+        assignments = self._assignments
+        valid = np.flatnonzero(assignments >= 0)
+        order = valid[np.argsort(assignments[valid], kind="stable")]
+        counts = np.bincount(assignments[valid], minlength=len(self.centroids))
+        self._order = order
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def candidates(self, query: np.ndarray, k: int) -> Optional[np.ndarray]:
+        if not self.is_trained:
+            return None
+        if self._order is None:
+            self._build_lists()
+        nprobe = min(self.nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self._order[self._offsets[l] : self._offsets[l + 1]] for l in probe])
+
+    def config(self) -> dict:
+        return {
+            "name": self.name,
+            "n_lists": self.n_lists,
+            "nprobe": self.nprobe,
+            "min_train_size": self.min_train_size,
+            "retrain_growth": self.retrain_growth,
+            "kmeans_iterations": self.kmeans_iterations,
+            "max_training_sample": self.max_training_sample,
+            "seed": self.seed,
+            "trained_size": self.trained_size,
+        }
+
+    def state(self) -> Dict[str, np.ndarray]:
+        if not self.is_trained:
+            return {}
+        return {"centroids": self.centroids, "assignments": self._assignments}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        if "centroids" in state:
+            self.centroids = np.asarray(state["centroids"], dtype=np.float32)
+            self._assignments = np.array(state["assignments"], dtype=np.int32)
+            self._order = None
+
+
+class BinaryIndex(FlatIndex):
+    """
+    Sign-bit codes (one bit per dimension) scanned by Hamming distance.
+
+    The shortlist of ``max(k * oversample, min_candidates)`` rows with the
+    fewest differing bits is re-ranked by ``VectorDatabase`` with the stored
+    vectors, so the bit codes only have to keep the true neighbours in the
+    shortlist. Codes take 1/32 of the memory of float32 rows.
+    """
+
+    name = "binary"
+
+    def __init__(self, oversample: int = 10, min_candidates: int = 100):
+        self.oversample = oversample
+        self.min_candidates = min_candidates
+        self.reset()
+
+    def reset(self) -> None:
+        self._codes: Optional[np.ndarray] = None  # (capacity, ceil(dim / 8)) uint8
+        self._size = 0
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        if len(rows) == 0:
+            return
+        codes = pack_signs(vectors)
+        needed = int(rows.max()) + 1
+        if self._codes is None or needed > len(self._codes):
+            capacity = max(needed, 2 * (0 if self._codes is None else len(self._codes)))
+            grown = np.zeros((capacity, codes.shape[1]), dtype=np.uint8)
+            if self._codes is not None:
+                grown[: self._size] = self._codes[: self._size]
+            self._codes = grown
+        self._codes[rows] = codes
+        self._size = max(self._size, needed)
+
+    def compact(self, keep: np.ndarray) -> None:
+        if self._codes is None:
+            return
+        self._codes = self._codes[keep]
+        self._size = len(keep)
+
+    def candidates(self, query: np.ndarray, k: int) -> Optional[np.ndarray]:
+        shortlist = max(k * self.oversample, self.min_candidates)
+        if self._codes is None or shortlist >= self._size:
+            return None
+        distances = hamming_distances(self._codes[: self._size], pack_signs(query))
+        return np.argpartition(distances, shortlist - 1)[:shortlist]
+
+    def config(self) -> dict:
+        return {"name": self.name, "oversample": self.oversample, "min_candidates": self.min_candidates}
+
+    def state(self) -> Dict[str, np.ndarray]:
+        if self._codes is None:
+            return {}
+        return {"codes": self._codes[: self._size]}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        if "codes" in state:
+            self._codes = np.array(state["codes"], dtype=np.uint8)
+            self._size = len(self._codes)
+
+
+INDEX_BACKENDS = {"flat": FlatIndex, "ivf": IVFIndex, "binary": BinaryIndex}
+
+
+def make_index(name: str = "flat", **params) -> FlatIndex:
+    """Builds an index backend by name ("flat", "ivf" or "binary")."""
+    try:
+        backend = INDEX_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown index backend: {name}. Available: {', '.join(INDEX_BACKENDS)}")
+    return backend(**params)
+
+
+def index_from_config(config: dict) -> FlatIndex:
+    """Rebuilds a backend from the dict returned by its ``config()``."""
+    params = dict(config)
+    trained_size = params.pop("trained_size", 0)
+    index = make_index(params.pop("name", "flat"), **params)
+    if trained_size:
+        index.trained_size = trained_size
+    return index
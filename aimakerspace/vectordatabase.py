@@ -1,9 +1,33 @@
+import io
+import json
+import os
 import numpy as np
-from collections import defaultdict
-from typing import List, Tuple, Callable
+from typing import List, Optional, Sequence, Tuple, Callable
+from aimakerspace.document_store import DocumentStore, SearchResult, resident_nbytes
+from aimakerspace.lexical_index import LexicalIndex, reciprocal_rank_fusion
 from aimakerspace.openai_utils.embedding import EmbeddingModel
+from aimakerspace.openai_utils.embedding_cache import QueryEmbeddingCache
+from aimakerspace.quantization import PRECISIONS, check_precision, dequantize, dot_scores, quantize
+from aimakerspace.vector_index import FlatIndex, index_from_config
 import asyncio
 
+INDEX_FORMAT_VERSION = 2
+
+# search_by_text modes: embeddings only, BM25 only (no embedding call), or both fused with RRF
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+# Files whose existing rows never change until the next compaction; saves only append to them
+APPEND_ONLY_FILES = frozenset(
+    ["vectors.npy", "norms.npy", "scales.npy", "index_codes.npy"]
+    + [f"doc_{name}.npy" for name in ("texts", "text_offsets", "hash", "page", "start", "end")]
+)
+
+# Files with one entry per row (doc_text_offsets: one more), trimmed to the sidecar's size on load
+PER_ROW_FILES = (APPEND_ONLY_FILES - {"doc_texts.npy"}) | {"doc_source.npy", "tombstones.npy"}
+
+# Quantized matrices are upcast and scored in blocks of this many rows (small enough to stay in cache)
+SCORE_BLOCK_ROWS = 256
+
 
 def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
     """Computes the cosine similarity between two vectors."""
@@ -13,55 +37,815 @@ def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
     return dot_product / (norm_a * norm_b)
 
 
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Returns the indices of the k highest scores, best first, without a full sort."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _take_rows(keep: np.ndarray, matrix, norms, scales, documents: DocumentStore) -> tuple:
+    """
+    Copies rows ``keep`` of every per-row array; module-level so it can run in a worker thread.
+    Sources and references are left out: deletes and dedupe change them while the copy runs.
+    """
+    return matrix[keep], norms[keep], None if scales is None else scales[keep], documents.take_content(keep)
+
+
+def _append_npy(file_path: str, array: np.ndarray, saved_rows: int) -> bool:
+    """
+    Writes only the rows of ``array`` from ``saved_rows`` on, the rows the last
+    committed save left in the .npy file, then updates the header's row count.
+    Rows past ``saved_rows`` that an interrupted save wrote are overwritten or cut off.
+    Returns False (the caller rewrites the file) when the file is missing, holds
+    fewer rows, or its dtype, trailing shape or header size don't fit.
+    """
+    try:
+        f = open(file_path, "r+b")
+    except FileNotFoundError:
+        return False
+    with f:
+        version = np.lib.format.read_magic(f)
+        if version != (1, 0):
+            return False
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        data_offset = f.tell()
+        if fortran_order or dtype != array.dtype or shape[1:] != array.shape[1:]:
+            return False
+        if not shape[0] >= saved_rows <= len(array):
+            return False
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(
+            header, {"descr": np.lib.format.dtype_to_descr(array.dtype), "fortran_order": False, "shape": array.shape}
+        )
+        if header.tell() != data_offset:
+            return False
+        # Rows first, header last: until the header is rewritten the file still reads as the old array
+        row_bytes = array.dtype.itemsize * int(np.prod(array.shape[1:], dtype=np.int64))
+        f.seek(data_offset + saved_rows * row_bytes)
+        f.write(np.ascontiguousarray(array[saved_rows:]).tobytes())
+        f.truncate()
+        f.seek(0)
+        f.write(header.getvalue())
+    return True
+
+
+def _write_index(
+    path: str, sidecar: str, arrays: list, documents: DocumentStore, size: int, saved_size: Optional[int]
+) -> None:
+    """
+    File-writing half of ``VectorDatabase.save``; module-level so it can run in a worker thread.
+    ``saved_size`` is the row count of the last committed save of the same rows in the
+    directory (None if there is none); append-only arrays then only get the rows after it.
+    """
+    os.makedirs(path, exist_ok=True)
+    content = documents.content_state(size)
+    arrays = arrays + [(f"doc_{name}.npy", array) for name, array in content.items()]
+    for name, array in arrays:
+        file_path = os.path.join(path, name)
+        if saved_size is not None and name in APPEND_ONLY_FILES:
+            if name == "doc_texts.npy":
+                saved_rows = int(content["text_offsets"][saved_size])  # bytes of the saved texts
+            else:
+                saved_rows = saved_size + 1 if name == "doc_text_offsets.npy" else saved_size
+            if _append_npy(file_path, array, saved_rows):
+                continue
+        # Write to temporary names first so a crash never leaves a half-written file behind
+        tmp_path = os.path.join(path, f".{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(tmp_path, file_path)
+    written = {name for name, _ in arrays}
+    for name in os.listdir(path):
+        stale = name.startswith(("index_", "lexical_")) or name in ("scales.npy", "tombstones.npy")
+        if stale and name.endswith(".npy") and name not in written:
+            os.remove(os.path.join(path, name))  # left over from another backend or precision
+    tmp_path = os.path.join(path, ".index.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(sidecar)
+    os.replace(tmp_path, os.path.join(path, "index.json"))
+
+
+def _range_rows(ranges: List[Tuple[int, int]]) -> np.ndarray:
+    """Concatenated row numbers of sorted [start, end) ranges."""
+    return np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in ranges])
+
+
 class VectorDatabase:
-    def __init__(self, embedding_model: EmbeddingModel = None):
-        self.vectors = defaultdict(np.array)
+    """
+    Stores embeddings as rows of one contiguous, pre-normalized matrix.
+
+    Every chunk gets an integer id (its row); texts and source metadata live
+    in a ``DocumentStore`` and search returns ``SearchResult`` objects that
+    resolve them on access.
+
+    Cosine search is a single matrix-vector product followed by an
+    ``np.argpartition`` top-k. Any other ``distance_measure`` falls back to
+    scoring each stored vector in Python. The ``index`` backend decides which
+    rows are scored: ``FlatIndex`` (default) scans all of them, ``IVFIndex``
+    only the rows in the lists closest to the query, ``BinaryIndex`` a
+    Hamming-distance shortlist.
+
+    ``filter={"file": [...]}`` restricts a search to the given source files;
+    their rows are looked up as precomputed row ranges, so only those slices
+    of the matrix are scored.
+
+    ``delete`` only tombstones rows, so it costs a few microseconds per id;
+    ``compact``/``acompact`` later rewrite the arrays without them. Compaction
+    renumbers the surviving rows, so ids are only stable between compactions.
+
+    ``precision`` sets how rows are stored: ``float32`` (exact), ``float16``
+    (half the memory) or ``int8`` (a quarter, plus one float32 scale per row).
+
+    With ``lexical=True`` chunks are also indexed for BM25 as they are added,
+    which enables the "lexical" and "hybrid" modes of ``search_by_text``.
+    """
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel = None,
+        initial_capacity: int = 1024,
+        query_cache: QueryEmbeddingCache = None,
+        index: FlatIndex = None,
+        precision: str = "float32",
+        compaction_threshold: float = 0.25,
+        lexical: bool = True,
+    ):
         self.embedding_model = embedding_model or EmbeddingModel()
+        self.query_cache = query_cache
+        self.index = index or FlatIndex()
+        self.precision = check_precision(precision)
+        self.documents = DocumentStore()
+        self.lexical = LexicalIndex() if lexical else None
+        self._initial_capacity = max(1, initial_capacity)
+        self._matrix = None  # (capacity, dim) unit-length rows in ``precision``
+        self._norms = None  # original L2 norm of each row
+        self._scales = None  # int8 only: per-row dequantization scale
+        self._deleted = np.zeros(0, dtype=bool)  # tombstones, grown lazily to _size
+        self._deleted_count = 0
+        self.compaction_threshold = compaction_threshold  # fraction of dead rows worth compacting
+        self._size = 0
+        self._generation = 0  # bumped by compaction, which renumbers every row
+        self._training = False  # an ``atrain_index`` run is in flight
+        self._saved_to: Optional[Tuple[str, int, int]] = None  # (directory, generation, size) of the last save or load
+        self.metadata: dict = {}  # free-form, persisted alongside the index by save()
+
+    def __len__(self) -> int:
+        """Number of live (not deleted) chunks."""
+        return self._size - self._deleted_count
+
+    @property
+    def dim(self) -> int | None:
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the stored rows, their norms/scales and the index backend."""
+        total = sum(
+            array[: self._size].nbytes
+            for array in (self._matrix, self._norms, self._scales)
+            if array is not None
+        )
+        total += sum(array.nbytes for array in self.index.state().values())
+        return total + (self.lexical.nbytes if self.lexical is not None else 0)
 
-    def insert(self, key: str, vector: np.array) -> None:
-        self.vectors[key] = vector
+    @property
+    def resident_nbytes(self) -> int:
+        """
+        RAM held by the whole database: allocated rows, index, BM25 postings and the
+        document store's texts and columns. Memory-mapped arrays (``load(mmap=True)``)
+        count as 0 until a write copies them into RAM.
+        """
+        arrays = (self._matrix, self._norms, self._scales, self._deleted, *self.index.state().values())
+        total = sum(resident_nbytes(array) for array in arrays) + self.documents.resident_nbytes
+        return total + (self.lexical.nbytes if self.lexical is not None else 0)
+
+    def _ensure_capacity(self, extra_rows: int, dim: int) -> None:
+        if self._matrix is not None and not self._matrix.flags.writeable:
+            # A memory-mapped index is read-only; copy it into RAM on first write
+            self._matrix = np.array(self._matrix[: self._size])
+            self._norms = np.array(self._norms[: self._size])
+            if self._scales is not None:
+                self._scales = np.array(self._scales[: self._size])
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, extra_rows)
+            self._matrix = np.zeros((capacity, dim), dtype=PRECISIONS[self.precision])
+            self._norms = np.zeros(capacity, dtype=np.float32)
+            if self.precision == "int8":
+                self._scales = np.ones(capacity, dtype=np.float32)
+            return
+        if dim != self._matrix.shape[1]:
+            raise ValueError(
+                f"Vector dimension {dim} does not match database dimension {self._matrix.shape[1]}"
+            )
+        needed = self._size + extra_rows
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        capacity = max(capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, dim), dtype=self._matrix.dtype)
+        matrix[: self._size] = self._matrix[: self._size]
+        norms = np.zeros(capacity, dtype=np.float32)
+        norms[: self._size] = self._norms[: self._size]
+        self._matrix, self._norms = matrix, norms
+        if self._scales is not None:
+            scales = np.ones(capacity, dtype=np.float32)
+            scales[: self._size] = self._scales[: self._size]
+            self._scales = scales
+
+    def insert(self, text: str, vector: np.array, source: Optional[str] = None, page: Optional[int] = None) -> int:
+        pages = None if page is None else [page]
+        return int(self.insert_many([text], [vector], source=source, pages=pages)[0])
+
+    def insert_many(
+        self,
+        texts: Sequence[str],
+        vectors,
+        source: Optional[str] = None,
+        pages: Optional[Sequence[int]] = None,
+        starts: Optional[Sequence[int]] = None,
+        ends: Optional[Sequence[int]] = None,
+        train: bool = True,
+    ) -> np.ndarray:
+        """
+        Normalizes and appends a batch of vectors with their texts and metadata. Returns their ids.
+
+        With ``train`` an index that has grown enough is retrained inline; pass False
+        from the event loop and await ``atrain_index`` instead.
+        """
+        if len(texts) == 0:
+            return np.empty(0, dtype=np.int64)
+        block = np.asarray(vectors, dtype=np.float32)
+        if block.ndim != 2 or block.shape[0] != len(texts):
+            raise ValueError("Expected one vector per text")
+        norms = np.linalg.norm(block, axis=1)
+        safe_norms = np.where(norms > 0, norms, 1.0).astype(np.float32)
+        block = block / safe_norms[:, None]
+
+        self._ensure_capacity(len(texts), block.shape[1])
+        rows = self.documents.add(texts, source=source, pages=pages, starts=starts, ends=ends)
+        self._size += len(texts)
+        codes, scales = quantize(block, self.precision)
+        self._matrix[rows] = codes
+        self._norms[rows] = norms
+        if scales is not None:
+            self._scales[rows] = scales
+
+        self.index.add(rows, block)
+        if train and self.index.needs_training(self._size):
+            self.index.train(self._matrix[: self._size])
+        if self.lexical is not None:
+            self.lexical.add(rows, texts)
+        return rows
+
+    def _grow_tombstones(self) -> None:
+        if len(self._deleted) < self._size:
+            deleted = np.zeros(max(self._size, 2 * len(self._deleted)), dtype=bool)
+            deleted[: len(self._deleted)] = self._deleted
+            self._deleted = deleted
+
+    def _tombstone_mask(self) -> Optional[np.ndarray]:
+        """Per-row deleted flags, or None when nothing is deleted."""
+        if not self._deleted_count:
+            return None
+        self._grow_tombstones()
+        return self._deleted[: self._size]
+
+    def delete(self, ids: Sequence[int]) -> int:
+        """Tombstones ``ids`` so search skips them at once. Returns how many were newly deleted."""
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        ids = ids[(ids >= 0) & (ids < self._size)]
+        self._grow_tombstones()
+        fresh = ids[~self._deleted[ids]]
+        self._deleted[fresh] = True
+        self._deleted_count += len(fresh)
+        return len(fresh)
+
+    def delete_source(self, source: str) -> int:
+        """Tombstones every chunk of one source file, except chunks other files share."""
+        return self.delete(self.documents.remove_source(source))
+
+    def add_source_alias(self, source: str, alias: str) -> int:
+        """Makes every live chunk of ``source`` also belong to ``alias`` (an identical file). Returns the count."""
+        ranges = self.documents.source_ranges([source])
+        if not ranges:
+            return 0
+        rows = _range_rows(ranges)
+        mask = self._tombstone_mask()
+        if mask is not None:
+            rows = rows[~mask[rows]]
+        for doc_id in rows.tolist():
+            self.documents.add_reference(doc_id, alias)
+        return len(rows)
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self._size > 0 and self._deleted_count >= self.compaction_threshold * self._size
+
+    def _live_rows(self) -> np.ndarray:
+        mask = self._tombstone_mask()
+        return np.arange(self._size) if mask is None else np.flatnonzero(~mask)
+
+    def compact(self) -> np.ndarray:
+        """Rewrites the arrays without deleted rows. Returns the old ids of the survivors in new-id order."""
+        if not self._deleted_count:
+            return np.arange(self._size)
+        keep = self._live_rows()
+        return self._install_compaction(keep, self._size, _take_rows(keep, *self._row_arrays()))
+
+    async def acompact(self, executor=None) -> np.ndarray:
+        """``compact`` with the copying done in a worker thread while inserts and deletes continue."""
+        if not self._deleted_count:
+            return np.arange(self._size)
+        keep = self._live_rows()
+        size = self._size
+        loop = asyncio.get_running_loop()
+        taken = await loop.run_in_executor(executor, _take_rows, keep, *self._row_arrays())
+        return self._install_compaction(keep, size, taken)
+
+    def _row_arrays(self) -> tuple:
+        return self._matrix, self._norms, self._scales, self.documents
+
+    def _install_compaction(self, keep: np.ndarray, size: int, taken: tuple) -> np.ndarray:
+        matrix, norms, scales, documents = taken
+        if self._size > size:
+            # Rows inserted while the copy was made are carried over as they are
+            tail = np.arange(size, self._size)
+            tail_matrix, tail_norms, tail_scales, tail_documents = _take_rows(tail, *self._row_arrays())
+            matrix = np.concatenate([matrix, tail_matrix])
+            norms = np.concatenate([norms, tail_norms])
+            scales = None if scales is None else np.concatenate([scales, tail_scales])
+            documents.extend(tail_documents)
+            keep = np.concatenate([keep, tail])
+        # Sources come from the live store, so files removed or aliased during the copy are kept
+        documents.copy_sources(self.documents, keep)
+        # Rows deleted while the copy was made stay tombstoned
+        mask = self._tombstone_mask()
+        deleted = np.zeros(len(keep), dtype=bool) if mask is None else mask[keep]
+
+        rows_before = self._size
+        self._generation += 1
+        self._matrix, self._norms, self._scales, self.documents = matrix, norms, scales, documents
+        if len(keep) == 0:
+            self._matrix = self._norms = self._scales = None
+        self._size = len(keep)
+        self._deleted = np.array(deleted)
+        self._deleted_count = int(deleted.sum())
+        self.index.compact(keep)
+        if self.lexical is not None:
+            self.lexical.compact(keep)
+        print(f"VectorDatabase compacted: {rows_before} -> {self._size} rows")
+        return keep
 
     def search(
         self,
         query_vector: np.array,
         k: int,
         distance_measure: Callable = cosine_similarity,
-    ) -> List[Tuple[str, float]]:
-        scores = [
-            (key, distance_measure(query_vector, vector))
-            for key, vector in self.vectors.items()
-        ]
-        return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
+        filter: Optional[dict] = None,
+    ) -> List[SearchResult]:
+        if self._size == 0 or k <= 0:
+            return []
+        ranges = self._filter_ranges(filter)
+        if ranges is not None and not ranges:
+            return []
 
-    def search_by_text(
-        self,
-        query_text: str,
-        k: int,
-        distance_measure: Callable = cosine_similarity,
-        return_as_text: bool = False,
-    ) -> List[str] | List[Tuple[str, float]]:
+        if distance_measure is not cosine_similarity:
+            # Slow path: custom metrics are scored one stored vector at a time.
+            rows = range(self._size) if ranges is None else _range_rows(ranges).tolist()
+            mask = self._tombstone_mask()
+            if mask is not None:
+                rows = [row for row in rows if not mask[row]]
+            scores = [(row, distance_measure(query_vector, self.retrieve(row))) for row in rows]
+            scores.sort(key=lambda x: x[1], reverse=True)
+            return [SearchResult(row, float(score), self.documents) for row, score in scores[:k]]
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm > 0:
+            query = query / query_norm
+        rows = self.index.candidates(query, k)
+        mask = self._tombstone_mask()
+        if rows is not None and mask is not None:
+            rows = rows[~mask[rows]]  # only live candidates count towards k
+        if ranges is not None:
+            if rows is not None:
+                rows = np.intersect1d(rows, _range_rows(ranges), assume_unique=True)
+                if len(rows) >= k:
+                    return self._top_results(rows, self._scores(query, rows), k)
+            # Score the filtered files' rows directly, one contiguous slice per range
+            scores = np.concatenate([self._scores(query, start=start, end=end) for start, end in ranges])
+            return self._top_results(_range_rows(ranges), scores, k)
+        if rows is None or len(rows) < k:
+            # No shortlist, or too few live rows in it: score every row
+            return self._top_results(None, self._scores(query), k)
+        return self._top_results(rows, self._scores(query, rows), k)
+
+    def _filter_ranges(self, filter: Optional[dict]) -> Optional[List[Tuple[int, int]]]:
+        """Row ranges matching ``filter`` ({"file": name or [names]}); None means no filter."""
+        if not filter:
+            return None
+        unsupported = set(filter) - {"file"}
+        if unsupported:
+            raise ValueError(f"Unsupported filter fields: {', '.join(sorted(unsupported))}. Available: file")
+        files = filter["file"]
+        if isinstance(files, str):
+            files = [files]
+        return self.documents.source_ranges(files)
+
+    def _top_results(self, rows: Optional[np.ndarray], scores: np.ndarray, k: int) -> List[SearchResult]:
+        """Best ``k`` of ``scores``, where ``scores[i]`` belongs to ``rows[i]`` (or row i when rows is None)."""
+        mask = self._tombstone_mask()
+        if mask is not None:
+            dead = mask if rows is None else mask[rows]
+            scores = np.where(dead, -np.inf, scores)
+        top = top_k_indices(scores, k)
+        if mask is not None:
+            top = top[np.isfinite(scores[top])]
+        ids = top if rows is None else rows[top]
+        return [SearchResult(int(doc_id), float(scores[i]), self.documents) for doc_id, i in zip(ids, top)]
+
+    def _scores(self, query: np.ndarray, rows: np.ndarray = None, start: int = 0, end: int = None) -> np.ndarray:
+        """Cosine scores of a unit query against ``rows``, or else the contiguous rows [start, end)."""
+        if rows is not None:
+            scales = None if self._scales is None else self._scales[rows]
+            return dot_scores(self._matrix[rows], query, scales)
+        end = self._size if end is None else end
+        if self._matrix.dtype == np.float32:
+            return self._matrix[start:end] @ query
+        scores = np.empty(end - start, dtype=np.float32)
+        for block_start in range(start, end, SCORE_BLOCK_ROWS):
+            block_end = min(block_start + SCORE_BLOCK_ROWS, end)
+            scales = None if self._scales is None else self._scales[block_start:block_end]
+            scores[block_start - start : block_end - start] = dot_scores(
+                self._matrix[block_start:block_end], query, scales
+            )
+        return scores
+
+    def embed_query(self, query_text: str) -> List[float]:
+        """Embeds a search query, reusing the query cache when one is configured."""
+        if self.query_cache is not None:
+            cached = self.query_cache.get(query_text)
+            if cached is not None:
+                return cached
         query_vector = self.embedding_model.get_embedding(query_text)
-        results = self.search(query_vector, k, distance_measure)
+        if self.query_cache is not None:
+            self.query_cache.put(query_text, query_vector)
+        return query_vector
+
+    async def aembed_query(self, query_text: str) -> List[float]:
+        """Non-blocking counterpart of ``embed_query``."""
+        if self.query_cache is not None:
+            cached = self.query_cache.get(query_text)
+            if cached is not None:
+                return cached
+        query_vector = await self.embedding_model.async_get_embedding(query_text)
+        if self.query_cache is not None:
+            self.query_cache.put(query_text, query_vector)
+        return query_vector
+
+    def _format_results(
+        self, results: List[SearchResult], return_as_text: bool
+    ) -> List[str] | List[SearchResult]:
         print(f"VectorDB search results: {len(results)} items")
-        for i, (key, score) in enumerate(results):
-            print(f"  Result {i+1}: Score {score:.4f}, Key preview: {key[:100]}...")
-        
+        for i, result in enumerate(results):
+            print(f"  Result {i+1}: Score {result.score:.4f}, id {result.id}, Text preview: {result.text[:100]}...")
+
         if return_as_text:
-            text_results = [result[0] for result in results]
+            text_results = [result.text for result in results]
             print(f"Returning {len(text_results)} text chunks")
             return text_results
         else:
             return results
 
-    def retrieve_from_key(self, key: str) -> np.array:
-        return self.vectors.get(key, None)
+    def lexical_search(self, query_text: str, k: int, filter: Optional[dict] = None) -> List[SearchResult]:
+        """BM25 search over the chunk texts; needs no embedding call."""
+        if self.lexical is None:
+            raise ValueError("This VectorDatabase was created with lexical=False")
+        if self._size == 0 or k <= 0:
+            return []
+        scores = self.lexical.scores(query_text)
+        rows = np.flatnonzero(scores > 0)
+        ranges = self._filter_ranges(filter)
+        if ranges is not None:
+            rows = np.intersect1d(rows, _range_rows(ranges), assume_unique=True) if ranges else rows[:0]
+        return self._top_results(rows, scores[rows], k)
 
-    async def abuild_from_list(self, list_of_text: List[str]) -> "VectorDatabase":
+    def hybrid_search(
+        self,
+        query_text: str,
+        query_vector: np.array,
+        k: int,
+        filter: Optional[dict] = None,
+        depth: Optional[int] = None,
+    ) -> List[SearchResult]:
+        """Fuses the top ``depth`` vector and BM25 results with reciprocal rank fusion."""
+        depth = depth or max(4 * k, 20)
+        vector_results = self.search(query_vector, depth, filter=filter)
+        lexical_results = self.lexical_search(query_text, depth, filter=filter)
+        fused = reciprocal_rank_fusion(
+            [[result.id for result in vector_results], [result.id for result in lexical_results]]
+        )
+        return [SearchResult(doc_id, score, self.documents) for doc_id, score in fused[:k]]
+
+    def _check_mode(self, mode: str) -> None:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}. Available: {', '.join(SEARCH_MODES)}")
+        if mode != "vector" and self.lexical is None:
+            raise ValueError(f"Search mode '{mode}' needs the lexical index (lexical=True)")
+
+    def _search_with_vector(self, query_text, query_vector, k, distance_measure, filter, mode) -> List[SearchResult]:
+        if mode == "hybrid":
+            return self.hybrid_search(query_text, query_vector, k, filter=filter)
+        return self.search(query_vector, k, distance_measure, filter=filter)
+
+    def search_by_text(
+        self,
+        query_text: str,
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        return_as_text: bool = False,
+        filter: Optional[dict] = None,
+        mode: str = "vector",
+    ) -> List[str] | List[SearchResult]:
+        """
+        ``mode`` is "vector", "lexical" (BM25 only, no embedding call) or "hybrid".
+        In hybrid mode a failed query embedding falls back to the lexical results.
+        """
+        self._check_mode(mode)
+        if mode == "lexical":
+            return self._format_results(self.lexical_search(query_text, k, filter=filter), return_as_text)
+        try:
+            query_vector = self.embed_query(query_text)
+        except Exception as e:
+            if mode != "hybrid":
+                raise
+            print(f"Query embedding failed ({e!r}); answering from the lexical index only")
+            return self._format_results(self.lexical_search(query_text, k, filter=filter), return_as_text)
+        results = self._search_with_vector(query_text, query_vector, k, distance_measure, filter, mode)
+        return self._format_results(results, return_as_text)
+
+    async def asearch_by_text(
+        self,
+        query_text: str,
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        return_as_text: bool = False,
+        filter: Optional[dict] = None,
+        mode: str = "vector",
+        embed_timeout: Optional[float] = None,
+    ) -> List[str] | List[SearchResult]:
+        """Async ``search_by_text``; in hybrid mode an embedding slower than ``embed_timeout`` seconds is skipped."""
+        self._check_mode(mode)
+        if mode == "lexical":
+            return self._format_results(self.lexical_search(query_text, k, filter=filter), return_as_text)
+        try:
+            query_vector = await asyncio.wait_for(self.aembed_query(query_text), embed_timeout)
+        except Exception as e:
+            if mode != "hybrid":
+                raise
+            print(f"Query embedding failed ({e!r}); answering from the lexical index only")
+            return self._format_results(self.lexical_search(query_text, k, filter=filter), return_as_text)
+        results = self._search_with_vector(query_text, query_vector, k, distance_measure, filter, mode)
+        return self._format_results(results, return_as_text)
+
+    def retrieve(self, doc_id: int) -> Optional[np.ndarray]:
+        """Original (de-quantized) vector of an id, or None for unknown ids."""
+        if not 0 <= doc_id < self._size:
+            return None
+        mask = self._tombstone_mask()
+        if mask is not None and mask[doc_id]:
+            return None
+        row = doc_id
+        scales = None if self._scales is None else self._scales[row : row + 1]
+        return dequantize(self._matrix[row : row + 1], scales)[0] * self._norms[row]
+
+    def get_document(self, doc_id: int) -> dict:
+        """Text and metadata stored for an id."""
+        return {"id": doc_id, "text": self.documents.text(doc_id), **self.documents.metadata(doc_id)}
+
+    async def aadd_texts(
+        self,
+        list_of_text: List[str],
+        source: Optional[str] = None,
+        pages: Optional[Sequence[int]] = None,
+        starts: Optional[Sequence[int]] = None,
+        ends: Optional[Sequence[int]] = None,
+        dedupe: bool = True,
+    ) -> int:
+        """
+        Embeds only the given texts and appends them to the live index. Returns the number embedded.
+
+        With ``dedupe`` a text already stored (and not deleted), or repeated within
+        the batch, is not embedded again; the stored chunk gains ``source`` as an
+        extra source instead.
+        """
+        if not list_of_text:
+            return 0
+        if dedupe:
+            fresh = self._new_text_positions(list_of_text, source)
+            if len(fresh) < len(list_of_text):
+                list_of_text = [list_of_text[i] for i in fresh]
+                pages, starts, ends = (
+                    None if column is None else np.asarray(column)[fresh] for column in (pages, starts, ends)
+                )
+            if not list_of_text:
+                return 0
         embeddings = await self.embedding_model.async_get_embeddings(list_of_text)
-        for text, embedding in zip(list_of_text, embeddings):
-            self.insert(text, np.array(embedding))
+        self.insert_many(list_of_text, embeddings, source=source, pages=pages, starts=starts, ends=ends, train=False)
+        await self.atrain_index()
+        return len(list_of_text)
+
+    async def atrain_index(self, executor=None) -> bool:
+        """
+        Retrains the index in a worker thread if it has grown enough. Returns whether it did.
+
+        Searches and inserts carry on against the previous centroids (or exact search)
+        meanwhile; rows added during the run are assigned when the result is installed.
+        A result computed before a compaction renumbered the rows is discarded.
+        """
+        if self._training or not self.index.needs_training(self._size):
+            return False
+        size, generation = self._size, self._generation
+        self._training = True
+        try:
+            loop = asyncio.get_running_loop()
+            fitted = await loop.run_in_executor(executor, self.index.fit, self._matrix[:size])
+        finally:
+            self._training = False
+        if self._generation != generation:
+            return False
+        self.index.install(fitted, self._matrix[: self._size])
+        return True
+
+    def _new_text_positions(self, texts: Sequence[str], source: Optional[str]) -> List[int]:
+        """Positions of the texts not yet stored; stored ones are referenced from ``source``."""
+        mask = self._tombstone_mask()
+        fresh, seen = [], set()
+        for i, text in enumerate(texts):
+            doc_id = self.documents.find(text)
+            if doc_id is not None and (mask is None or not mask[doc_id]):
+                if source is not None:
+                    self.documents.add_reference(doc_id, source)
+            elif text not in seen:
+                seen.add(text)
+                fresh.append(i)
+        return fresh
+
+    async def abuild_from_list(self, list_of_text: List[str]) -> "VectorDatabase":
+        await self.aadd_texts(list_of_text)
         return self
 
+    def save(self, path: str) -> None:
+        """
+        Writes the index to the directory ``path``.
+
+        ``vectors.npy`` holds the unit-normalized matrix in its storage precision,
+        ``norms.npy`` the original norms and, for int8, ``scales.npy`` the per-row
+        scales; ``doc_*.npy`` are the document store columns and ``index.json``
+        the sidecar with the source names and metadata. Saving again to the same
+        directory only appends the new rows to the per-row files (see
+        ``APPEND_ONLY_FILES``) until a compaction renumbers the rows.
+        """
+        snapshot = self._save_snapshot(path)
+        _write_index(path, *snapshot)
+        self._saved_to = (os.path.abspath(path), self._generation, snapshot[3])
+
+    async def asave(self, path: str, executor=None) -> None:
+        """``save`` with the file writes done in a worker thread while inserts and deletes continue."""
+        generation = self._generation
+        snapshot = self._save_snapshot(path)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, _write_index, path, *snapshot)
+        self._saved_to = (os.path.abspath(path), generation, snapshot[3])
+
+    def _save_snapshot(self, path: str) -> tuple:
+        """Arguments for ``_write_index``: everything a later insert, delete or dedupe could change is copied."""
+        size = self._size
+        dim = self.dim or 0
+        dtype = PRECISIONS[self.precision]
+        matrix = self._matrix[:size] if self._matrix is not None else np.zeros((0, dim), dtype=dtype)
+        norms = self._norms[:size] if self._norms is not None else np.zeros(0, dtype=np.float32)
+        sidecar = {
+            "version": INDEX_FORMAT_VERSION,
+            "dim": dim,
+            "size": size,
+            "precision": self.precision,
+            "embedding_model": getattr(self.embedding_model, "embeddings_model_name", None),
+            "documents": self.documents.config(),
+            "metadata": self.metadata,
+            "index": self.index.config(),
+            "lexical": self.lexical.config() if self.lexical is not None else None,
+        }
+        # Rows below ``size`` of these only change by compaction, which swaps in new arrays
+        arrays = [("vectors.npy", matrix), ("norms.npy", norms)]
+        if self.precision == "int8":
+            scales = self._scales[:size] if self._scales is not None else np.ones(0, dtype=np.float32)
+            arrays.append(("scales.npy", scales))
+        mask = self._tombstone_mask()
+        if mask is not None:
+            arrays.append(("tombstones.npy", np.array(mask)))
+        arrays += [(f"doc_{name}.npy", array) for name, array in self.documents.source_state().items()]
+        arrays += [
+            (f"index_{name}.npy", array if f"index_{name}.npy" in APPEND_ONLY_FILES else np.array(array))
+            for name, array in self.index.state().items()
+        ]
+        if self.lexical is not None:
+            arrays += [(f"lexical_{name}.npy", array) for name, array in self.lexical.state().items()]  # built fresh
+        saved_size = None
+        if self._saved_to is not None and self._saved_to[:2] == (os.path.abspath(path), self._generation):
+            saved_size = self._saved_to[2]
+        return json.dumps(sidecar), arrays, self.documents, size, saved_size
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.isfile(os.path.join(path, "index.json"))
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        embedding_model: EmbeddingModel = None,
+        mmap: bool = True,
+        query_cache: QueryEmbeddingCache = None,
+    ) -> "VectorDatabase":
+        """Opens an index written by ``save``; with ``mmap=True`` the matrix is paged in lazily."""
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+            sidecar = json.load(f)
+        if sidecar.get("version") not in (1, INDEX_FORMAT_VERSION):
+            raise ValueError(f"Unsupported index format version: {sidecar.get('version')}")
+
+        size = sidecar["size"]
+
+        def load_array(name: str, mmap_mode: Optional[str] = "r" if mmap else None) -> np.ndarray:
+            array = np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+            if name in PER_ROW_FILES:
+                # A save interrupted before its sidecar was written may have left extra rows
+                return array[: size + 1 if name == "doc_text_offsets.npy" else size]
+            return array
+
+        matrix = load_array("vectors.npy")
+        norms = load_array("norms.npy")
+        precision = sidecar.get("precision", "float32")
+        scales = None
+        if precision == "int8":
+            scales = load_array("scales.npy")
+        if sidecar["version"] == 1:
+            # Version 1 used the chunk texts as keys and kept them in the sidecar
+            documents = DocumentStore()
+            documents.add(sidecar["keys"])
+        else:
+            documents = DocumentStore.from_state(sidecar["documents"], {
+                name: load_array(f"doc_{name}.npy")
+                for name in ("texts", "text_offsets", "source", "page", "start", "end", "hash", "ref_ids", "ref_sources")
+                if os.path.exists(os.path.join(path, f"doc_{name}.npy"))  # hash and refs are newer columns
+            })
+        if matrix.shape != (sidecar["size"], sidecar["dim"]) or len(documents) != sidecar["size"]:
+            raise ValueError(f"Index at '{path}' is inconsistent with its sidecar")
+
+        index = index_from_config(sidecar.get("index", {"name": "flat"}))
+        index.load_state({
+            name[len("index_") : -len(".npy")]: load_array(name, mmap_mode=None)
+            for name in os.listdir(path)
+            if name.startswith("index_") and name.endswith(".npy")
+        })
+        lexical_config = sidecar.get("lexical", {})
+        vector_db = cls(
+            embedding_model, query_cache=query_cache, index=index, precision=precision, lexical=lexical_config is not None
+        )
+        vector_db.documents = documents
+        if lexical_config is not None:
+            vector_db.lexical = LexicalIndex(**lexical_config)
+            if os.path.exists(os.path.join(path, "lexical_lengths.npy")):
+                vector_db.lexical.load_state({
+                    name: np.load(os.path.join(path, f"lexical_{name}.npy"))
+                    for name in ("vocab", "vocab_offsets", "offsets", "ids", "tfs", "lengths")
+                })
+            else:
+                # Saved before the lexical index existed: tokenize the stored texts once
+                vector_db.lexical.add(np.arange(len(documents)), documents.texts())
+        tombstones_path = os.path.join(path, "tombstones.npy")
+        if os.path.exists(tombstones_path):
+            vector_db._deleted = np.array(load_array("tombstones.npy", mmap_mode=None))
+            vector_db._deleted_count = int(vector_db._deleted.sum())
+        vector_db.metadata = sidecar.get("metadata", {})
+        vector_db._size = size
+        if sidecar["version"] == INDEX_FORMAT_VERSION:
+            # Append after the rows this sidecar committed, not after rows an interrupted save left behind
+            vector_db._saved_to = (os.path.abspath(path), vector_db._generation, size)
+        if vector_db._size:
+            vector_db._matrix = matrix
+            vector_db._norms = norms
+            vector_db._scales = scales
+        return vector_db
+
 
 if __name__ == "__main__":
     list_of_text = [
@@ -79,9 +863,7 @@ if __name__ == "__main__":
     searched_vector = vector_db.search_by_text("I think fruit is awesome!", k=k)
     print(f"Closest {k} vector(s):", searched_vector)
 
-    retrieved_vector = vector_db.retrieve_from_key(
-        "I like to eat broccoli and bananas."
-    )
+    retrieved_vector = vector_db.retrieve(0)
     print("Retrieved vector:", retrieved_vector)
 
     relevant_texts = vector_db.search_by_text(
@@ -1,27 +1,67 @@
 # Import required FastAPI components for building the API
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Depends
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 # Import Pydantic for data validation and settings management
 from pydantic import BaseModel
 # Import OpenAI client for interacting with OpenAI's API
-from openai import OpenAI
+from openai import AsyncOpenAI
+import httpx
 import os
-from typing import Optional, List
+import asyncio
+import time
+from typing import Optional, List, Literal
 import uuid
 import tempfile
-import shutil
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 # Import aimakerspace components
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from aimakerspace.text_utils import MultiFileLoader, CharacterTextSplitter
+from aimakerspace.ingestion import IngestionPipeline, indexed_file_hashes, save_uploads
+from aimakerspace.text_utils import CharacterTextSplitter, TokenTextSplitter
+from aimakerspace.index_jobs import IndexJob, IndexJobManager
+from aimakerspace.session_registry import Session, SessionRegistry
 from aimakerspace.vectordatabase import VectorDatabase
+from aimakerspace.vector_index import make_index
 from aimakerspace.openai_utils.embedding import EmbeddingModel
+from aimakerspace.openai_utils.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+# Background workers that index uploads so the upload request returns right away
+index_jobs = IndexJobManager(workers=int(os.environ.get("INDEX_JOB_WORKERS", "2")))
+
+# Shared OpenAI client, created once per process in the lifespan handler
+openai_client: Optional[AsyncOpenAI] = None
+
+def create_openai_client() -> Optional[AsyncOpenAI]:
+    """Async client backed by one pooled, keep-alive HTTP connection pool"""
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
+    return AsyncOpenAI(api_key=api_key, http_client=http_client)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global openai_client
+    openai_client = create_openai_client()
+    await sessions.get(DEFAULT_SESSION)  # pages in the shared index saved by earlier versions, if any
+    await index_jobs.start()
+    sweeper = asyncio.create_task(evict_idle_sessions())
+    yield
+    sweeper.cancel()
+    await index_jobs.stop()
+    await sessions.close()
+    if openai_client is not None:
+        await openai_client.close()
+        openai_client = None
 
 # Initialize FastAPI application with a title
-app = FastAPI(title="AIMakerSpace Bootcamp Assistant")
+app = FastAPI(title="AIMakerSpace Bootcamp Assistant", lifespan=lifespan)
 
 # Configure CORS (Cross-Origin Resource Sharing) middleware
 # This allows the API to be accessed from different domains/origins
@@ -41,83 +81,194 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers in requests
 )
 
-# Global variables for RAG system
-vector_db = None
-pdf_chunks = []
-uploaded_files = []  # Track uploaded files
+# Disk-backed embedding cache so re-uploaded materials skip the embeddings API
+embedding_cache = EmbeddingCache(
+    os.environ.get(
+        "EMBEDDING_CACHE_PATH",
+        os.path.join(tempfile.gettempdir(), "aimakerspace_embedding_cache.sqlite3"),
+    )
+)
+# Students repeat the same questions; reuse their query embeddings for an hour
+query_cache = QueryEmbeddingCache(max_size=2048, ttl_seconds=3600, normalize=True)
+
+# On-disk copy of the index so restarts and new serverless instances don't start empty
+INDEX_PATH = os.environ.get(
+    "VECTOR_INDEX_PATH",
+    os.path.join(tempfile.gettempdir(), "aimakerspace_vector_index"),
+)
+
+# "flat" = exact search; "ivf" = approximate search for large corpora
+INDEX_BACKEND = os.environ.get("VECTOR_INDEX_BACKEND", "flat")
+IVF_NPROBE = int(os.environ.get("VECTOR_INDEX_NPROBE", "8"))
+# "float32", "float16" or "int8" (a quarter of float32's memory, ~0.99 recall@10)
+VECTOR_PRECISION = os.environ.get("VECTOR_PRECISION", "float32")
+
+def create_index():
+    if INDEX_BACKEND == "ivf":
+        return make_index("ivf", nprobe=IVF_NPROBE)
+    return make_index(INDEX_BACKEND)
+
+# Hybrid = embeddings + BM25; if the query embedding fails or takes longer than
+# QUERY_EMBED_TIMEOUT seconds, RAG answers from the BM25 index alone
+RAG_SEARCH_MODE = os.environ.get("RAG_SEARCH_MODE", "hybrid")
+QUERY_EMBED_TIMEOUT = float(os.environ.get("QUERY_EMBED_TIMEOUT", "5"))
+
+# "tokens" packs whole paragraphs/sentences up to CHUNK_TOKENS estimated tokens;
+# "characters" is the fixed CHUNK_SIZE/CHUNK_OVERLAP character window
+TEXT_SPLITTER = os.environ.get("TEXT_SPLITTER", "tokens")
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "0"))
+CHARS_PER_TOKEN = float(os.environ.get("CHARS_PER_TOKEN", "4"))
+CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.environ.get("CHUNK_OVERLAP", "200"))
+
+def create_splitter():
+    if TEXT_SPLITTER == "characters":
+        return CharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return TokenTextSplitter(
+        chunk_tokens=CHUNK_TOKENS, chunk_overlap_tokens=CHUNK_OVERLAP_TOKENS, chars_per_token=CHARS_PER_TOKEN
+    )
+
+def create_embedding_model() -> EmbeddingModel:
+    return EmbeddingModel(cache=embedding_cache, async_client=openai_client)
+
+def source_label(metadata: dict) -> str:
+    """Human-readable origin of a chunk for the prompt, e.g. "syllabus.pdf, page 3" """
+    label = metadata.get("source") or "uploaded materials"
+    if metadata.get("page"):
+        label += f", page {metadata['page']}"
+    also_in = metadata.get("sources", [])[1:]
+    if also_in:
+        label += f" (also in {', '.join(also_in)})"
+    return label
+
+def load_index(path: str) -> VectorDatabase:
+    """Memory-maps a previously saved index instead of re-embedding everything"""
+    return VectorDatabase.load(path, create_embedding_model(), mmap=True, query_cache=query_cache)
+
+# Each session (the X-Session-Id header, e.g. one per browser or API key) gets its own index.
+# Requests without the header share the "default" session, stored at INDEX_PATH as before.
+# Least recently used sessions are saved under SESSION_INDEX_ROOT and dropped from memory when
+# the resident indexes exceed SESSION_MEMORY_BUDGET_MB or sit idle for SESSION_IDLE_SECONDS;
+# the next request memory-maps them back in.
+DEFAULT_SESSION = "default"
+SESSION_INDEX_ROOT = os.environ.get(
+    "SESSION_INDEX_ROOT",
+    os.path.join(tempfile.gettempdir(), "aimakerspace_sessions"),
+)
+SESSION_MEMORY_BUDGET_MB = float(os.environ.get("SESSION_MEMORY_BUDGET_MB", "1024"))
+SESSION_IDLE_SECONDS = float(os.environ.get("SESSION_IDLE_SECONDS", "1800"))
+
+sessions = SessionRegistry(
+    SESSION_INDEX_ROOT,
+    load_index,
+    memory_budget_bytes=int(SESSION_MEMORY_BUDGET_MB * 1024 * 1024),
+    idle_seconds=SESSION_IDLE_SECONDS,
+    paths={DEFAULT_SESSION: INDEX_PATH},
+)
+
+async def evict_idle_sessions():
+    while True:
+        await asyncio.sleep(min(60.0, SESSION_IDLE_SECONDS))
+        sessions.evict_idle()
+
+async def get_session(x_session_id: Optional[str] = Header(None)) -> Session:
+    try:
+        return await sessions.get(x_session_id or DEFAULT_SESSION)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Define the data model for chat requests using Pydantic
 class ChatRequest(BaseModel):
     message: str
     use_rag: bool = False
+    files: Optional[List[str]] = None  # restrict RAG to these uploaded files
+    search_mode: Optional[Literal["vector", "lexical", "hybrid"]] = None  # defaults to RAG_SEARCH_MODE
+
+CHAT_MODEL = "gpt-4.1-mini"
+
+async def build_chat_messages(request: ChatRequest, session: Session) -> List[dict]:
+    """Builds the system + user messages, adding retrieved context when RAG is on"""
+    # Prepare system message for AIMakerSpace Bootcamp Assistant
+    system_content = (
+        "You are the AIMakerSpace AI Engineering Bootcamp Assistant, a helpful AI tutor with a retro neon aesthetic. "
+        "You help students understand bootcamp materials, assignments, and concepts.\n\n"
+        "Keep your responses concise, engaging, and clearly formatted using markdown.\n\n"
+        "Respond appropriately to different types of prompts:\n"
+        "- **Concept explanations**: Use simple language, analogies, and avoid jargon. Speak as if explaining to a bootcamp student.\n"
+        "- **Assignment help**: Provide guidance without giving complete answers. Help students understand the problem.\n"
+        "- **Code explanations**: Break down code step-by-step, explain concepts clearly.\n"
+        "- **Bootcamp questions**: Answer questions about course structure, deadlines, or requirements.\n"
+        "- **Technical questions**: Provide accurate, helpful explanations for AI/ML concepts.\n\n"
+        "Use markdown for:\n"
+        "- Bullet points\n"
+        "- **Bold** and *italic* emphasis\n"
+        "- Code blocks when sharing code\n"
+        "- Line breaks for readability\n\n"
+        "You are knowledgeable about AI engineering, machine learning, and the bootcamp curriculum. "
+        "Stay sharp and stylish like a neon-lit arcade genius while being an excellent tutor!"
+    )
+    
+    # If RAG is enabled and we have a vector database, use it
+    vector_db = session.vector_db
+    if request.use_rag and session.chunk_count():
+        print(f"RAG enabled - Session: {session.id}, Chunks: {session.chunk_count()}")
+        print(f"User question: {request.message}")
+        # Search for relevant chunks
+        search_filter = {"file": request.files} if request.files else None
+        relevant_chunks = await vector_db.asearch_by_text(
+            request.message,
+            k=3,
+            filter=search_filter,
+            mode=request.search_mode or RAG_SEARCH_MODE,
+            embed_timeout=QUERY_EMBED_TIMEOUT
+        )
+        print(f"Found {len(relevant_chunks)} relevant chunks")
+        
+        if relevant_chunks:
+            # Debug: Print the actual chunks being used
+            print("Relevant chunks content:")
+            for i, chunk in enumerate(relevant_chunks):
+                print(f"Chunk {i+1} ({source_label(chunk.metadata)}): {chunk.text[:200]}...")
+            
+            # Add context to system message, labelled with where each chunk came from
+            context = "\n\n".join(
+                f"[Source: {source_label(chunk.metadata)}]\n{chunk.text}" for chunk in relevant_chunks
+            )
+            print(f"Context length: {len(context)} characters")
+            print(f"Context preview: {context[:500]}...")
+            
+            system_content += f"\n\nIMPORTANT: The user has uploaded bootcamp materials. You MUST use the following context from these uploaded materials to answer their question:\n\n{context}\n\nCRITICAL INSTRUCTIONS:\n- ALWAYS reference the uploaded materials when answering questions\n- If the user asks about concepts, assignments, or content that appears in the uploaded materials, use that information first\n- Only fall back to your general knowledge if the specific question is not addressed in the uploaded materials\n- When using information from the uploaded materials, cite the file (and page, when given) from its [Source: ...] label\n- Do NOT say you don't see uploaded files - the files are clearly uploaded and indexed"
+        else:
+            print("No relevant chunks found for the query")
+    else:
+        print(f"RAG not enabled or no data - RAG: {request.use_rag}, Session: {session.id}, Chunks: {session.chunk_count()}")
+    
+    return [
+        {
+            "role": "system",
+            "content": system_content
+        },
+        {
+            "role": "user",
+            "content": request.message
+        }
+    ]
 
 # Define the main chat endpoint that handles POST requests
 @app.post("/api/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, session: Session = Depends(get_session)):
     try:
-        OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-        if not OPENAI_API_KEY:
+        if openai_client is None:
             raise HTTPException(status_code=500, detail="OpenAI API key not set in environment variables.")
-        client = OpenAI(api_key=OPENAI_API_KEY)
         
-        # Prepare system message for AIMakerSpace Bootcamp Assistant
-        system_content = (
-            "You are the AIMakerSpace AI Engineering Bootcamp Assistant, a helpful AI tutor with a retro neon aesthetic. "
-            "You help students understand bootcamp materials, assignments, and concepts.\n\n"
-            "Keep your responses concise, engaging, and clearly formatted using markdown.\n\n"
-            "Respond appropriately to different types of prompts:\n"
-            "- **Concept explanations**: Use simple language, analogies, and avoid jargon. Speak as if explaining to a bootcamp student.\n"
-            "- **Assignment help**: Provide guidance without giving complete answers. Help students understand the problem.\n"
-            "- **Code explanations**: Break down code step-by-step, explain concepts clearly.\n"
-            "- **Bootcamp questions**: Answer questions about course structure, deadlines, or requirements.\n"
-            "- **Technical questions**: Provide accurate, helpful explanations for AI/ML concepts.\n\n"
-            "Use markdown for:\n"
-            "- Bullet points\n"
-            "- **Bold** and *italic* emphasis\n"
-            "- Code blocks when sharing code\n"
-            "- Line breaks for readability\n\n"
-            "You are knowledgeable about AI engineering, machine learning, and the bootcamp curriculum. "
-            "Stay sharp and stylish like a neon-lit arcade genius while being an excellent tutor!"
-        )
-        
-        # If RAG is enabled and we have a vector database, use it
-        if request.use_rag and vector_db and pdf_chunks:
-            print(f"RAG enabled - Vector DB: {vector_db is not None}, Chunks: {len(pdf_chunks) if pdf_chunks else 0}")
-            print(f"User question: {request.message}")
-            # Search for relevant chunks
-            relevant_chunks = vector_db.search_by_text(request.message, k=3, return_as_text=True)
-            print(f"Found {len(relevant_chunks)} relevant chunks")
-            
-            if relevant_chunks:
-                # Debug: Print the actual chunks being used
-                print("Relevant chunks content:")
-                for i, chunk in enumerate(relevant_chunks):
-                    print(f"Chunk {i+1}: {chunk[:200]}...")
-                
-                # Add context to system message
-                context = "\n\n".join(relevant_chunks)
-                print(f"Context length: {len(context)} characters")
-                print(f"Context preview: {context[:500]}...")
-                
-                system_content += f"\n\nIMPORTANT: The user has uploaded bootcamp materials. You MUST use the following context from these uploaded materials to answer their question:\n\n{context}\n\nCRITICAL INSTRUCTIONS:\n- ALWAYS reference the uploaded materials when answering questions\n- If the user asks about concepts, assignments, or content that appears in the uploaded materials, use that information first\n- Only fall back to your general knowledge if the specific question is not addressed in the uploaded materials\n- When using information from the uploaded materials, mention that it comes from the uploaded bootcamp materials\n- Do NOT say you don't see uploaded files - the files are clearly uploaded and indexed"
-            else:
-                print("No relevant chunks found for the query")
-        else:
-            print(f"RAG not enabled or no data - RAG: {request.use_rag}, Vector DB: {vector_db is not None}, Chunks: {len(pdf_chunks) if pdf_chunks else 0}")
+        with sessions.pinned(session):
+            messages = await build_chat_messages(request, session)
         
         # Create a chat completion request
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_content
-                },
-                {
-                    "role": "user",
-                    "content": request.message
-                }
-            ]
+        response = await openai_client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages
         )
         
         # Return the response
@@ -127,11 +278,106 @@ async def chat(request: ChatRequest):
         # Handle any errors that occur during processing
         raise HTTPException(status_code=500, detail=str(e))
 
-# Multi-file upload endpoint
-@app.post("/api/upload-files")
-async def upload_files(files: List[UploadFile] = File(...)):
-    global vector_db, pdf_chunks, uploaded_files
+# Streaming variant: retrieval runs first, then tokens are sent as they arrive
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, session: Session = Depends(get_session)):
+    try:
+        if openai_client is None:
+            raise HTTPException(status_code=500, detail="OpenAI API key not set in environment variables.")
+        
+        with sessions.pinned(session):
+            messages = await build_chat_messages(request, session)
+        stream = await openai_client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            stream=True
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def generate():
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            print(f"Error while streaming chat response: {e}")
+            yield f"\n\n[Error: {e}]"
     
+    return StreamingResponse(
+        generate(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+NO_TEXT_EXTRACTED = "Could not extract text from any files"
+
+async def run_index_job(job: IndexJob, saved_files: List[tuple], session: Session, target_db: VectorDatabase) -> dict:
+    """Background body of an upload: parse, split and embed, publishing chunks as they land"""
+    try:
+        return await index_saved_files(job, saved_files, session, target_db)
+    finally:
+        sessions.unpin(session)  # pinned by upload_files so the index isn't evicted under the job
+
+async def index_saved_files(job: IndexJob, saved_files: List[tuple], session: Session, target_db: VectorDatabase) -> dict:
+    def on_progress(event: str, filename: str, chunks: List[str]):
+        job.on_progress(event, filename, chunks)
+        if session.vector_db is not target_db:
+            return  # the session was cleared while this job was running
+        session.dirty = True
+        if event == "indexed" and filename not in session.files:
+            session.files.append(filename)
+    
+    # Extract/split and embed the files as overlapping pipeline stages;
+    # only the new chunks are embedded and appended to the live index
+    # Several files are extracted at once in a process pool; a lone file gets every core for its pages
+    pipeline = IngestionPipeline(
+        target_db,
+        pdf_workers=None,
+        on_progress=on_progress,
+        splitter=create_splitter(),
+        parse_workers=min(os.cpu_count() or 1, len(saved_files)),
+    )
+    result = await pipeline.run_saved(saved_files)
+    file_info = result["file_info"]
+    new_chunks = result["chunks"]
+    skipped = result["skipped"]
+    
+    print(f"Extracted {result['documents']} documents from {len(set(file_info))} files")
+    if not result["documents"] and not skipped["files"]:
+        if result["errors"]:
+            raise ValueError(f"{NO_TEXT_EXTRACTED}: " + "; ".join(f"{name}: {error}" for name, error in result["errors"].items()))
+        raise ValueError(NO_TEXT_EXTRACTED)
+    print(f"Created {len(new_chunks)} chunks from {result['documents']} documents")
+    
+    # Persist the index so the next cold start (or page-in after eviction) can memory-map it
+    if session.vector_db is target_db:
+        job.stage = "saving"
+        await session.save()
+    
+    new_files = list(dict.fromkeys(file_info + list(skipped["files"])))  # Remove duplicates
+    embedded = len(new_chunks) - skipped["chunks"]
+    message = f"Successfully uploaded and indexed {len(new_files)} new files! Total files: {len(session.files)}, Total chunks: {session.chunk_count()}."
+    if skipped["files"] or skipped["chunks"]:
+        message += f" Skipped {len(skipped['files'])} already indexed files and {skipped['chunks']} duplicate chunks."
+    return {
+        "message": message,
+        "files": new_files,
+        "chunks_count": len(new_chunks),
+        "chunks_embedded": embedded,
+        "skipped_files": skipped["files"],
+        "chunks_skipped": skipped["chunks"],
+        "timings": result["timings"],
+        "file_timings": result["file_timings"],
+        "failed_files": result["errors"]
+    }
+
+# Multi-file upload endpoint: files are spooled to disk and indexed by a background job
+@app.post("/api/upload-files")
+async def upload_files(
+    files: List[UploadFile] = File(...), wait: bool = False, session: Session = Depends(get_session)
+):
     try:
         if not files:
             raise HTTPException(status_code=400, detail="No files provided")
@@ -148,101 +394,109 @@ async def upload_files(files: List[UploadFile] = File(...)):
                     detail=f"File type {file_ext} not supported. Allowed: {', '.join(allowed_extensions)}"
                 )
         
-        # Initialize multi-file loader
-        multi_loader = MultiFileLoader()
-        temp_files = []
-        
+        # Keep the session resident until its job finishes; run_index_job unpins it
+        sessions.pin(session)
         try:
-            # Process each new file
-            for file in files:
-                if not file.filename:
-                    continue  # Skip files without names
-                    
-                # Create temporary file
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix)
-                temp_files.append(temp_file.name)
-                
-                # Write file content
-                shutil.copyfileobj(file.file, temp_file)
-                temp_file.close()
-                
-                # Load the file
-                multi_loader.load_file(temp_file.name, file.filename)
-            
-            # Get all documents and file info
-            documents = multi_loader.load_documents()
-            file_info = multi_loader.get_file_info()
-            
-            print(f"Extracted {len(documents)} documents from {len(file_info)} files")
-            for i, (doc, file) in enumerate(zip(documents, file_info)):
-                print(f"Document {i+1} from {file}: {len(doc)} characters")
-                if len(doc) > 0:
-                    print(f"  Preview: {doc[:200]}...")
-                else:
-                    print(f"  WARNING: Empty document from {file}")
-            
-            if not documents:
-                raise HTTPException(status_code=400, detail="Could not extract text from any files")
-            
-            # Split text into chunks
-            splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            new_chunks = splitter.split_texts(documents)
-            print(f"Created {len(new_chunks)} chunks from {len(documents)} documents")
-            
-            # Combine with existing chunks if any
-            if pdf_chunks:
-                pdf_chunks.extend(new_chunks)
-                print(f"Added {len(new_chunks)} new chunks to existing {len(pdf_chunks) - len(new_chunks)} chunks")
-            else:
-                pdf_chunks = new_chunks
-                print(f"Created new chunk list with {len(pdf_chunks)} chunks")
-            
-            # Rebuild vector database with all chunks (including existing ones)
-            embedding_model = EmbeddingModel()
-            vector_db = VectorDatabase(embedding_model)
-            await vector_db.abuild_from_list(pdf_chunks)
-            
-            # Update uploaded files list - add new files to existing ones
-            new_files = list(set(file_info))  # Remove duplicates
-            if uploaded_files:
-                uploaded_files.extend(new_files)
-                uploaded_files = list(set(uploaded_files))  # Remove duplicates
-            else:
-                uploaded_files = new_files
-            
+            # The request's upload objects are closed once we return, so spool them first
+            saved_files = await save_uploads(files)
+            if session.vector_db is None:
+                session.vector_db = VectorDatabase(
+                    create_embedding_model(), query_cache=query_cache, index=create_index(), precision=VECTOR_PRECISION
+                )
+            target_db = session.vector_db
+            job = index_jobs.submit(
+                [filename for filename, _ in saved_files],
+                lambda job: run_index_job(job, saved_files, session, target_db),
+                owner=session.id,
+            )
+        except Exception:
+            sessions.unpin(session)
+            raise
+        
+        if wait:
+            # Synchronous mode for scripts and hosts that freeze work after the response
+            await index_jobs.wait(job)
+            if job.status == "failed":
+                status_code = 400 if (job.error or "").startswith(NO_TEXT_EXTRACTED) else 500
+                raise HTTPException(status_code=status_code, detail=f"Error processing files: {job.error}")
             return {
-                "message": f"Successfully uploaded and indexed {len(new_files)} new files! Total files: {len(uploaded_files)}, Total chunks: {len(pdf_chunks)}.",
-                "files": uploaded_files,
-                "chunks_count": len(pdf_chunks)
+                **job.result,
+                "files": session.files,
+                "chunks_count": session.chunk_count(),
+                "job_id": job.id
             }
-            
-        finally:
-            # Clean up temporary files
-            for temp_file in temp_files:
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
+        
+        return {
+            "message": f"Indexing {len(saved_files)} files in the background.",
+            "job_id": job.id,
+            "status_url": f"/api/index-jobs/{job.id}",
+            "files": session.files,
+            "chunks_count": session.chunk_count()
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing files: {str(e)}")
 
-# Get current files status
+# Poll the progress of a background indexing job
+@app.get("/api/index-jobs/{job_id}")
+async def get_index_job(job_id: str, x_session_id: Optional[str] = Header(None)):
+    job = index_jobs.get(job_id)
+    if job is None or job.owner != (x_session_id or DEFAULT_SESSION):
+        raise HTTPException(status_code=404, detail="Index job not found")
+    return job.to_dict()
+
+# Get current files status; reflects partially indexed uploads while jobs run
 @app.get("/api/files-status")
-async def get_files_status():
+async def get_files_status(session: Session = Depends(get_session)):
+    active_jobs = index_jobs.active(owner=session.id)
+    return {
+        "session_id": session.id,
+        "has_files": session.chunk_count() > 0,
+        "files": session.files,
+        "chunks_count": session.chunk_count(),
+        "indexing": bool(active_jobs),
+        "index_jobs": [job.to_dict() for job in active_jobs],
+        "index_bytes": session.nbytes,
+        "sessions": sessions.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "query_cache": query_cache.stats()
+    }
+
+# Deletions only tombstone rows; compaction and the index save happen off the request path
+background_tasks = set()
+
+# Remove one file's chunks without re-embedding the rest
+@app.delete("/api/files/{filename}")
+async def delete_file(filename: str, session: Session = Depends(get_session)):
+    vector_db = session.vector_db
+    if vector_db is None or filename not in session.files:
+        raise HTTPException(status_code=404, detail=f"File not found: {filename}")
+    
+    started = time.perf_counter()
+    removed = vector_db.delete_source(filename)
+    session.files.remove(filename)
+    session.dirty = True
+    indexed_file_hashes(vector_db).pop(filename, None)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"Deleted {filename}: {removed} chunks in {elapsed_ms:.2f} ms")
+    
+    task = asyncio.create_task(session.compact_and_save(vector_db))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
     return {
-        "has_files": vector_db is not None,
-        "files": uploaded_files,
-        "chunks_count": len(pdf_chunks) if pdf_chunks else 0
+        "message": f"Removed {filename} ({removed} chunks).",
+        "chunks_removed": removed,
+        "files": session.files,
+        "chunks_count": session.chunk_count(),
+        "elapsed_ms": round(elapsed_ms, 3)
     }
 
-# Clear all files data
+# Clear this session's files; other sessions are untouched
 @app.delete("/api/clear-files")
-async def clear_files():
-    global vector_db, pdf_chunks, uploaded_files
-    vector_db = None
-    pdf_chunks = []
-    uploaded_files = []
+async def clear_files(session: Session = Depends(get_session)):
+    await sessions.clear(session)
     return {"message": "All files cleared successfully"}
 
 # Define a health check endpoint to verify API status
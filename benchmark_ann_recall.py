@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Recall@k and latency of IVFIndex vs exact search on synthetic clustered embeddings.
+
+    python benchmark_ann_recall.py [vectors] [dim] [queries]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from aimakerspace.vector_index import IVFIndex
+from aimakerspace.vectordatabase import VectorDatabase
+
+
+def synthetic_embeddings(count: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around random topic centres, roughly like chunk embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centres[labels] + rng.normal(scale=1.5, size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def run_queries(vector_db: VectorDatabase, queries: np.ndarray, k: int):
+    started = time.perf_counter()
+    results = [[result.id for result in vector_db.search(query, k)] for query in queries]
+    elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    return results, elapsed_ms
+
+
+def main(count: int = 50_000, dim: int = 256, query_count: int = 200, k: int = 10):
+    vectors = synthetic_embeddings(count, dim)
+    keys = [str(i) for i in range(count)]
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(count, query_count, replace=False)]
+    queries = queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+
+    exact_db = VectorDatabase(embedding_model=object())
+    exact_db.insert_many(keys, vectors)
+    exact, exact_ms = run_queries(exact_db, queries, k)
+
+    ivf = IVFIndex(min_train_size=1)
+    ivf_db = VectorDatabase(embedding_model=object(), index=ivf)
+    started = time.perf_counter()
+    # Insert in upload-sized batches to exercise incremental assignment
+    for start in range(0, count, 5_000):
+        ivf_db.insert_many(keys[start : start + 5_000], vectors[start : start + 5_000])
+    build_s = time.perf_counter() - started
+
+    print(f"{count} vectors x {dim} dims, {query_count} queries, recall@{k}")
+    print(f"  exact          {exact_ms:7.2f} ms/query")
+    print(f"  ivf build      {build_s:7.2f} s ({len(ivf.centroids)} lists)")
+    for nprobe in (1, 2, 4, 8, 16, 32, 64):
+        ivf.nprobe = nprobe
+        approx, approx_ms = run_queries(ivf_db, queries, k)
+        recall = np.mean([len(set(a) & set(e)) / k for a, e in zip(approx, exact)])
+        print(
+            f"  ivf nprobe={nprobe:<3} {approx_ms:7.2f} ms/query  recall {recall:.3f}"
+            f"  speedup {exact_ms / approx_ms:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
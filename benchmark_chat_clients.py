@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of ChatOpenAI against a local mock completion server.
+
+"per-call client" reproduces the old behaviour (a new OpenAI() for every
+request); "reused client" is ChatOpenAI with its long-lived pool.
+
+    python benchmark_chat_clients.py [calls]
+"""
+
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import OpenAI
+
+from aimakerspace.openai_utils.chatmodel import ChatOpenAI
+
+
+class MockCompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        payload = json.dumps({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "pong"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure(call, calls: int):
+    call()  # warm-up
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main(calls: int = 200):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockCompletionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_API_KEY"] = "benchmark-key"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    messages = [{"role": "user", "content": "ping"}]
+
+    def per_call_client():
+        client = OpenAI()
+        client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+        client.close()
+
+    chat = ChatOpenAI()
+
+    results = {
+        "per-call client": measure(per_call_client, calls),
+        "reused client": measure(lambda: chat.run(messages), calls),
+    }
+    chat.close()
+    server.shutdown()
+
+    print(f"{calls} calls against mock server at {os.environ['OPENAI_BASE_URL']}")
+    for name, timings in results.items():
+        print(
+            f"  {name:<16} mean {statistics.mean(timings):6.2f} ms"
+            f"  p50 {statistics.median(timings):6.2f} ms"
+            f"  p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Fixed 1000/200 character chunks vs sentence-packed token chunks on generated course notes.
+
+Reports chunks per document, estimated tokens sent to the embeddings API,
+how many facts were cut in half by a chunk boundary and hit@k of BM25 and of
+a local hashed bag-of-words embedding (no API calls).
+
+    python benchmark_chunking.py [documents] [facts_per_document]
+"""
+
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from aimakerspace.lexical_index import tokenize
+from aimakerspace.text_utils import CharacterTextSplitter, TokenTextSplitter
+from aimakerspace.vectordatabase import VectorDatabase
+
+WORDS = (
+    "the a model vector index query lecture student notes retrieval embedding chunk token "
+    "assignment course week data search result score paper method training loss layer "
+    "attention context answer question example system memory cost latency batch"
+).split()
+LABELS = "amber basalt cobalt dune ember fjord garnet harbor indigo juniper kelp lagoon".split()
+
+
+class HashingEmbeddingModel:
+    """Feature-hashed TF-IDF bag of words; a keyword-sensitive stand-in for a real embedding model."""
+
+    def __init__(self, dim: int = 4096):
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    def _counts(self, text: str) -> np.ndarray:
+        buckets = [zlib.crc32(token.encode()) % self.dim for token in tokenize(text)]
+        return np.bincount(buckets, minlength=self.dim).astype(np.float32)
+
+    def fit(self, texts) -> None:
+        document_frequency = sum((self._counts(text) > 0).astype(np.float32) for text in texts)
+        self.idf = np.log((1 + len(texts)) / (1 + document_frequency)).astype(np.float32) + 1
+
+    def get_embedding(self, text: str) -> np.ndarray:
+        return np.sqrt(self._counts(text)) * self.idf
+
+    def get_embeddings(self, texts):
+        return [self.get_embedding(text) for text in texts]
+
+
+def generate_documents(count: int, facts_per_document: int, seed: int = 0):
+    """Paragraphs of filler sentences with numbered facts mixed in. Returns (documents, facts)."""
+    rng = np.random.default_rng(seed)
+    documents, facts = [], []
+    for doc_id in range(count):
+        paragraphs = []
+        fact_slots = set(rng.choice(facts_per_document * 4, facts_per_document, replace=False).tolist())
+        for slot in range(facts_per_document * 4):
+            sentences = [
+                " ".join(rng.choice(WORDS, rng.integers(8, 20))).capitalize() + "."
+                for _ in range(rng.integers(2, 6))
+            ]
+            if slot in fact_slots:
+                item = len(facts)
+                label = f"{LABELS[item % len(LABELS)]} {rng.integers(100, 999)}"
+                # A multi-sentence fact: only a chunk holding all of it answers the question
+                fact = (
+                    f"Item {item} of document {doc_id} is filed under code {label}. "
+                    + " ".join(rng.choice(WORDS, 25)).capitalize()
+                    + f". That is why item {item} needs review in week {rng.integers(1, 15)}."
+                )
+                sentences.insert(int(rng.integers(0, len(sentences) + 1)), fact)
+                facts.append((doc_id, fact, f"Which code is item {item} of document {doc_id} filed under?"))
+            paragraphs.append(" ".join(sentences))
+        documents.append("\n\n".join(paragraphs))
+    return documents, facts
+
+
+def evaluate(name: str, splitter, documents, facts, k: int = 3):
+    started = time.perf_counter()
+    chunks = splitter.split_spans(documents)
+    split_ms = (time.perf_counter() - started) * 1000
+    texts = list(chunks)
+    tokens = sum(-(-len(text) // 4) for text in texts)
+
+    embedding_model = HashingEmbeddingModel()
+    embedding_model.fit(texts)
+    vector_db = VectorDatabase(embedding_model)
+    vector_db.insert_many(texts, embedding_model.get_embeddings(texts))
+
+    whole, lexical_hits, vector_hits = 0, 0, 0
+    for _, fact, question in facts:
+        whole += any(fact in text for text in texts)
+        lexical = vector_db.lexical_search(question, k=k)
+        vector = vector_db.search(embedding_model.get_embedding(question), k=k)
+        lexical_hits += any(fact in result.text for result in lexical)
+        vector_hits += any(fact in result.text for result in vector)
+
+    print(
+        f"  {name:<26} {len(texts) / len(documents):10.1f} {tokens:10d} {split_ms:9.1f}"
+        f" {1 - whole / len(facts):8.1%} {lexical_hits / len(facts):7.1%} {vector_hits / len(facts):7.1%}"
+    )
+
+
+def main(document_count: int = 20, facts_per_document: int = 25):
+    documents, facts = generate_documents(document_count, facts_per_document)
+    characters = sum(len(document) for document in documents)
+    print(f"{document_count} documents, {characters} characters, {len(facts)} facts; hit@3")
+    print(f"  {'splitter':<26} {'chunks/doc':>10} {'tokens':>10} {'split ms':>9} {'cut':>8} {'BM25':>7} {'vector':>7}")
+    evaluate("characters 1000/200", CharacterTextSplitter(1000, 200), documents, facts)
+    evaluate("tokens 256", TokenTextSplitter(256), documents, facts)
+    evaluate("tokens 256, overlap 32", TokenTextSplitter(256, 32), documents, facts)
+    evaluate("tokens 128", TokenTextSplitter(128), documents, facts)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
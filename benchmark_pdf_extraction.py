@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Sequential vs process-pool page extraction on a generated multi-hundred-page PDF.
+
+    python benchmark_pdf_extraction.py [pages] [workers]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from aimakerspace.text_utils import PDFLoader, join_pages
+
+
+def write_text_pdf(path: str, pages: int, lines_per_page: int = 45) -> None:
+    """Writes a plain PDF with `pages` pages of Helvetica text, no extra dependencies."""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objects) + 1
+    objects.append(None)  # /Pages placeholder, filled once the kids are known
+    page_ids = []
+    for page_number in range(pages):
+        lines = [
+            f"Page {page_number + 1} line {line}: retrieval augmented generation lecture notes"
+            for line in range(lines_per_page)
+        ]
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = stream.encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font_id, content_id)
+        ))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref
+    )
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def main(pages: int = 400, workers: int = os.cpu_count() or 1):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "course_reader.pdf")
+        write_text_pdf(path, pages)
+        print(f"Generated {pages}-page PDF ({os.path.getsize(path) / 1024:.0f} KB)")
+
+        results = {}
+        for label, loader in (
+            ("sequential", PDFLoader(path, workers=1)),
+            (f"{workers} workers", PDFLoader(path, workers=workers, parallel_min_pages=1)),
+        ):
+            started = time.perf_counter()
+            text, offsets = join_pages(loader.extract_pages(path))
+            results[label] = (time.perf_counter() - started, text, offsets)
+
+    (seq_time, seq_text, seq_offsets), (par_time, par_text, par_offsets) = results.values()
+    assert seq_text == par_text and seq_offsets == par_offsets, "parallel output differs"
+    assert seq_text[seq_offsets[-1]:].startswith(f"Page {pages} line 0")
+    for label, (elapsed, text, _) in results.items():
+        print(f"  {label:<12} {elapsed:6.2f} s  {pages / elapsed:7.1f} pages/s  {len(text)} chars")
+    print(f"  speedup      {seq_time / par_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 400,
+        int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1),
+    )
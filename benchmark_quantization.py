@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Memory per million vectors and recall@k of each storage precision vs float32.
+
+    python benchmark_quantization.py [vectors] [dim] [queries]
+"""
+
+import sys
+
+import numpy as np
+
+from aimakerspace.quantization import bytes_per_vector
+from aimakerspace.vector_index import BinaryIndex
+from aimakerspace.vectordatabase import VectorDatabase
+from benchmark_ann_recall import run_queries, synthetic_embeddings
+
+
+def legacy_bytes_per_vector(dim: int) -> int:
+    """The old store: one float64 np.array per key in a dict (array header + data + dict slot)."""
+    return sys.getsizeof(np.zeros(dim)) + 8 * 3
+
+
+def main(count: int = 20_000, dim: int = 1536, query_count: int = 100, k: int = 10):
+    vectors = synthetic_embeddings(count, dim)
+    keys = [str(i) for i in range(count)]
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(count, query_count, replace=False)]
+    queries = queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+
+    exact_db = VectorDatabase(embedding_model=object())
+    exact_db.insert_many(keys, vectors)
+    exact, _ = run_queries(exact_db, queries, k)
+
+    print(f"{count} vectors x {dim} dims, {query_count} queries, recall@{k}")
+    print(f"  {'storage':<22} {'GB / 1M vectors':>16} {'ms/query':>9} {'recall':>7}")
+    print(f"  {'float64 dict (before)':<22} {legacy_bytes_per_vector(dim) * 1e6 / 1e9:16.2f}")
+
+    configs = [(precision, "flat") for precision in ("float32", "float16", "int8")]
+    configs += [("float32", "binary"), ("int8", "binary")]
+    for precision, backend in configs:
+        index = BinaryIndex() if backend == "binary" else None
+        vector_db = VectorDatabase(embedding_model=object(), precision=precision, index=index)
+        vector_db.insert_many(keys, vectors)
+        approx, approx_ms = run_queries(vector_db, queries, k)
+        recall = np.mean([len(set(a) & set(e)) / k for a, e in zip(approx, exact)])
+        per_vector = vector_db.nbytes / count
+        label = precision if backend == "flat" else f"{precision} + binary"
+        print(f"  {label:<22} {per_vector * 1e6 / 1e9:16.2f} {approx_ms:9.2f} {recall:7.3f}")
+        if backend == "binary":
+            # With the matrix memory-mapped from disk only the bit codes need to stay resident
+            codes = vector_db.index.state()["codes"].nbytes / count
+            print(f"  {'  (resident codes only)':<22} {codes * 1e6 / 1e9:16.2f}")
+        assert per_vector >= bytes_per_vector(dim, precision)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
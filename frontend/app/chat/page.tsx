@@ -10,6 +10,7 @@ import { vscDarkPlus } from 'react-syntax-highlighter/dist/esm/styles/prism';
 import FileUpload from '../components/PDFUpload';
 import FileManager from '../components/FileManager';
 import { UploadedFile } from '../components/PDFUpload';
+import { sessionHeaders } from '../session';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
 
@@ -120,7 +121,7 @@ export default function Chat() {
       const response = await axios.post(`${API_BASE_URL}/api/chat`, {
         message: input,
         use_rag: ragEnabled && hasFiles
-      });
+      }, { headers: sessionHeaders() });
       
       // Update user message status
       setMessages(prev => prev.map(msg => 
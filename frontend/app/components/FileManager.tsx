@@ -4,6 +4,7 @@ import { useState } from 'react';
 import axios from 'axios';
 import { FaCheckCircle, FaExclamationCircle, FaTimes, FaTrash } from 'react-icons/fa';
 import { UploadedFile } from './PDFUpload';
+import { sessionHeaders } from '../session';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
 
@@ -19,7 +20,7 @@ export default function FileManager({ files, onFilesChange, onClearAll }: FileMa
   const handleClearAll = async () => {
     setIsClearing(true);
     try {
-      await axios.delete(`${API_BASE_URL}/api/clear-files`);
+      await axios.delete(`${API_BASE_URL}/api/clear-files`, { headers: sessionHeaders() });
       onClearAll();
     } catch (error) {
       console.error('Failed to clear files:', error);
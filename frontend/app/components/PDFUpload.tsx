@@ -3,6 +3,7 @@
 import { useRef, useState } from 'react';
 import axios from 'axios';
 import { FaFileUpload, FaExclamationCircle } from 'react-icons/fa';
+import { sessionHeaders } from '../session';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:8000';
 
@@ -21,6 +22,23 @@ export interface UploadedFile {
   includedInRAG?: boolean;
 }
 
+interface IndexJob {
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  error: string | null;
+  result: { failed_files?: Record<string, string> } | null;
+}
+
+// Uploads are indexed by a background job; wait for it so extraction errors are reported
+async function waitForIndexJob(statusUrl: string): Promise<IndexJob> {
+  while (true) {
+    const { data } = await axios.get<IndexJob>(`${API_BASE_URL}${statusUrl}`, { headers: sessionHeaders() });
+    if (data.status === 'completed' || data.status === 'failed') {
+      return data;
+    }
+    await new Promise(resolve => setTimeout(resolve, 1000));
+  }
+}
+
 export default function FileUpload({ onFilesUploaded, onRAGToggle, hasFiles, ragEnabled, existingFiles = [] }: FileUploadProps) {
   const fileInputRef = useRef<HTMLInputElement>(null);
   const [uploadStatus, setUploadStatus] = useState<'idle' | 'success' | 'error' | 'uploading'>('idle');
@@ -67,31 +85,37 @@ export default function FileUpload({ onFilesUploaded, onRAGToggle, hasFiles, rag
       });
 
       const response = await axios.post(`${API_BASE_URL}/api/upload-files`, formData, {
-        headers: { 'Content-Type': 'multipart/form-data' },
+        headers: { 'Content-Type': 'multipart/form-data', ...sessionHeaders() },
       });
-
-      setUploadStatus('success');
-      setErrorMsg(null);
-      
-      // Update new files with success status
-      const updatedNewFiles: UploadedFile[] = files.map(file => ({
-        name: file.name,
-        status: 'success',
-        includedInRAG: true
-      }));
+      const job = await waitForIndexJob(response.data.status_url);
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Indexing failed');
+      }
+
+      // Files the job could not extract are reported per file; the rest are indexed
+      const failedFiles = job.result?.failed_files || {};
+      const updatedNewFiles: UploadedFile[] = files.map((file): UploadedFile => (
+        failedFiles[file.name]
+          ? { name: file.name, status: 'error', errorMsg: failedFiles[file.name], includedInRAG: false }
+          : { name: file.name, status: 'success', includedInRAG: true }
+      ));
+      const failedNames = Object.keys(failedFiles);
+      setUploadStatus(failedNames.length ? 'error' : 'success');
+      setErrorMsg(failedNames.length ? `Could not index: ${failedNames.join(', ')}` : null);
 
       // Combine existing files with updated new files
       const finalFiles = [...existingFiles, ...updatedNewFiles];
-      onFilesUploaded(true, finalFiles);
+      onFilesUploaded(finalFiles.some(file => file.status === 'success'), finalFiles);
     } catch (error: any) {
+      const detail = error.response?.data?.detail || error.message || 'Upload failed';
       setUploadStatus('error');
-      setErrorMsg(error.response?.data?.detail || 'Upload failed');
+      setErrorMsg(detail);
       
       // Update new files with error status
       const errorFiles: UploadedFile[] = files.map(file => ({
         name: file.name,
         status: 'error',
-        errorMsg: error.response?.data?.detail || 'Upload failed',
+        errorMsg: detail,
         includedInRAG: false
       }));
 
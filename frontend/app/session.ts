@@ -0,0 +1,15 @@
+// Each browser gets its own index on the API; the id is kept across reloads
+const SESSION_STORAGE_KEY = 'aimakerspace-session-id';
+
+export function getSessionId(): string {
+  let sessionId = window.localStorage.getItem(SESSION_STORAGE_KEY);
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    window.localStorage.setItem(SESSION_STORAGE_KEY, sessionId);
+  }
+  return sessionId;
+}
+
+export function sessionHeaders(): Record<string, string> {
+  return { 'X-Session-Id': getSessionId() };
+}
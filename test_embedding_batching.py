@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from aimakerspace.openai_utils.embedding import EmbeddingModel, make_batches
+from aimakerspace.openai_utils.embedding_cache import EmbeddingCache
+
+
+class FakeEmbeddingsHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/embeddings endpoint: the vector encodes the input text's number"""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+
+        with server.lock:
+            server.requests.append(len(inputs))
+            fail = server.failures_left > 0
+            if fail:
+                server.failures_left -= 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if fail:
+                self._send(429, {"error": {"message": "rate limited", "type": "rate_limit"}}, {"retry-after": "0"})
+                return
+            time.sleep(server.latency)
+            data = [
+                {"object": "embedding", "index": i, "embedding": [float(text.split("-")[1]), 1.0]}
+                for i, text in enumerate(inputs)
+            ]
+            self._send(200, {
+                "object": "list",
+                "data": data,
+                "model": body["model"],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send(self, status, payload, headers=None):
+        encoded = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def fake_embeddings_server(failures: int = 0, latency: float = 0.02):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeEmbeddingsHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.failures_left = failures
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.latency = latency
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    saved = {name: os.environ.get(name) for name in ("OPENAI_API_KEY", "OPENAI_BASE_URL")}
+    os.environ["OPENAI_API_KEY"] = "test-key"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    try:
+        yield server
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        server.shutdown()
+        server.server_close()
+
+
+def test_make_batches_respects_count_and_token_budget():
+    """Batches never exceed the item limit or the estimated token budget"""
+    texts = ["x" * 40] * 10  # ~11 estimated tokens each
+    assert make_batches(texts, max_batch_size=4, max_batch_tokens=10_000) == [(0, 4), (4, 8), (8, 10)]
+    assert make_batches(texts, max_batch_size=100, max_batch_tokens=25) == [(0, 2), (2, 4), (4, 6), (6, 8), (8, 10)]
+    # A single oversized text still gets its own batch
+    assert make_batches(["x" * 1000], max_batch_size=10, max_batch_tokens=5) == [(0, 1)]
+
+
+def test_batched_embeddings_against_fake_server():
+    """Batches run concurrently, retry on 429 and come back in input order"""
+    texts = [f"text-{i}" for i in range(1000)]
+    with fake_embeddings_server(failures=2) as server:
+        model = EmbeddingModel(max_batch_size=50, max_concurrency=4, retry_base_delay=0.01)
+        embeddings = asyncio.run(model.async_get_embeddings(texts))
+
+    assert [int(vector[0]) for vector in embeddings] == list(range(1000))
+    assert len(server.requests) == 20 + 2  # 20 batches plus two rate-limited attempts
+    assert max(server.requests) <= 50
+    assert 1 < server.max_in_flight <= 4
+    print(f"Fake server throughput: {model.last_throughput:.1f} texts/s")
+
+
+def test_sync_embeddings_against_fake_server():
+    """The synchronous path batches the same way"""
+    texts = [f"text-{i}" for i in range(120)]
+    with fake_embeddings_server(failures=1) as server:
+        model = EmbeddingModel(max_batch_size=50, retry_base_delay=0.01)
+        embeddings = model.get_embeddings(texts)
+
+    assert [int(vector[0]) for vector in embeddings] == list(range(120))
+    assert server.requests[-3:] == [50, 50, 20]
+
+
+def test_embedding_cache_only_sends_misses():
+    """Re-embedding the same texts is served from disk; only new texts hit the API"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = EmbeddingCache(os.path.join(tmp_dir, "cache.sqlite3"), max_entries=150)
+        with fake_embeddings_server() as server:
+            model = EmbeddingModel(max_batch_size=50, cache=cache)
+            first = asyncio.run(model.async_get_embeddings([f"text-{i}" for i in range(100)]))
+            assert sum(server.requests) == 100
+
+            texts = [f"text-{i}" for i in range(90, 110)] + ["text-105"]
+            second = asyncio.run(model.async_get_embeddings(texts))
+            assert sum(server.requests) == 110  # only text-100..109 were sent, once each
+            assert [int(vector[0]) for vector in second] == list(range(90, 110)) + [105]
+            assert second[:10] == first[90:]
+
+        stats = cache.stats()
+        assert stats["hits"] == 10 and stats["misses"] == 111
+        assert stats["entries"] == 110
+
+        # Least recently used rows are evicted once the cap is exceeded
+        cache.put_many("text-embedding-3-small", [f"extra-{i}" for i in range(60)], [[0.0, 1.0]] * 60)
+        assert len(cache) == 150
+        assert cache.get_many("text-embedding-3-small", ["text-0", "text-95"])[0] is None
+        cache.close()
+
+
+if __name__ == "__main__":
+    test_make_batches_respects_count_and_token_budget()
+    test_batched_embeddings_against_fake_server()
+    test_sync_embeddings_against_fake_server()
+    test_embedding_cache_only_sends_misses()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import asyncio
+import io
+import tempfile
+
+from aimakerspace.ingestion import IngestionPipeline, save_uploads
+from aimakerspace.index_jobs import IndexJobManager
+from aimakerspace.vectordatabase import VectorDatabase
+from test_vectordatabase import FakeEmbeddingModel
+
+
+class FakeUpload:
+    """Async reader with the parts of FastAPI's UploadFile the pipeline uses"""
+
+    def __init__(self, filename: str, content: bytes):
+        self.filename = filename
+        self._buffer = io.BytesIO(content)
+
+    async def read(self, size: int = -1) -> bytes:
+        await asyncio.sleep(0)
+        return self._buffer.read(size)
+
+
+def test_pipeline_indexes_files_in_order():
+    """Every file flows through save -> parse -> embed and chunks keep upload order"""
+    uploads = [
+        FakeUpload(f"notes-{i}.txt", (f"File {i} says hello. " * 30).encode())
+        for i in range(5)
+    ]
+    vector_db = VectorDatabase(FakeEmbeddingModel())
+    pipeline = IngestionPipeline(vector_db, chunk_size=200, chunk_overlap=20, queue_size=1)
+    result = asyncio.run(pipeline.run(uploads))
+
+    assert result["documents"] == 5
+    assert result["file_info"] == [f"notes-{i}.txt" for i in range(5)]
+    assert result["chunks"][0].startswith("File 0")
+    assert "File 4" in result["chunks"][-1]
+    assert len(vector_db) == len(result["chunks"])
+    # Every chunk keeps its source file and character offsets
+    last = vector_db.get_document(len(vector_db) - 1)
+    assert last["source"] == "notes-4.txt" and last["page"] is None
+    assert last["end"] == len("File 4 says hello. " * 30) and last["text"] == result["chunks"][-1]
+    assert set(result["timings"]) == {"save", "parse", "embed", "total"}
+
+
+def test_parallel_parsing_keeps_order_and_skips_failed_files():
+    """Files parsed in a process pool still index in upload order; a corrupt file is reported"""
+    uploads = [FakeUpload(f"part-{i}.txt", (f"Part {i} body. " * 50).encode()) for i in range(4)]
+    uploads.insert(2, FakeUpload("corrupt.docx", b"not a zip"))
+    vector_db = VectorDatabase(FakeEmbeddingModel())
+    pipeline = IngestionPipeline(vector_db, chunk_size=200, chunk_overlap=0, parse_workers=3)
+    result = asyncio.run(pipeline.run(uploads))
+
+    assert result["file_info"] == [f"part-{i}.txt" for i in range(4)]
+    assert list(result["errors"]) == ["corrupt.docx"]
+    assert list(result["file_timings"]) == result["file_info"]
+    sources = [vector_db.get_document(i)["source"] for i in range(len(vector_db))]
+    assert sources == sorted(sources) and len(vector_db) == len(result["chunks"])
+
+
+def test_duplicate_files_and_chunks_are_indexed_once():
+    """Re-uploads skip extraction, shared chunks are embedded once and survive deleting one of their files"""
+    lecture = "".join(f"Lecture slide {i} explains retrieval. " for i in range(20)).encode()
+    embedded = []
+    embedding_model = FakeEmbeddingModel()
+    original = embedding_model.async_get_embeddings
+
+    async def recording_get_embeddings(list_of_text):
+        embedded.extend(list_of_text)
+        return await original(list_of_text)
+
+    embedding_model.async_get_embeddings = recording_get_embeddings
+    vector_db = VectorDatabase(embedding_model)
+    pipeline = IngestionPipeline(vector_db, chunk_size=100, chunk_overlap=0)
+    first = asyncio.run(pipeline.run([FakeUpload("week1.txt", lecture)]))
+    chunk_count = len(vector_db)
+    assert first["skipped"] == {"files": {}, "chunks": 0} and len(embedded) == chunk_count
+
+    second = asyncio.run(pipeline.run([
+        FakeUpload("week1.txt", lecture),
+        FakeUpload("week1-copy.txt", lecture),
+        FakeUpload("week2.txt", lecture[:300] + b"New material on reranking."),
+    ]))
+    assert second["skipped"]["files"] == {"week1.txt": "week1.txt", "week1-copy.txt": "week1.txt"}
+    assert second["skipped"]["chunks"] == 3 and second["file_info"] == ["week2.txt"]
+    assert len(vector_db) == chunk_count + 1 and len(embedded) == chunk_count + 1
+    assert vector_db.get_document(0)["sources"] == ["week1.txt", "week1-copy.txt", "week2.txt"]
+    copy_hits = vector_db.lexical_search("slide", k=50, filter={"file": "week1-copy.txt"})
+    assert len(copy_hits) == chunk_count
+
+    # Deleting the original keeps the chunks the other files still need
+    assert vector_db.delete_source("week1.txt") == 0
+    assert vector_db.get_document(0)["source"] == "week1-copy.txt"
+    assert vector_db.delete_source("week1-copy.txt") == chunk_count - 3
+    assert len(vector_db) == 4 and vector_db.get_document(0)["sources"] == ["week2.txt"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vector_db.save(tmp_dir)
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel())
+        assert loaded.documents.find(vector_db.documents.text(0)) == 0
+        assert loaded.get_document(0)["sources"] == ["week2.txt"]
+        assert set(loaded.metadata["file_hashes"]) == {"week1.txt", "week1-copy.txt", "week2.txt"}
+
+
+def test_background_job_reports_progress():
+    """Submitted jobs return immediately and expose progress while the index fills"""
+    uploads = [FakeUpload(f"doc-{i}.txt", (f"Doc {i} text. " * 100).encode()) for i in range(3)]
+    vector_db = VectorDatabase(FakeEmbeddingModel())
+    snapshots = []
+
+    async def scenario():
+        manager = IndexJobManager(workers=1)
+        await manager.start()
+        saved = await save_uploads(uploads)
+
+        def on_progress(event, filename, chunks):
+            job.on_progress(event, filename, chunks)
+            if event == "embedded":
+                snapshots.append((job.chunks_done, len(vector_db)))
+
+        async def runner(job):
+            pipeline = IngestionPipeline(
+                vector_db, chunk_size=200, chunk_overlap=0, embed_batch_size=2, on_progress=on_progress
+            )
+            return await pipeline.run_saved(saved)
+
+        job = manager.submit([name for name, _ in saved], runner)
+        assert job.status == "queued"
+        await manager.wait(job)
+        await manager.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "completed" and job.stage == "done"
+    assert job.files_indexed == 3 and job.chunks_done == job.chunks_total == len(job.result["chunks"])
+    # Chunks became searchable batch by batch, not only at the end
+    assert len(snapshots) > 3 and snapshots[0][1] == 2
+    assert job.to_dict()["eta_seconds"] == 0.0
+
+
+if __name__ == "__main__":
+    test_pipeline_indexes_files_in_order()
+    test_parallel_parsing_keeps_order_and_skips_failed_files()
+    test_duplicate_files_and_chunks_are_indexed_once()
+    test_background_job_reports_progress()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import asyncio
+import tempfile
+import numpy as np
+from aimakerspace.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+from aimakerspace.vectordatabase import VectorDatabase
+from test_vectordatabase import FakeEmbeddingModel
+
+CHUNKS = [
+    "Assignment 3 asks you to implement search_by_text with cosine similarity.",
+    "The syllabus covers embeddings, vector databases and retrieval.",
+    "Office hours are on Tuesdays; bring questions about assignment 2.",
+    "Cosine similarity compares the angle between two embedding vectors.",
+]
+
+
+class OfflineEmbeddingModel(FakeEmbeddingModel):
+    """Embeds documents but fails every query, like an embeddings API outage"""
+
+    def get_embedding(self, text):
+        raise ConnectionError("embeddings API unreachable")
+
+    async def async_get_embedding(self, text):
+        await asyncio.sleep(1)
+        raise ConnectionError("embeddings API unreachable")
+
+
+def test_bm25_ranks_exact_terms():
+    """Rare exact terms win, ids come back in BM25 order and state round-trips"""
+    assert tokenize("Assignment #3: search_by_text()") == ["assignment", "3", "search_by_text"]
+    index = LexicalIndex()
+    index.add(range(len(CHUNKS)), CHUNKS)
+
+    scores = index.scores("search_by_text assignment 3")
+    assert np.argmax(scores) == 0 and scores[1] == 0
+    assert scores[2] > 0  # "assignment" alone still matches
+
+    restored = LexicalIndex()
+    restored.load_state(index.state())
+    assert np.allclose(restored.scores("cosine similarity"), index.scores("cosine similarity"))
+
+    index.compact(np.array([1, 3]))
+    assert len(index) == 2 and np.argmax(index.scores("cosine")) == 1
+
+
+def test_reciprocal_rank_fusion():
+    """Ids ranked well by both lists beat ids that only one list found"""
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+    assert [doc_id for doc_id, _ in fused] == [1, 3, 2, 4]
+
+
+def test_search_modes_and_offline_fallback():
+    """Lexical mode never embeds the query; hybrid mode falls back to it when embedding fails"""
+    vector_db = VectorDatabase(OfflineEmbeddingModel())
+    vector_db.insert_many(CHUNKS, FakeEmbeddingModel().get_embeddings(CHUNKS), source="course.pdf")
+
+    lexical = vector_db.search_by_text("office hours", k=2, mode="lexical")
+    assert [result.id for result in lexical] == [2]
+    assert vector_db.search_by_text("cosine", k=2, mode="hybrid", return_as_text=True) == [CHUNKS[3], CHUNKS[0]]
+    fallback = asyncio.run(vector_db.asearch_by_text("assignment 3", k=1, mode="hybrid", embed_timeout=0.05))
+    assert fallback[0].id == 0
+    try:
+        vector_db.search_by_text("cosine", k=2)
+        assert False, "vector mode needs the query embedding"
+    except ConnectionError:
+        pass
+
+    # Hybrid fusion of both rankings when embeddings work
+    online_db = VectorDatabase(FakeEmbeddingModel())
+    online_db.insert_many(CHUNKS, FakeEmbeddingModel().get_embeddings(CHUNKS))
+    hybrid = online_db.search_by_text(CHUNKS[1], k=4, mode="hybrid")
+    assert hybrid[0].id == 1 and len(hybrid) == 4
+
+    vector_db.delete([0])
+    assert vector_db.lexical_search("assignment", k=5) == vector_db.lexical_search("assignment", k=5, filter={"file": "course.pdf"})
+    assert [result.id for result in vector_db.lexical_search("assignment", k=5)] == [2]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vector_db.save(tmp_dir)
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=False)
+        assert [result.id for result in loaded.lexical_search("assignment", k=5)] == [2]
+
+
+if __name__ == "__main__":
+    test_bm25_ranks_exact_terms()
+    test_reciprocal_rank_fusion()
+    test_search_modes_and_offline_fallback()
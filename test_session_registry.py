@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import tempfile
+
+import numpy as np
+
+from aimakerspace.session_registry import SessionRegistry
+from aimakerspace.vectordatabase import VectorDatabase
+from test_vectordatabase import FakeEmbeddingModel
+
+
+def make_db(texts, source):
+    rng = np.random.default_rng(len(texts))
+    vector_db = VectorDatabase(FakeEmbeddingModel())
+    vector_db.insert_many(texts, rng.normal(size=(len(texts), 64)).tolist(), source=source)
+    return vector_db
+
+
+def test_memory_accounting_counts_texts_but_not_memory_maps():
+    """Chunk texts count towards a session's memory; an index memory-mapped from disk mostly does not"""
+    vector_db = make_db(["x" * 2000 for _ in range(50)], "long.pdf")
+    assert vector_db.resident_nbytes > vector_db.nbytes + 50 * 2000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vector_db.save(tmp_dir)
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=True)
+        assert loaded.resident_nbytes < vector_db.resident_nbytes - 50 * (2000 + 64 * 4)
+        loaded.insert("new", np.ones(64))  # the first write copies the matrix into RAM
+        assert loaded.resident_nbytes > vector_db.nbytes
+        del loaded
+
+
+def test_sessions_are_isolated_and_evicted_least_recently_used_first():
+    """Over budget the idle LRU session is saved and dropped, then paged back in on next use"""
+
+    async def scenario(root):
+        registry = SessionRegistry(root, lambda path: VectorDatabase.load(path, FakeEmbeddingModel()), memory_budget_bytes=1 << 20)
+        for session_id in ("alice", "bob"):
+            session = await registry.get(session_id)
+            session.vector_db = make_db([f"{session_id} chunk {i}" for i in range(100)], f"{session_id}.pdf")
+            session.files = [f"{session_id}.pdf"]
+            session.dirty = True
+
+        await registry.clear(await registry.get("bob"))
+        assert (await registry.get("alice")).chunk_count() == 100 and (await registry.get("bob")).vector_db is None
+
+        registry.memory_budget_bytes = (await registry.get("alice")).nbytes  # only one such index fits
+        carol = await registry.get("carol")
+        carol.vector_db = make_db([f"carol chunk {i}" for i in range(100)], "carol.pdf")
+        with registry.pinned(carol):
+            pass
+        # the empty bob and then alice were least recently used: alice is written out in the background
+        assert "alice" not in registry and "bob" not in registry and "carol" in registry
+
+        alice = await registry.get("alice")  # waits for that write, then pages alice back in
+        assert alice.nbytes < registry.memory_budget_bytes / 2  # the matrix and texts stay memory-mapped
+        assert VectorDatabase.exists(os.path.join(root, "alice")) and not os.path.exists(os.path.join(root, "bob"))
+        assert alice.files == ["alice.pdf"] and alice.chunk_count() == 100
+        assert [result.text for result in alice.vector_db.lexical_search("chunk 7", k=1)] == ["alice chunk 7"]
+        await registry.close()  # carol was evicted unchanged, so nothing was written for it
+        assert "carol" not in registry and not os.path.exists(os.path.join(root, "carol"))
+        assert registry.stats()["loads"] == 1 and registry.stats()["evictions"] == 3
+
+        with registry.pinned(alice):
+            registry.memory_budget_bytes = 0
+            assert registry.evict_idle() == 0 and registry.enforce_budget() == 0 and "alice" in registry
+
+    with tempfile.TemporaryDirectory() as root:
+        asyncio.run(scenario(root))
+
+
+if __name__ == "__main__":
+    test_memory_accounting_counts_texts_but_not_memory_maps()
+    test_sessions_are_isolated_and_evicted_least_recently_used_first()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+
+import numpy as np
+from docx import Document
+from docx.enum.section import WD_SECTION
+from docx.enum.text import WD_BREAK
+
+from aimakerspace.text_utils import (
+    PARAGRAPH,
+    SENTENCE,
+    WORD,
+    CharacterTextSplitter,
+    MultiFileLoader,
+    TextFileLoader,
+    TokenTextSplitter,
+    _split_range,
+    extract_docx_text,
+    find_boundaries,
+    iter_text,
+    join_pages,
+    read_text,
+)
+
+
+def test_join_pages_keeps_order_and_offsets():
+    """Pages are joined once, in order, and each page's start offset is recorded"""
+    text, offsets = join_pages(["first page", "", "third"])
+    assert text == "first page\nthird\n"
+    assert offsets == [0, 11, 11]
+    assert text[offsets[2]:].startswith("third")
+    assert join_pages([]) == ("", [])
+
+
+def test_split_range_covers_every_page_once():
+    """Page ranges handed to workers are contiguous and cover the whole document"""
+    ranges = _split_range(10, 3)
+    assert ranges == [(0, 4), (4, 7), (7, 10)]
+    assert _split_range(2, 8) == [(0, 1), (1, 2)]
+
+
+def test_span_splitting_matches_split():
+    """Lazy spans, offset arrays and materialized chunks all agree with split()"""
+    splitter = CharacterTextSplitter(chunk_size=10, chunk_overlap=3)
+    texts = ["abcdefghijklmnopqrstuvwxyz", "", "short", "x" * 14]
+    expected = [chunk for text in texts for chunk in splitter.split(text)]
+
+    spans = list(splitter.iter_spans(iter(texts)))
+    doc_ids, starts, ends = splitter.span_arrays([len(text) for text in texts])
+    assert spans == list(zip(doc_ids.tolist(), starts.tolist(), ends.tolist()))
+    assert [texts[d][s:e] for d, s, e in spans] == expected
+    assert spans[:3] == [(0, 0, 10), (0, 7, 17), (0, 14, 24)] and spans[4] == (2, 0, 5)
+
+    chunks = splitter.split_spans(texts)
+    assert len(chunks) == len(expected) and chunks[-1] == expected[-1]
+    assert chunks[1:3] == expected[1:3] and list(chunks.spans()) == spans
+    assert splitter.split_texts(texts) == expected
+    assert len(splitter.split_spans([])) == 0 and splitter.span_arrays(np.zeros(0))[0].size == 0
+
+
+def test_token_splitter_packs_whole_sentences():
+    """Chunks fit the token budget, end on the strongest boundary and never split words"""
+    text = "  First sentence here. Second one follows!\n\nNew paragraph starts now and runs on.  "
+    cuts, trims, levels = find_boundaries(text)
+    assert text[cuts[0]:].startswith("First") and levels[0] == WORD
+    assert dict(zip(cuts.tolist(), levels.tolist()))[text.index("Second")] == SENTENCE
+    assert dict(zip(cuts.tolist(), levels.tolist()))[text.index("New")] == PARAGRAPH
+
+    splitter = TokenTextSplitter(chunk_tokens=12, chars_per_token=4)
+    pieces = splitter.split_with_offsets(text)
+    assert [chunk for chunk, _, _ in pieces] == [
+        "First sentence here. Second one follows!",
+        "New paragraph starts now and runs on.",
+    ]
+    assert all(text[start:end] == chunk for chunk, start, end in pieces)
+    assert all(splitter.estimate_tokens(chunk) <= 12 for chunk, _, _ in pieces)
+
+    words = "alpha beta gamma delta epsilon zeta eta theta iota kappa " * 20
+    for overlap in (0, 3):
+        chunks = TokenTextSplitter(chunk_tokens=8, chunk_overlap_tokens=overlap).split(words)
+        assert all(len(chunk) <= 32 and set(chunk.split()) <= set(words.split()) for chunk in chunks)
+        assert chunks[-1].endswith("kappa")
+    assert TokenTextSplitter(chunk_tokens=2).split("abcdefghijkl") == ["abcdefgh", "ijkl"]
+
+    spans = splitter.split_spans([text, "", "Tail."])
+    assert list(spans) == [chunk for chunk, _, _ in pieces] + ["Tail."]
+    assert spans.doc_ids.tolist() == [0, 0, 2]
+
+
+def test_load_files_keeps_order_and_isolates_failures():
+    """Files load in parallel but documents keep input order; a broken file is only reported"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = []
+        for name, content in [("a.txt", b"alpha"), ("broken.docx", b"not a zip"), ("c.txt", b"gamma"), ("d.txt", b"delta")]:
+            path = os.path.join(tmp_dir, name)
+            with open(path, "wb") as f:
+                f.write(content)
+            files.append(path)
+
+        loader = MultiFileLoader()
+        reports = loader.load_files(files, workers=2)
+
+    assert loader.documents == ["alpha", "gamma", "delta"]
+    assert loader.file_info == ["a.txt", "c.txt", "d.txt"]
+    assert [report["filename"] for report in reports] == ["a.txt", "broken.docx", "c.txt", "d.txt"]
+    assert reports[1]["error"] and reports[1]["documents"] == 0
+    assert all(report["error"] is None and report["seconds"] >= 0 for i, report in enumerate(reports) if i != 1)
+
+
+def test_text_loader_detects_encoding_in_one_pass():
+    """BOMs, BOM-less UTF-16 and Windows-1252 decode correctly; directories keep walk order"""
+    text = "Caf\u00e9 \u201cnotes\u201d \u2014 week 3\n" * 5000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for encoding in ("utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be", "utf-32", "cp1252"):
+            path = os.path.join(tmp_dir, f"{encoding}.txt")
+            with open(path, "wb") as f:
+                f.write(text.encode(encoding))
+            assert read_text(path) == text, encoding
+            assert "".join(iter_text(path, block_size=1001)) == text, encoding
+        open(os.path.join(tmp_dir, "empty.txt"), "wb").close()
+
+        loader = TextFileLoader(tmp_dir, workers=3)
+        documents = loader.load_documents()
+        expected = [name for _, _, files in os.walk(tmp_dir) for name in files]
+        assert len(documents) == len(expected) == 8
+        assert documents == ["" if name == "empty.txt" else text for name in expected]
+        assert TextFileLoader(tmp_dir).load_documents() == documents  # one process reads them in the same order
+
+
+def test_streaming_docx_keeps_order_pages_and_merged_cells():
+    """Tables stay where they are in the document, merged cells appear once and page breaks are offsets"""
+    document = Document()
+    document.add_paragraph("Intro\tnotes")
+    table = document.add_table(rows=2, cols=2)
+    for row in range(2):
+        for column in range(2):
+            table.cell(row, column).text = f"r{row}c{column}"
+    table.cell(0, 0).merge(table.cell(0, 1))
+    paragraph = document.add_paragraph("Before")
+    paragraph.add_run().add_break(WD_BREAK.PAGE)
+    paragraph.add_run("after")
+    document.add_section(WD_SECTION.NEW_PAGE)
+    document.add_paragraph("Appendix")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "notes.docx")
+        document.save(path)
+        text, page_offsets, section_offsets = extract_docx_text(path)
+        loader = MultiFileLoader()
+        loader.load_file(path, "notes.docx")
+
+    assert text == "Intro\tnotes\nr0c0\nr0c1\nr1c0\nr1c1\nBeforeafter\n\nAppendix\n"
+    assert [text[offset:offset + 5] for offset in page_offsets] == ["Intro", "after"]
+    assert [text[offset:offset + 5] for offset in section_offsets] == ["Intro", "Appen"]
+    assert loader.documents == [text] and loader.page_offsets == [page_offsets]
+
+
+if __name__ == "__main__":
+    test_join_pages_keeps_order_and_offsets()
+    test_split_range_covers_every_page_once()
+    test_span_splitting_matches_split()
+    test_token_splitter_packs_whole_sentences()
+    test_load_files_keeps_order_and_isolates_failures()
+    test_text_loader_detects_encoding_in_one_pass()
+    test_streaming_docx_keeps_order_pages_and_merged_cells()
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from aimakerspace.vectordatabase import VectorDatabase, cosine_similarity
+from aimakerspace.openai_utils.embedding_cache import QueryEmbeddingCache
+from aimakerspace.vector_index import BinaryIndex, IVFIndex
+
+
+class FakeEmbeddingModel:
+    """Deterministic stand-in for EmbeddingModel so tests never hit the API"""
+
+    def __init__(self, dim: int = 16):
+        self.dim = dim
+
+    def _embed(self, text: str):
+        rng = np.random.default_rng(abs(hash(text)) % (2**32))
+        return rng.normal(size=self.dim).tolist()
+
+    def get_embedding(self, text):
+        return self._embed(text)
+
+    def get_embeddings(self, list_of_text):
+        return [self._embed(text) for text in list_of_text]
+
+    async def async_get_embedding(self, text):
+        return self._embed(text)
+
+    async def async_get_embeddings(self, list_of_text):
+        return [self._embed(text) for text in list_of_text]
+
+
+def test_matrix_search_matches_reference():
+    """Vectorized cosine search returns the same ranking as the per-vector loop"""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 32))
+    keys = [f"chunk-{i}" for i in range(len(vectors))]
+
+    vector_db = VectorDatabase(FakeEmbeddingModel(), initial_capacity=4)
+    for key, vector in zip(keys, vectors):
+        vector_db.insert(key, vector)
+
+    query = rng.normal(size=32)
+    results = vector_db.search(query, k=5)
+
+    reference = sorted(
+        ((key, cosine_similarity(query, vector)) for key, vector in zip(keys, vectors)),
+        key=lambda x: x[1],
+        reverse=True,
+    )[:5]
+    assert [result.text for result in results] == [key for key, _ in reference]
+    assert np.allclose([result.score for result in results], [s for _, s in reference], atol=1e-5)
+
+    # Custom metrics still go through the slow path
+    dot = lambda a, b: float(np.dot(a, b))
+    slow = vector_db.search(query, k=3, distance_measure=dot)
+    assert len(slow) == 3
+
+    assert np.allclose(vector_db.retrieve(7), vectors[7], atol=1e-5)
+    assert vector_db.retrieve(len(vectors)) is None
+
+
+def test_ids_and_document_metadata():
+    """Every insert gets its own id; results resolve text and source metadata lazily"""
+    vector_db = VectorDatabase(FakeEmbeddingModel())
+    first = vector_db.insert("same text", np.array([1.0, 0.0]))
+    second = vector_db.insert("same text", np.array([0.0, 2.0]))
+    assert (first, second) == (0, 1) and len(vector_db) == 2
+    assert np.allclose(vector_db.retrieve(second), [0.0, 2.0])
+
+    ids = vector_db.insert_many(
+        ["intro", "grading"], [[1.0, 1.0], [1.0, -1.0]], source="syllabus.pdf", pages=[1, 3], starts=[0, 800], ends=[1000, 1800]
+    )
+    assert list(ids) == [2, 3]
+    result = vector_db.search([1.0, -0.9], k=1)[0]
+    assert result.id == 3 and result.text == "grading"
+    assert result.metadata == {
+        "source": "syllabus.pdf", "sources": ["syllabus.pdf"], "page": 3, "start": 800, "end": 1800
+    }
+    assert vector_db.get_document(0)["source"] is None
+
+
+def test_aadd_texts_embeds_only_new_chunks():
+    """Incremental adds embed just the new texts and keep earlier rows searchable"""
+    embedding_model = FakeEmbeddingModel()
+    calls = []
+    original = embedding_model.async_get_embeddings
+
+    async def recording_get_embeddings(list_of_text):
+        calls.append(list(list_of_text))
+        return await original(list_of_text)
+
+    embedding_model.async_get_embeddings = recording_get_embeddings
+    vector_db = VectorDatabase(embedding_model)
+    asyncio.run(vector_db.abuild_from_list(["first", "second"]))
+    asyncio.run(vector_db.aadd_texts(["third"]))
+
+    assert calls == [["first", "second"], ["third"]]
+    assert len(vector_db) == 3
+    top = vector_db.search(embedding_model.get_embedding("first"), k=1)[0]
+    assert top.text == "first" and abs(top.score - 1.0) < 1e-5
+
+
+def test_query_cache_skips_repeated_embeddings():
+    """Repeated (normalized) questions reuse the cached query embedding"""
+    embedding_model = FakeEmbeddingModel()
+    calls = []
+    original = embedding_model.get_embedding
+
+    def recording_get_embedding(text):
+        calls.append(text)
+        return original(text)
+
+    embedding_model.get_embedding = recording_get_embedding
+    query_cache = QueryEmbeddingCache(max_size=2, ttl_seconds=None)
+    vector_db = VectorDatabase(embedding_model, query_cache=query_cache)
+    vector_db.insert("chunk", np.ones(16))
+
+    vector_db.search_by_text("What is RAG?", k=1)
+    vector_db.search_by_text("  what is   rag? ", k=1)
+    assert calls == ["What is RAG?"]
+    assert query_cache.stats()["hits"] == 1
+
+    vector_db.search_by_text("first", k=1)
+    vector_db.search_by_text("second", k=1)  # evicts "what is rag?"
+    vector_db.search_by_text("What is RAG?", k=1)
+    assert len(calls) == 4 and len(query_cache) == 2
+
+
+def test_save_and_load_memory_mapped():
+    """A saved index reloads memory-mapped, searches identically and accepts new rows"""
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(50, 8))
+    vector_db = VectorDatabase(FakeEmbeddingModel())
+    vector_db.insert_many([f"chunk-{i}" for i in range(50)], vectors, source="syllabus.pdf", pages=[2] * 50)
+    vector_db.metadata["files"] = ["syllabus.pdf"]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vector_db.save(tmp_dir)
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=True)
+
+        assert isinstance(loaded._matrix, np.memmap)
+        assert loaded.metadata == {"files": ["syllabus.pdf"]}
+        query = rng.normal(size=8)
+        assert loaded.search(query, k=5) == vector_db.search(query, k=5)
+        assert isinstance(loaded.documents._blob, np.memmap)
+        assert loaded.get_document(7) == {
+            "id": 7, "text": "chunk-7", "source": "syllabus.pdf", "sources": ["syllabus.pdf"],
+            "page": 2, "start": None, "end": None,
+        }
+
+        new_id = loaded.insert("new", np.ones(8), source="notes.txt")
+        assert new_id == 50 and len(loaded) == 51
+        assert np.allclose(loaded.retrieve(new_id), np.ones(8), atol=1e-5)
+        loaded.save(tmp_dir)
+        del loaded
+        reloaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=False)
+        assert reloaded.documents.texts([0, 50]) == ["chunk-0", "new"]
+        assert reloaded.get_document(50)["source"] == "notes.txt"
+
+
+def test_ivf_index_matches_exact_and_round_trips():
+    """IVF probing every list equals exact search; trained lists survive save/load"""
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(400, 16))
+    keys = [f"chunk-{i}" for i in range(len(vectors))]
+    exact_db = VectorDatabase(FakeEmbeddingModel())
+    exact_db.insert_many(keys, vectors)
+
+    ivf = IVFIndex(n_lists=8, nprobe=8, min_train_size=100)
+    ivf_db = VectorDatabase(FakeEmbeddingModel(), index=ivf)
+    for start in range(0, len(vectors), 50):
+        ivf_db.insert_many(keys[start : start + 50], vectors[start : start + 50])
+    assert ivf.is_trained and ivf.trained_size == 400  # trained at 100, retrained at 4x growth
+    assert (ivf._assignments[: len(vectors)] >= 0).all()
+
+    query = rng.normal(size=16)
+    assert ivf_db.search(query, k=5) == exact_db.search(query, k=5)
+
+    ivf.nprobe = 1
+    assert len(ivf.candidates(query / np.linalg.norm(query), 5)) < len(vectors)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ivf_db.save(tmp_dir)
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=False)
+        assert loaded.index.config() == ivf.config()
+        assert loaded.search(query, k=5) == ivf_db.search(query, k=5)
+
+
+def test_quantized_precisions_and_binary_rerank():
+    """float16/int8 storage keeps rankings and scores close; binary shortlists are re-ranked"""
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(1000, 64))
+    keys = [f"chunk-{i}" for i in range(len(vectors))]
+    query = vectors[10] + rng.normal(scale=0.1, size=64)
+    exact_db = VectorDatabase(FakeEmbeddingModel())
+    exact_db.insert_many(keys, vectors)
+    exact = exact_db.search(query, k=5)
+
+    for precision in ("float16", "int8"):
+        vector_db = VectorDatabase(FakeEmbeddingModel(), precision=precision, initial_capacity=8)
+        vector_db.insert_many(keys, vectors)
+        results = vector_db.search(query, k=5)
+        assert results[0].text == "chunk-10"
+        assert np.allclose([r.score for r in results], [r.score for r in exact], atol=0.02)
+        assert np.allclose(vector_db.retrieve(3), vectors[3], atol=0.05)
+    assert vector_db.nbytes < exact_db.nbytes / 3
+
+    binary_db = VectorDatabase(FakeEmbeddingModel(), index=BinaryIndex(min_candidates=50))
+    binary_db.insert_many(keys, vectors)
+    assert len(binary_db.index.candidates(query / np.linalg.norm(query), 5)) == 50
+    # Shortlisted rows are re-scored with the stored vectors, so scores are exact
+    assert binary_db.search(query, k=1) == exact[:1]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vector_db.save(tmp_dir)
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=True)
+        assert loaded.precision == "int8" and loaded._matrix.dtype == np.int8
+        assert loaded.search(query, k=5) == vector_db.search(query, k=5)
+        loaded.insert("new", np.ones(64))
+        assert loaded.search(np.ones(64), k=1)[0].text == "new"
+        del loaded
+
+
+def test_filtered_search_scans_only_selected_files():
+    """filter={"file": ...} matches post-filtering exact results, also for ANN indexes and after reload"""
+    rng = np.random.default_rng(4)
+    vector_db = VectorDatabase(FakeEmbeddingModel())
+    ivf_db = VectorDatabase(FakeEmbeddingModel(), index=IVFIndex(n_lists=16, nprobe=16, min_train_size=50))
+    binary_db = VectorDatabase(FakeEmbeddingModel(), index=BinaryIndex(oversample=1, min_candidates=5))
+    sources = []
+    for batch in range(6):  # interleaved uploads -> several ranges per file
+        source = ["a.pdf", "b.pdf", "c.txt"][batch % 3]
+        vectors = rng.normal(size=(40, 8))
+        for db in (vector_db, ivf_db, binary_db):
+            db.insert_many([f"{source}-{batch}-{i}" for i in range(40)], vectors, source=source)
+        sources += [source] * 40
+    assert vector_db.documents.source_ranges(["a.pdf"]) == [(0, 40), (120, 160)]
+
+    query = rng.normal(size=8)
+    everything = vector_db.search(query, k=len(sources))
+    expected = [r for r in everything if sources[r.id] in ("a.pdf", "c.txt")][:5]
+    file_filter = {"file": ["a.pdf", "c.txt"]}
+    assert vector_db.search(query, k=5, filter=file_filter) == expected
+    assert ivf_db.search(query, k=5, filter=file_filter) == expected
+    # A 5-row binary shortlist holds fewer than k rows of b.pdf, so b.pdf is scanned exactly
+    expected_b = [r for r in everything if sources[r.id] == "b.pdf"][:5]
+    assert binary_db.search(query, k=5, filter={"file": "b.pdf"}) == expected_b
+    assert vector_db.search(query, k=5, filter={"file": "missing.pdf"}) == []
+    try:
+        vector_db.search(query, k=5, filter={"page": 1})
+        assert False, "unsupported filter fields should raise"
+    except ValueError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vector_db.save(tmp_dir)
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=False)
+        assert loaded.documents.source_ranges(["c.txt"]) == [(80, 120), (200, 240)]
+        assert loaded.search(query, k=5, filter=file_filter) == expected
+
+    # A deleted row in the shortlist leaves it short of k live rows, so the files are scanned exactly
+    all_files = {"file": ["a.pdf", "b.pdf", "c.txt"]}
+    shortlist = binary_db.index.candidates(query / np.linalg.norm(query), 5)
+    for db in (vector_db, binary_db):
+        db.delete([int(shortlist[0])])
+    assert binary_db.search(query, k=5, filter=all_files) == vector_db.search(query, k=5, filter=all_files)
+
+
+def test_delete_tombstones_and_compaction():
+    """Deleted chunks vanish from search at once; compaction reclaims them, even with concurrent writes"""
+    rng = np.random.default_rng(5)
+    vector_db = VectorDatabase(FakeEmbeddingModel(), index=BinaryIndex(min_candidates=20))
+    for source in ("old.pdf", "keep.pdf", "other.txt"):
+        vector_db.insert_many([f"{source}-{i}" for i in range(30)], rng.normal(size=(30, 8)), source=source)
+    query = rng.normal(size=8)
+    before = [r.text for r in vector_db.search(query, k=90)]
+
+    assert vector_db.delete_source("old.pdf") == 30
+    assert vector_db.delete([0, 30]) == 1  # 0 is already deleted
+    assert len(vector_db) == 59 and vector_db.retrieve(0) is None
+    expected = [text for text in before if not text.startswith("old.pdf") and text != "keep.pdf-0"]
+    assert [r.text for r in vector_db.search(query, k=90)] == expected
+    assert vector_db.search(query, k=5, filter={"file": "old.pdf"}) == []
+    assert vector_db.needs_compaction
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vector_db.save(tmp_dir)
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=True)
+        assert len(loaded) == 59 and [r.text for r in loaded.search(query, k=90)] == expected
+        del loaded
+
+    async def compact_while_writing():
+        task = asyncio.create_task(vector_db.acompact())
+        await asyncio.sleep(0)  # the copy is now running in a worker thread
+        vector_db.insert("late", query)
+        vector_db.delete([31])
+        return await task
+
+    keep = asyncio.run(compact_while_writing())
+    assert len(keep) == 60 and keep[0] == 31 and keep[-1] == 90
+    assert len(vector_db) == 59 and vector_db.documents.source_ranges(["keep.pdf"]) == [(0, 29)]
+    results = vector_db.search(query, k=90)
+    assert results[0].text == "late" and results[0].id == 59
+    assert [r.text for r in results[1:]] == [t for t in expected if t != "keep.pdf-1"]
+    assert vector_db.compact()[-1] == 59 and len(vector_db._matrix) == 59 and not vector_db.needs_compaction
+
+    # A shortlist left with fewer than k live rows falls back to scoring every row
+    shortlist = vector_db.index.candidates(query / np.linalg.norm(query), 5)
+    vector_db.delete(shortlist[2:].tolist())  # 2 of its 50 rows stay live, 11 rows in all
+    assert [r.text for r in vector_db.search(query, k=5)] == [r.text for r in vector_db.search(query, k=59)][:5]
+
+
+
+def test_compaction_keeps_source_changes_made_during_the_copy():
+    """Files removed or aliased while acompact copies rows in a thread are reflected once it installs"""
+    rng = np.random.default_rng(6)
+    vector_db = VectorDatabase(FakeEmbeddingModel())
+    vector_db.insert_many(["gone", "shared"], rng.normal(size=(2, 8)), source="f1")
+    vector_db.insert_many(["own"], rng.normal(size=(1, 8)), source="f2")
+    vector_db.documents.add_reference(1, "f2")
+    vector_db.insert_many(["dead"], rng.normal(size=(1, 8)), source="f0")
+    vector_db.delete_source("f0")
+
+    class CopyThenWrite(ThreadPoolExecutor):
+        """Runs the copy to completion, then edits the sources before compaction installs it"""
+
+        def submit(self, fn, *args):
+            future = super().submit(fn, *args)
+            future.result()
+            vector_db.delete_source("f1")
+            vector_db.add_source_alias("f2", "f3")
+            return future
+
+    with CopyThenWrite(max_workers=1) as executor:
+        asyncio.run(vector_db.acompact(executor))
+    assert vector_db.search(rng.normal(size=8), k=5, filter={"file": "f1"}) == []
+    live = {r.text: r.metadata["sources"] for r in vector_db.search(rng.normal(size=8), k=5)}
+    assert live == {"shared": ["f2", "f3"], "own": ["f2", "f3"]}
+    f3 = vector_db.search(rng.normal(size=8), k=5, filter={"file": "f3"})
+    assert sorted(r.text for r in f3) == ["own", "shared"]
+
+
+
+def test_saving_again_appends_only_new_rows():
+    """A second save to the same directory appends to the per-row files instead of rewriting them"""
+    rng = np.random.default_rng(7)
+    vector_db = VectorDatabase(FakeEmbeddingModel(), index=BinaryIndex(min_candidates=5))
+    vector_db.insert_many([f"a-{i}" for i in range(20)], rng.normal(size=(20, 8)), source="a.pdf")
+    query = rng.normal(size=8)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors_path = os.path.join(tmp_dir, "vectors.npy")
+        vector_db.save(tmp_dir)
+        before = (os.stat(vectors_path).st_ino, os.stat(os.path.join(tmp_dir, "doc_texts.npy")).st_ino)
+        sidecar = open(os.path.join(tmp_dir, "index.json")).read()
+
+        vector_db.insert_many([f"b-{i}" for i in range(10)], rng.normal(size=(10, 8)), source="b.pdf")
+        vector_db.delete([0])
+        asyncio.run(vector_db.asave(tmp_dir))
+        assert (os.stat(vectors_path).st_ino, os.stat(os.path.join(tmp_dir, "doc_texts.npy")).st_ino) == before
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel())
+        assert len(loaded) == 29 and loaded.documents.texts() == vector_db.documents.texts()
+        assert loaded.search(query, k=29) == vector_db.search(query, k=29)
+        del loaded
+
+        # A save interrupted before its sidecar was written still opens as the previous save
+        with open(os.path.join(tmp_dir, "index.json"), "w") as f:
+            f.write(sidecar)
+        old = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=False)
+        assert len(old.documents) == 20 and old.documents.texts()[-1] == "a-19" and len(old.index.state()["codes"]) == 20
+        # and saving it again appends after its 20 rows, replacing the interrupted save's
+        old.insert_many([f"new{i}" * (i + 1) for i in range(7)], rng.normal(size=(7, 8)), source="c.pdf")
+        old.save(tmp_dir)
+        reloaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel(), mmap=False)
+        assert reloaded.documents.texts() == old.documents.texts() and reloaded.documents.texts()[-1] == "new6" * 7
+        assert reloaded.search(query, k=27) == old.search(query, k=27)
+        assert np.array_equal(reloaded.index.state()["codes"], old.index.state()["codes"])
+
+        # Compaction renumbers rows, so the next save rewrites the files
+        vector_db.compact()
+        vector_db.save(tmp_dir)
+        assert os.stat(vectors_path).st_ino != before[0]
+        loaded = VectorDatabase.load(tmp_dir, FakeEmbeddingModel())
+        assert len(loaded) == 29 and loaded.search(query, k=29) == vector_db.search(query, k=29)
+        del loaded
+
+
+def test_index_trains_in_a_worker_thread():
+    """aadd_texts trains the IVF centroids off the event loop; rows added meanwhile are assigned on install"""
+    rng = np.random.default_rng(7)
+    ivf_db = VectorDatabase(FakeEmbeddingModel(), index=IVFIndex(n_lists=4, nprobe=4, min_train_size=50))
+    exact_db = VectorDatabase(FakeEmbeddingModel())
+    late = rng.normal(size=(10, 16))
+
+    class InsertDuringFit(ThreadPoolExecutor):
+        """Fits to completion, then inserts rows before the result is installed"""
+
+        def submit(self, fn, *args):
+            future = super().submit(fn, *args)
+            future.result()
+            assert not ivf_db.index.is_trained
+            ivf_db.insert_many([f"late-{i}" for i in range(10)], late, train=False)
+            return future
+
+    texts = [f"chunk-{i}" for i in range(60)]
+    with InsertDuringFit(max_workers=1) as executor:
+        asyncio.run(ivf_db.aadd_texts(texts[:40]))
+        assert not ivf_db.index.is_trained  # below min_train_size: nothing to fit
+        ivf_db.insert_many(texts[40:], FakeEmbeddingModel().get_embeddings(texts[40:]), train=False)
+        assert asyncio.run(ivf_db.atrain_index(executor))
+    assert ivf_db.index.is_trained and ivf_db.index.trained_size == 60 and len(ivf_db) == 70
+    exact_db.insert_many(texts, FakeEmbeddingModel().get_embeddings(texts))
+    exact_db.insert_many([f"late-{i}" for i in range(10)], late)
+    query = rng.normal(size=16)
+    assert (ivf_db.index._assignments[:70] >= 0).all()
+    assert [r.id for r in ivf_db.search(query, k=70)] == [r.id for r in exact_db.search(query, k=70)]
+
+    class CompactDuringFit(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            future = super().submit(fn, *args)
+            future.result()
+            ivf_db.delete([0])
+            ivf_db.compact()
+            return future
+
+    ivf_db.insert_many([f"more-{i}" for i in range(200)], rng.normal(size=(200, 16)), train=False)
+    with CompactDuringFit(max_workers=1) as executor:
+        assert not asyncio.run(ivf_db.atrain_index(executor))  # fitted on rows compaction renumbered
+    assert ivf_db.index.trained_size == 60 and ivf_db.index.needs_training(len(ivf_db))
+
+
+if __name__ == "__main__":
+    test_matrix_search_matches_reference()
+    test_ids_and_document_metadata()
+    test_aadd_texts_embeds_only_new_chunks()
+    test_query_cache_skips_repeated_embeddings()
+    test_save_and_load_memory_mapped()
+    test_ivf_index_matches_exact_and_round_trips()
+    test_quantized_precisions_and_binary_rerank()
+    test_filtered_search_scans_only_selected_files()
+    test_delete_tombstones_and_compaction()
+    test_compaction_keeps_source_changes_made_during_the_copy()
+    test_saving_again_appends_only_new_rows()
+    test_index_trains_in_a_worker_thread()